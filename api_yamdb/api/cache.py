@@ -0,0 +1,195 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .replicas import primary_reads, written_recently
+
+STATS_EVENTS = ("hit", "miss")
+
+
+def get_cache():
+    return caches[settings.API_CACHE_ALIAS]
+
+
+def _incr(key):
+    cache = get_cache()
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if cache.add(key, 1, timeout=None):
+            return 1
+        return cache.incr(key)
+
+
+def get_version(resource):
+    """Текущее поколение ресурса.
+
+    Если счетчик пропал из кеша, поколение начинается с текущего времени,
+    чтобы не совпасть с поколением уже закешированных ответов.
+    """
+    cache = get_cache()
+    key = f"api:version:{resource}"
+    version = cache.get(key)
+    if version is not None:
+        return version
+    now = time.time()
+    cache.add(f"api:modified:{resource}", now, timeout=None)
+    cache.add(key, int(now * 1000), timeout=None)
+    return cache.get(key)
+
+
+def get_last_modified(resource):
+    """Время последней записи в ресурс, секунды эпохи Unix."""
+    get_version(resource)
+    return get_cache().get(f"api:modified:{resource}")
+
+
+def bump_version(*resources):
+    """Сбрасывает кеш ресурсов, начиная новое поколение."""
+    cache = get_cache()
+    for resource in resources:
+        get_version(resource)
+        _incr(f"api:version:{resource}")
+        cache.set(f"api:modified:{resource}", time.time(), timeout=None)
+
+
+def get_stats(resource):
+    cache = get_cache()
+    return {
+        event: cache.get(f"api:stats:{resource}:{event}", 0)
+        for event in STATS_EVENTS
+    }
+
+
+def get_role(request):
+    user = request.user
+    if not user.is_authenticated:
+        return "anon"
+    if user.is_superuser:
+        return "admin"
+    return user.role
+
+
+def get_cache_key(resources, request):
+    # Хост тоже в ключе: от него зависят ссылки next и previous.
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    versions = ":".join(
+        f"{resource}.{get_version(resource)}" for resource in resources
+    )
+    return f"api:response:{versions}:{get_role(request)}:{url}"
+
+
+def read_fresh(action, resources, request, *args, **kwargs):
+    """Ответ для нового поколения кеша.
+
+    Если ресурсы только что менялись, реплика может еще не знать об этом:
+    такой ответ читается с основной базы, см. api.replicas.
+    """
+    if settings.DATABASE_REPLICAS and any(
+        written_recently(get_last_modified(resource))
+        for resource in resources
+    ):
+        with primary_reads():
+            return action(request, *args, **kwargs)
+    return action(request, *args, **kwargs)
+
+
+class CachedResourceMixin:
+    """Поколения ресурсов, от которых зависит ответ представления."""
+
+    cache_resource = None
+
+    def get_cache_resources(self):
+        return (self.cache_resource,)
+
+
+class CachedListMixin(CachedResourceMixin):
+    """Кеширует ответы на чтение до изменения ресурса.
+
+    В ключ входят путь с параметрами запроса, роль пользователя и
+    поколение ресурса: запись в ресурс начинает новое поколение, и старые
+    ответы больше не читаются, а со временем вытесняются из кеша.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def cached_response(self, action, request, *args, **kwargs):
+        cache = get_cache()
+        key = get_cache_key(self.get_cache_resources(), request)
+        data = cache.get(key)
+        if data is not None:
+            _incr(f"api:stats:{self.cache_resource}:hit")
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+
+        _incr(f"api:stats:{self.cache_resource}:miss")
+        response = read_fresh(
+            action, self.get_cache_resources(), request, *args, **kwargs
+        )
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
+
+
+class CachedReadMixin(CachedListMixin):
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class ConditionalReadMixin(CachedResourceMixin):
+    """ETag и Last-Modified для list и retrieve.
+
+    Оба заголовка считаются по поколениям ресурсов из кеша, без запросов к
+    базе и без сериализации, так что ответ 304 почти ничего не стоит.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def conditional_response(self, action, request, *args, **kwargs):
+        resources = self.get_cache_resources()
+        etag = quote_etag(
+            hashlib.md5(get_cache_key(resources, request).encode()).hexdigest()
+        )
+        last_modified = max(
+            get_last_modified(resource) for resource in resources
+        )
+        # Last-Modified точен до секунды. Пока секунда последней записи
+        # не прошла, в нее может уложиться еще одна запись, и клиент с
+        # этим заголовком получил бы 304 со старыми данными: такой ответ
+        # отдается только с ETag.
+        if int(last_modified) >= int(time.time()):
+            last_modified = None
+        else:
+            last_modified = int(last_modified)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = read_fresh(
+                action, resources, request, *args, **kwargs
+            )
+            if response.status_code == status.HTTP_200_OK:
+                response["ETag"] = etag
+                if last_modified is not None:
+                    response["Last-Modified"] = http_date(last_modified)
+        patch_vary_headers(response, ("Authorization",))
+        return response
@@ -0,0 +1,161 @@
+"""Быстрая сборка списков на чтение без полей DRF.
+
+ModelSerializer отдает каждое поле каждого объекта через свой
+to_representation, и на длинных страницах это дороже самого SQL. Здесь
+ответ собирается обычными словарями из строк values(), а связи
+многие-ко-многим подгружаются одним запросом и заранее группируются по
+объекту. Результат совпадает с ответом обычных сериализаторов байт в
+байт; это проверяет tests/test_fast_serializers.py.
+
+Включается настройкой API_FAST_READS.
+"""
+from collections import defaultdict
+from operator import itemgetter
+
+from django.conf import settings
+from rest_framework import serializers
+from rest_framework.response import Response
+from reviews.models import GenreTitle
+
+from .instrumentation import serializing
+
+
+class FastSerializer:
+    """Описание ответа: поля по порядку и колонки values() для них.
+
+    Поле, для которого есть метод get_<имя>(row), собирается им, иначе
+    берется значение своей колонки как есть.
+    """
+
+    # Поле ответа -> колонки values(), которые ему нужны.
+    fields = {}
+    # Колонки, которые нужны всегда, например для курсора пагинации.
+    always = ("id",)
+
+    def __init__(self, fields=None):
+        self.selected = [
+            name for name in self.fields if fields is None or name in fields
+        ]
+
+    def rows(self, queryset):
+        columns = set(self.always)
+        for name in self.selected:
+            columns.update(self.fields[name])
+        return queryset.prefetch_related(None).values(*columns)
+
+    def prepare(self, rows):
+        """Подгружает связи для всей страницы перед сборкой."""
+
+    def serialize(self, rows):
+        with serializing():
+            rows = list(rows)
+            self.prepare(rows)
+            getters = []
+            for name in self.selected:
+                getter = getattr(self, f"get_{name}", None)
+                if getter is None:
+                    getter = itemgetter(self.fields[name][0])
+                getters.append((name, getter))
+            return [{name: get(row) for name, get in getters} for row in rows]
+
+
+class FeedMixin:
+    # По pub_date и id строится курсор ленты.
+    always = ("id", "pub_date")
+    # Тот же формат и часовой пояс, что у DateTimeField сериализатора.
+    datetime_field = serializers.DateTimeField()
+
+    def get_pub_date(self, row):
+        return self.datetime_field.to_representation(row["pub_date"])
+
+
+class TitleFastSerializer(FastSerializer):
+    """Как TitleDisplaySerializer."""
+
+    fields = {
+        "id": ("id",),
+        "name": ("name",),
+        "year": ("year",),
+        "rating": ("rating",),
+        "description": ("description",),
+        "genre": (),
+        "category": ("category__name", "category__slug"),
+    }
+
+    def prepare(self, rows):
+        self.genres = defaultdict(list)
+        if "genre" not in self.selected:
+            return
+        # Порядок как у prefetch_related: по умолчанию для жанров.
+        pairs = (
+            GenreTitle.objects.filter(
+                title_id__in=[row["id"] for row in rows]
+            )
+            .order_by("genre__name")
+            .values_list("title_id", "genre__name", "genre__slug")
+        )
+        for title_id, name, slug in pairs:
+            self.genres[title_id].append({"name": name, "slug": slug})
+
+    def get_genre(self, row):
+        return self.genres.get(row["id"], [])
+
+    def get_category(self, row):
+        if row["category__slug"] is None:
+            return None
+        return {"name": row["category__name"], "slug": row["category__slug"]}
+
+
+class ReviewFastSerializer(FeedMixin, FastSerializer):
+    """Как ReviewSerializer."""
+
+    fields = {
+        "id": ("id",),
+        "text": ("text",),
+        "author": ("author__username",),
+        "score": ("score",),
+        "pub_date": ("pub_date",),
+    }
+
+
+class CommentFastSerializer(FeedMixin, FastSerializer):
+    """Как CommentSerializer."""
+
+    fields = {
+        "id": ("id",),
+        "text": ("text",),
+        "author": ("author__username",),
+        "pub_date": ("pub_date",),
+    }
+
+
+class FastReadMixin:
+    """Списки через fast_serializer_class вместо serializer_class.
+
+    Выбор полей берет у SparseFieldsMixin. Страница пагинатора — строки
+    values(), а не объекты модели.
+    """
+
+    fast_serializer_class = None
+
+    def get_fast_serializer(self):
+        if not settings.API_FAST_READS or self.fast_serializer_class is None:
+            return None
+        return self.fast_serializer_class(fields=self.get_sparse_fields())
+
+    def list(self, request, *args, **kwargs):
+        fast = self.get_fast_serializer()
+        if fast is None:
+            return super().list(request, *args, **kwargs)
+        rows = fast.rows(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast.serialize(page))
+        return Response(fast.serialize(rows))
+
+    def serialize_many(self, queryset):
+        """Данные списка для своих действий, например trending."""
+        fast = self.get_fast_serializer()
+        if fast is None:
+            return self.get_serializer(queryset, many=True).data
+        return fast.serialize(fast.rows(queryset))
@@ -1,5 +1,6 @@
 import django_filters
 from django_filters import rest_framework
+from rest_framework.filters import BaseFilterBackend
 from reviews.models import Title
 
 
@@ -12,4 +13,13 @@ class TitleFilter(django_filters.FilterSet):
 
     class Meta:
         model = Title
-        fields = {"year": ["exact"]}
+        fields = {"year": ["exact"], "rating": ["exact", "gte", "lte"]}
+
+
+class TitleSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск ?search=, самые релевантные первыми."""
+
+    search_param = "search"
+
+    def filter_queryset(self, request, queryset, view):
+        return queryset.search(request.query_params.get(self.search_param, ""))
@@ -0,0 +1,176 @@
+"""Время и SQL каждого запроса: Server-Timing, метрики, медленный лог.
+
+InstrumentationMiddleware ставит обертку execute_wrapper на соединения
+с базой и считает запросы и их время, отдельно — время сборки ответа
+(api.fast и рендеринг DRF) без SQL внутри нее. Итог уходит в заголовок
+Server-Timing, в гистограммы api.metrics по представлению и действию,
+а запросы дольше SLOW_REQUEST_MS — в лог вместе с самыми долгими SQL.
+
+Для потоковых ответов заголовок отражает время до первого байта, а
+метрики записываются, когда поток отдан целиком.
+"""
+import heapq
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class RequestRecord:
+    """Счетчики одного запроса; сам же служит оберткой execute_wrapper."""
+
+    __slots__ = (
+        "started", "view", "action", "queries", "db", "serialize", "top",
+    )
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = "unmatched"
+        self.action = "none"
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+        # Куча из SLOW_REQUEST_TOP_QUERIES самых долгих SQL.
+        self.top = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.queries += 1
+            self.db += duration
+            item = (duration, self.queries, sql)
+            if len(self.top) < settings.SLOW_REQUEST_TOP_QUERIES:
+                heapq.heappush(self.top, item)
+            elif duration > self.top[0][0]:
+                heapq.heapreplace(self.top, item)
+
+    @contextmanager
+    def capture(self):
+        previous = getattr(_local, "record", None)
+        _local.record = self
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(self))
+                yield
+        finally:
+            _local.record = previous
+
+    def add_serialize(self, started, db):
+        """Время с started, кроме SQL: db — значение self.db тогда."""
+        self.serialize += time.perf_counter() - started - (self.db - db)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries", '
+            f"serialize;dur={self.serialize * 1000:.1f}, "
+            f"total;dur={self.elapsed() * 1000:.1f}"
+        )
+
+
+@contextmanager
+def serializing():
+    """Засчитывает время блока в сборку ответа, не считая SQL в нем."""
+    record = getattr(_local, "record", None)
+    if record is None:
+        yield
+        return
+    started, db = time.perf_counter(), record.db
+    try:
+        yield
+    finally:
+        record.add_serialize(started, db)
+
+
+def view_labels(request, view_func):
+    """Представление и действие: класс DRF и метод его набора."""
+    view = getattr(view_func, "cls", view_func)
+    method = request.method.lower()
+    actions = getattr(view_func, "actions", None) or {}
+    return (
+        getattr(view, "__name__", type(view).__name__),
+        actions.get(method, method),
+    )
+
+
+class InstrumentationMiddleware:
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        record = request.metrics_record = RequestRecord()
+        with record.capture():
+            response = self.get_response(request)
+        response["Server-Timing"] = record.server_timing()
+        if response.streaming:
+            response.streaming_content = self.stream(
+                request, response, record, response.streaming_content
+            )
+        else:
+            self.finish(request, response, record)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        record = request.metrics_record
+        record.view, record.action = view_labels(request, view_func)
+
+    def process_template_response(self, request, response):
+        # Рендеринг DRF идет после всех process_template_response.
+        record = request.metrics_record
+        started, db = time.perf_counter(), record.db
+        response.add_post_render_callback(
+            lambda response: record.add_serialize(started, db)
+        )
+        return response
+
+    def stream(self, request, response, record, content):
+        try:
+            with record.capture():
+                yield from content
+        finally:
+            self.finish(request, response, record)
+
+    def finish(self, request, response, record):
+        total = record.elapsed()
+        registry.observe(
+            record.view, record.action, str(response.status_code),
+            {
+                "request_duration_seconds": total,
+                "request_db_seconds": record.db,
+                "request_serialize_seconds": record.serialize,
+                "request_queries": record.queries,
+            },
+        )
+        if total * 1000 >= settings.SLOW_REQUEST_MS:
+            log_slow_request(request, record, total)
+
+
+def log_slow_request(request, record, total):
+    queries = "".join(
+        f"\n  {duration * 1000:.1f} ms  {sql[:300]}"
+        for duration, _, sql in sorted(record.top, reverse=True)
+    )
+    logger.warning(
+        "Медленный запрос %s %s (%s.%s): %.0f ms, SQL %.0f ms в %d "
+        "запросах%s",
+        request.method, request.get_full_path(), record.view, record.action,
+        total * 1000, record.db * 1000, record.queries, queries,
+    )
@@ -0,0 +1,16 @@
+from api.cache import get_stats, get_version
+from django.core.management.base import BaseCommand
+
+RESOURCES = ("categories", "genres", "titles")
+
+
+class Command(BaseCommand):
+    help = "Показывает попадания и промахи кеша ответов API."
+
+    def handle(self, *args, **options):
+        for resource in RESOURCES:
+            stats = get_stats(resource)
+            self.stdout.write(
+                f"{resource}: hit={stats['hit']} miss={stats['miss']} "
+                f"version={get_version(resource)}"
+            )
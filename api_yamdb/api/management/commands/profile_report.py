@@ -0,0 +1,108 @@
+import io
+import os
+import pstats
+from collections import Counter
+
+from api.profiling import CProfileEngine, SamplerEngine, make_token
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SORT_KEYS = ("cumulative", "tottime", "ncalls")
+
+
+def read_collapsed(paths):
+    counter = Counter()
+    for path in paths:
+        with open(path) as collapsed_file:
+            for line in collapsed_file:
+                stack, _, count = line.rstrip("\n").rpartition(" ")
+                counter[stack] += int(count)
+    return counter
+
+
+def leaves(counter):
+    """Собственное время функций: число выборок, где она — лист стека."""
+    result = Counter()
+    for stack, count in counter.items():
+        result[stack.rpartition(";")[2]] += count
+    return result
+
+
+class Command(BaseCommand):
+    help = (
+        "Сводит профили из PROFILING_DIR по эндпоинтам; с --token выдает "
+        "значение заголовка X-Profile."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "endpoints", nargs="*",
+            help="Эндпоинты (подстроки имени каталога), по умолчанию все.",
+        )
+        parser.add_argument("--dir", default=None)
+        parser.add_argument("--sort", choices=SORT_KEYS, default="cumulative")
+        parser.add_argument("--limit", type=int, default=20)
+        parser.add_argument(
+            "--output", default=None,
+            help="Каталог для сведенных профилей <endpoint>.prof/.collapsed.",
+        )
+        parser.add_argument(
+            "--token", action="store_true",
+            help="Только напечатать значение заголовка X-Profile.",
+        )
+
+    def handle(self, *args, **options):
+        if options["token"]:
+            self.stdout.write(make_token())
+            return
+        root = options["dir"] or settings.PROFILING_DIR
+        if not os.path.isdir(root):
+            raise CommandError(f"Нет каталога с профилями {root}.")
+        names = sorted(
+            name for name in os.listdir(root)
+            if os.path.isdir(os.path.join(root, name)) and (
+                not options["endpoints"]
+                or any(part in name for part in options["endpoints"])
+            )
+        )
+        if not names:
+            raise CommandError("Профилей не найдено.")
+        if options["output"]:
+            os.makedirs(options["output"], exist_ok=True)
+        for name in names:
+            self.report(name, os.path.join(root, name), options)
+
+    def report(self, name, directory, options):
+        files = sorted(
+            os.path.join(directory, entry) for entry in os.listdir(directory)
+        )
+        prof = [path for path in files if path.endswith(".prof")]
+        collapsed = [path for path in files if path.endswith(".collapsed")]
+        self.stdout.write(
+            f"== {name}: {len(prof)} .prof, {len(collapsed)} .collapsed"
+        )
+        if prof:
+            # pstats печатает через print(): OutputWrapper добавил бы к
+            # каждому куску лишний перевод строки.
+            output = io.StringIO()
+            stats = pstats.Stats(*prof, stream=output)
+            stats.sort_stats(options["sort"]).print_stats(options["limit"])
+            self.stdout.write(output.getvalue(), ending="")
+            self.save(name, CProfileEngine, stats, options)
+        if collapsed:
+            counter = read_collapsed(collapsed)
+            total = sum(counter.values())
+            self.stdout.write(f"выборок: {total}")
+            for function, count in leaves(counter).most_common(
+                options["limit"]
+            ):
+                self.stdout.write(
+                    f"{count / total * 100:6.1f}% {count:8d}  {function}"
+                )
+            self.save(name, SamplerEngine, counter, options)
+
+    def save(self, name, engine, profile, options):
+        if options["output"]:
+            path = os.path.join(options["output"], name + engine.extension)
+            engine.write(path, profile)
+            self.stdout.write(f"записан {path}")
@@ -0,0 +1,250 @@
+"""Гистограммы запросов по представлениям и действиям.
+
+Каждый воркер копит их у себя в памяти — наблюдение стоит пару
+bisect — и раз в METRICS_FLUSH_INTERVAL секунд сбрасывает снимок в свой
+файл в METRICS_DIR. /metrics складывает файлы всех воркеров и отдает
+сумму в текстовом формате Prometheus.
+
+Воркер, который gunicorn перезапускает (max_requests) или
+останавливает, сбрасывает снимок на выходе, а мастер в child_exit
+переносит его счетчики в aggregate.json и удаляет файл воркера (см.
+retire_worker и api_yamdb/gunicorn_conf.py). Так счетчики не уменьшаются
+после перезапусков, а файлов в каталоге не больше, чем живых воркеров.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from copy import deepcopy
+
+from django.conf import settings
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+PREFIX = "yamdb_"
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Имя гистограммы -> границы корзин и описание.
+HISTOGRAMS = {
+    "request_duration_seconds": (DURATION_BUCKETS, "Время ответа целиком."),
+    "request_db_seconds": (DURATION_BUCKETS, "Время SQL-запросов."),
+    "request_serialize_seconds": (
+        DURATION_BUCKETS, "Время сборки и рендеринга ответа без SQL."
+    ),
+    "request_queries": (QUERY_BUCKETS, "Число SQL-запросов."),
+}
+
+
+def empty_series():
+    return {
+        "requests": {},
+        "histograms": {
+            name: {"counts": [0] * (len(buckets) + 1), "sum": 0}
+            for name, (buckets, _) in HISTOGRAMS.items()
+        },
+    }
+
+
+class Registry:
+    """Метрики одного воркера: (view, action) -> счетчики."""
+
+    def __init__(self):
+        self.series = {}
+        self.lock = threading.Lock()
+        self.flushed = time.monotonic()
+
+    def observe(self, view, action, status, values):
+        """values — значения гистограмм HISTOGRAMS по именам."""
+        with self.lock:
+            series = self.series.get((view, action))
+            if series is None:
+                series = self.series[view, action] = empty_series()
+            requests = series["requests"]
+            requests[status] = requests.get(status, 0) + 1
+            for name, value in values.items():
+                histogram = series["histograms"][name]
+                histogram["counts"][
+                    bisect_left(HISTOGRAMS[name][0], value)
+                ] += 1
+                histogram["sum"] += value
+        if time.monotonic() - self.flushed >= settings.METRICS_FLUSH_INTERVAL:
+            self.flush()
+
+    def snapshot(self):
+        with self.lock:
+            return [
+                {"view": view, "action": action, **deepcopy(series)}
+                for (view, action), series in self.series.items()
+            ]
+
+    def flush(self):
+        """Записывает снимок в файл воркера."""
+        self.flushed = time.monotonic()
+        write_json(worker_path(os.getpid()), self.snapshot())
+
+    def clear(self):
+        with self.lock:
+            self.series.clear()
+
+
+registry = Registry()
+
+AGGREGATE = "aggregate.json"
+
+
+def worker_path(pid):
+    return os.path.join(settings.METRICS_DIR, f"worker-{pid}.json")
+
+
+def write_json(path, data):
+    """Атомарная замена: читатель видит либо старый файл, либо новый."""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(handle, "w") as temp_file:
+        json.dump(data, temp_file)
+    os.replace(temp_path, path)
+
+
+def read_json(path):
+    try:
+        with open(path) as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return None
+
+
+def read_aggregate():
+    """Счетчики завершившихся воркеров.
+
+    retired — воркеры, которые уже учтены в snapshot, хотя их файлы еще не
+    удалены; читатель такие файлы пропускает.
+    """
+    aggregate = read_json(os.path.join(settings.METRICS_DIR, AGGREGATE))
+    return aggregate or {"retired": [], "snapshot": []}
+
+
+def read_snapshots():
+    directory = settings.METRICS_DIR
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return
+    aggregate = read_aggregate()
+    yield aggregate["snapshot"]
+    retired = {f"worker-{pid}.json" for pid in aggregate["retired"]}
+    for name in names:
+        if not (name.startswith("worker-") and name.endswith(".json")):
+            continue
+        if name in retired:
+            continue
+        snapshot = read_json(os.path.join(directory, name))
+        if snapshot is not None:
+            yield snapshot
+
+
+def retire_worker(pid):
+    """Переносит счетчики завершившегося воркера в aggregate.json.
+
+    Вызывается из мастера gunicorn, по одному воркеру за раз. Сначала
+    общий файл с пометкой, что воркер уже учтен, потом удаление файла
+    воркера, потом снятие пометки: ни в какой момент /metrics не видит
+    счетчики дважды или без них.
+    """
+    path = worker_path(pid)
+    snapshot = read_json(path)
+    if snapshot is None:
+        return
+    aggregate_path = os.path.join(settings.METRICS_DIR, AGGREGATE)
+    aggregate = read_aggregate()
+    # Прошлый перенос прервался после записи общего файла: эти воркеры
+    # уже учтены.
+    for stale in aggregate["retired"]:
+        if stale != pid and os.path.exists(worker_path(stale)):
+            os.remove(worker_path(stale))
+    merged = [
+        {"view": view, "action": action, **series}
+        for (view, action), series in merge(
+            [aggregate["snapshot"], snapshot]
+        ).items()
+    ]
+    write_json(aggregate_path, {"retired": [pid], "snapshot": merged})
+    os.remove(path)
+    write_json(aggregate_path, {"retired": [], "snapshot": merged})
+
+
+def merge(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for item in snapshot:
+            key = (item["view"], item["action"])
+            series = merged.setdefault(key, empty_series())
+            for status, count in item["requests"].items():
+                requests = series["requests"]
+                requests[status] = requests.get(status, 0) + count
+            for name, histogram in item["histograms"].items():
+                target = series["histograms"].get(name)
+                if target is None or (
+                    len(target["counts"]) != len(histogram["counts"])
+                ):
+                    continue
+                target["sum"] += histogram["sum"]
+                target["counts"] = [
+                    left + right for left, right in zip(
+                        target["counts"], histogram["counts"]
+                    )
+                ]
+    return merged
+
+
+def label_value(value):
+    return (
+        str(value).replace("\\", r"\\").replace('"', r"\"")
+        .replace("\n", r"\n")
+    )
+
+
+def labels(**values):
+    return ",".join(
+        f'{name}="{label_value(value)}"' for name, value in values.items()
+    )
+
+
+def histogram_lines(name, buckets, series):
+    for (view, action), item in sorted(series.items()):
+        histogram = item["histograms"][name]
+        common = labels(view=view, action=action)
+        total = 0
+        for bound, count in zip(buckets, histogram["counts"]):
+            total += count
+            yield f'{PREFIX}{name}_bucket{{{common},le="{bound}"}} {total}'
+        total += histogram["counts"][-1]
+        yield f'{PREFIX}{name}_bucket{{{common},le="+Inf"}} {total}'
+        yield f"{PREFIX}{name}_sum{{{common}}} {histogram['sum']}"
+        yield f"{PREFIX}{name}_count{{{common}}} {total}"
+
+
+def render():
+    """Метрики всех воркеров в текстовом формате Prometheus."""
+    registry.flush()
+    series = merge(read_snapshots())
+    lines = [
+        f"# HELP {PREFIX}requests_total Число ответов.",
+        f"# TYPE {PREFIX}requests_total counter",
+    ]
+    for (view, action), item in sorted(series.items()):
+        for status, count in sorted(item["requests"].items()):
+            lines.append(
+                f"{PREFIX}requests_total"
+                f"{{{labels(view=view, action=action, status=status)}}} "
+                f"{count}"
+            )
+    for name, (buckets, description) in HISTOGRAMS.items():
+        lines.append(f"# HELP {PREFIX}{name} {description}")
+        lines.append(f"# TYPE {PREFIX}{name} histogram")
+        lines.extend(histogram_lines(name, buckets, series))
+    return "\n".join(lines) + "\n"
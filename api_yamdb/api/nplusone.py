@@ -0,0 +1,162 @@
+"""Поиск N+1: один и тот же SELECT раз за разом из одного места кода.
+
+Detector ставит обертку execute_wrapper на соединения и снимает с
+каждого SELECT отпечаток: SQL без литералов и длины списков IN плюс
+место вызова — самый глубокий кадр стека вне библиотек. Отпечаток,
+повторившийся QUERY_DETECTOR_THRESHOLD раз за запрос, — находка: почти
+всегда это ленивая подгрузка связи для каждой строки списка.
+
+QUERY_DETECTOR: "off" — middleware отключен и ничего не стоит, "warn" —
+находки со стеком идут в лог api.nplusone, "raise" — NPlusOneError,
+так тесты падают на новом N+1. С QUERY_DETECTOR_REPORT находки еще и
+дописываются в файл строками JSON.
+
+Запросы, которые потоковый ответ делает после выхода из
+представления, не проверяются.
+"""
+import json
+import logging
+import os
+import re
+import sys
+import sysconfig
+import traceback
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "warn", "raise")
+LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+IN_LISTS = re.compile(r"\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)")
+# Кадры из этих путей не считаются местом вызова.
+LIBRARY_PATHS = tuple(
+    {sysconfig.get_path(name) for name in (
+        "stdlib", "platstdlib", "purelib", "platlib"
+    )}
+)
+SKIPPED_FILES = (
+    __file__, os.path.join(os.path.dirname(__file__), "instrumentation.py")
+)
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def normalize(sql):
+    return IN_LISTS.sub("IN (...)", LITERALS.sub("?", sql))
+
+
+def is_library(filename):
+    return filename.startswith(LIBRARY_PATHS) or filename in SKIPPED_FILES
+
+
+def call_site(frame):
+    while frame is not None and is_library(frame.f_code.co_filename):
+        frame = frame.f_back
+    return frame
+
+
+class Pattern:
+    """Повторяющийся запрос: SQL, место вызова и стек первого раза."""
+
+    def __init__(self, sql, frame):
+        self.count = 1
+        self.sql = sql
+        self.site = "{}:{} in {}".format(
+            os.path.relpath(frame.f_code.co_filename, settings.BASE_DIR),
+            frame.f_lineno,
+            frame.f_code.co_name,
+        )
+        self.stack = "".join(traceback.format_list([
+            entry for entry in traceback.extract_stack(frame)
+            if not is_library(entry.filename)
+        ]))
+
+    def __str__(self):
+        return (
+            f"N+1: {self.count} одинаковых запросов из {self.site}\n"
+            f"  {self.sql}\n{self.stack}"
+        )
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sql": self.sql,
+            "site": self.site,
+            "stack": self.stack,
+        }
+
+
+class Detector:
+    def __init__(self, threshold=None):
+        self.threshold = threshold or settings.QUERY_DETECTOR_THRESHOLD
+        self.patterns = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip()[:6].upper() == "SELECT":
+            self.record(sql)
+        return execute(sql, params, many, context)
+
+    def record(self, sql):
+        frame = call_site(sys._getframe(2))
+        if frame is None:
+            return
+        sql = normalize(sql)
+        key = (sql, frame.f_code.co_filename, frame.f_lineno)
+        pattern = self.patterns.get(key)
+        if pattern is None:
+            self.patterns[key] = Pattern(sql, frame)
+        else:
+            pattern.count += 1
+
+    def findings(self):
+        return [
+            pattern for pattern in self.patterns.values()
+            if pattern.count >= self.threshold
+        ]
+
+
+def report(findings, label, mode):
+    if not findings:
+        return
+    if settings.QUERY_DETECTOR_REPORT:
+        with open(settings.QUERY_DETECTOR_REPORT, "a") as report_file:
+            for pattern in findings:
+                report_file.write(json.dumps(
+                    {"label": label, **pattern.as_dict()}, ensure_ascii=False
+                ) + "\n")
+    message = "\n".join(f"{label}: {pattern}" for pattern in findings)
+    if mode == "raise":
+        raise NPlusOneError(message)
+    logger.warning(message)
+
+
+@contextmanager
+def detect(label="", mode=None):
+    """Проверяет запросы блока; с mode=None — как велит QUERY_DETECTOR."""
+    detector = Detector()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(detector))
+        yield detector
+    report(detector.findings(), label, mode or settings.QUERY_DETECTOR)
+
+
+class QueryPatternMiddleware:
+    def __init__(self, get_response):
+        if settings.QUERY_DETECTOR not in MODES:
+            raise ValueError(
+                f"QUERY_DETECTOR должен быть одним из {', '.join(MODES)}."
+            )
+        if settings.QUERY_DETECTOR == "off":
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with detect(f"{request.method} {request.get_full_path()}"):
+            return self.get_response(request)
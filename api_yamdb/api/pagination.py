@@ -0,0 +1,87 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.utils.dateparse import parse_datetime
+from rest_framework import pagination
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class FeedPagination(pagination.LimitOffsetPagination):
+    """Лента отзывов или комментариев.
+
+    По умолчанию работает как limit/offset. Если в запросе есть параметр
+    cursor (для первой страницы пустой), лента листается по ключу
+    (pub_date, id): любая страница стоит одного индексного запроса,
+    без OFFSET и COUNT(*), а новые записи не сдвигают уже отданные.
+    """
+
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Неверный курсор."
+    ordering = ("-pub_date", "-id")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = self.cursor_query_param in request.query_params
+        if not self.keyset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        self.limit = self.get_limit(request)
+        queryset = queryset.order_by(*self.ordering)
+        position = self.decode_cursor(request)
+        if position is not None:
+            pub_date, pk = position
+            # Условие по pub_date задает диапазон индекса, исключение
+            # отсекает только записи с той же датой.
+            queryset = queryset.filter(pub_date__lte=pub_date).exclude(
+                pub_date=pub_date, pk__gte=pk
+            )
+        page = list(queryset[:self.limit + 1])
+        self.has_next = len(page) > self.limit
+        page = page[:self.limit]
+        self.last = page[-1] if page else None
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response(
+            OrderedDict(
+                [("next", self.get_next_cursor_link()), ("results", data)]
+            )
+        )
+
+    def get_next_cursor_link(self):
+        if not self.has_next:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.offset_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.last)
+        )
+
+    def encode_cursor(self, obj):
+        # Страница из объектов модели или из строк values() (api.fast).
+        if isinstance(obj, dict):
+            pub_date, pk = obj["pub_date"], obj["id"]
+        else:
+            pub_date, pk = obj.pub_date, obj.pk
+        position = f"{pub_date.isoformat()} {pk}"
+        return urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params[self.cursor_query_param]
+        if not encoded:
+            return None
+        try:
+            position = urlsafe_b64decode(encoded.encode()).decode()
+            pub_date, pk = position.split(" ")
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
@@ -11,7 +11,7 @@ class StaffOrAuthorOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         return request.method in permissions.SAFE_METHODS or (
             request.user.role in ["moderator", "admin"]
-            or request.user == obj.author
+            or request.user.id == obj.author_id
         )
 
 
@@ -0,0 +1,249 @@
+"""Выборочное профилирование запросов в работающем воркере.
+
+ProfilingMiddleware включается настройкой PROFILING_ENABLED и
+профилирует долю PROFILING_SAMPLE_RATE запросов, а также запросы с
+подписанным заголовком X-Profile (значение выдает
+profile_report --token). Остальным запросам он стоит одного вызова
+random().
+
+Два движка, PROFILING_ENGINE:
+
+- "cprofile" — cProfile, точные счетчики вызовов, но запрос под ним
+  заметно медленнее; файлы .prof читает pstats, snakeviz и т. п.;
+- "sampler" — фоновый поток раз в PROFILING_SAMPLER_INTERVAL секунд
+  снимает стек профилируемого запроса; файлы .collapsed — свернутые
+  стеки для flamegraph.pl и speedscope.
+
+Профили копятся в воркере по представлению и действию и раз в
+PROFILING_FLUSH_INTERVAL секунд пишутся в PROFILING_DIR/<endpoint>/; в
+каталоге остаются PROFILING_MAX_FILES последних файлов. Потоковые ответы
+профилируются до начала отдачи.
+"""
+import atexit
+import cProfile
+import itertools
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+from .instrumentation import view_labels
+
+TOKEN_SALT = "api.profiling"
+HEADER = "HTTP_X_PROFILE"
+
+
+def make_token():
+    """Значение заголовка X-Profile, действует PROFILING_TOKEN_MAX_AGE с."""
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign("profile")
+
+
+def check_token(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def endpoint_label(request):
+    match = request.resolver_match
+    if match is None:
+        return "unmatched"
+    return ".".join(view_labels(request, match.func))
+
+
+def collapse(frame):
+    """Стек от корня к листу в свернутом формате flamegraph."""
+    names = []
+    while frame is not None:
+        names.append(
+            f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+        )
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class CProfileEngine:
+    extension = ".prof"
+
+    def start(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def merge(self, previous):
+        if previous is None:
+            return pstats.Stats(self.profile)
+        previous.add(self.profile)
+        return previous
+
+    @staticmethod
+    def write(path, stats):
+        stats.dump_stats(path)
+
+
+class StackSampler:
+    """Фоновый поток, снимающий стеки потоков с идущим профилированием."""
+
+    def __init__(self):
+        self.active = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def add(self, counter):
+        with self.lock:
+            self.active[threading.get_ident()] = counter
+            # После fork воркера поток мастера не переживает.
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(
+                    target=self.run, name="profiling-sampler", daemon=True
+                )
+                self.thread.start()
+            self.wakeup.set()
+
+    def remove(self):
+        with self.lock:
+            self.active.pop(threading.get_ident(), None)
+            if not self.active:
+                self.wakeup.clear()
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            time.sleep(settings.PROFILING_SAMPLER_INTERVAL)
+            frames = sys._current_frames()
+            with self.lock:
+                for thread_id, counter in self.active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counter[collapse(frame)] += 1
+
+
+sampler = StackSampler()
+
+
+class SamplerEngine:
+    extension = ".collapsed"
+
+    def start(self):
+        self.counter = Counter()
+        sampler.add(self.counter)
+
+    def stop(self):
+        sampler.remove()
+
+    def merge(self, previous):
+        if previous is None:
+            return self.counter
+        previous.update(self.counter)
+        return previous
+
+    @staticmethod
+    def write(path, counter):
+        with open(path, "w") as collapsed_file:
+            for stack, count in counter.most_common():
+                collapsed_file.write(f"{stack} {count}\n")
+
+
+ENGINES = {"cprofile": CProfileEngine, "sampler": SamplerEngine}
+
+
+def endpoint_dir(label):
+    return os.path.join(
+        settings.PROFILING_DIR, re.sub(r"[^\w.-]", "_", label)
+    )
+
+
+def rotate(directory):
+    """Оставляет в каталоге PROFILING_MAX_FILES последних файлов."""
+    entries = sorted(
+        (entry for entry in os.scandir(directory) if entry.is_file()),
+        key=lambda entry: (entry.stat().st_mtime, entry.name),
+    )
+    excess = len(entries) - settings.PROFILING_MAX_FILES
+    for entry in entries[:max(0, excess)]:
+        os.remove(entry.path)
+
+
+class ProfileStore:
+    """Профили воркера по эндпоинтам до записи на диск."""
+
+    def __init__(self):
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.flushed = time.monotonic()
+        self.sequence = itertools.count()
+
+    def add(self, label, engine):
+        with self.lock:
+            previous = self.pending.get(label, (None, None))[1]
+            self.pending[label] = (type(engine), engine.merge(previous))
+            due = time.monotonic() - self.flushed
+        if due >= settings.PROFILING_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.flushed = time.monotonic()
+        for label, (engine, profile) in pending.items():
+            directory = endpoint_dir(label)
+            os.makedirs(directory, exist_ok=True)
+            name = "{}-{}-{}{}".format(
+                time.strftime("%Y%m%d-%H%M%S"), os.getpid(),
+                next(self.sequence), engine.extension,
+            )
+            engine.write(os.path.join(directory, name), profile)
+            rotate(directory)
+
+
+store = ProfileStore()
+atexit.register(store.flush)
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        if not settings.PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        if settings.PROFILING_ENGINE not in ENGINES:
+            raise ValueError(
+                "PROFILING_ENGINE должен быть одним из "
+                f"{', '.join(ENGINES)}."
+            )
+        self.get_response = get_response
+        self.rate = settings.PROFILING_SAMPLE_RATE
+
+    def __call__(self, request):
+        token = request.META.get(HEADER)
+        if token is None:
+            if random.random() >= self.rate:
+                return self.get_response(request)
+        elif not check_token(token):
+            return self.get_response(request)
+        return self.profile(request)
+
+    def profile(self, request):
+        engine = ENGINES[settings.PROFILING_ENGINE]()
+        engine.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            engine.stop()
+        label = endpoint_label(request)
+        store.add(label, engine)
+        response["X-Profiled"] = label
+        return response
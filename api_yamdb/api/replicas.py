@@ -0,0 +1,174 @@
+"""Чтение с реплик PostgreSQL, запись — в основную базу.
+
+ReplicaMiddleware разрешает запросам GET, HEAD и OPTIONS читать с
+реплик из DATABASE_REPLICAS, ReplicaRouter отправляет туда чтения
+только на время такого запроса; запись, миграции, команды и фоновые
+задачи всегда работают с основной базой. Реплика выбирается одна на
+запрос, случайно; если к ней не подключиться, она выпадает из выбора на
+REPLICA_RETRY_SECONDS секунд, а чтения уходят на другую реплику или на
+основную базу. Обрыв уже открытого соединения посреди запроса — обычная
+ошибка базы; до следующего запроса его закроет проверка из api.signals.
+
+Реплика отстает от основной базы. Чтобы клиент видел свою запись,
+ответ на запрос с записью ставит cookie и заголовок X-Primary-Until:
+до этого момента (REPLICA_PIN_SECONDS) запросы с такой cookie или с
+тем же заголовком читают с основной базы. Значение подписано
+TimestampSigner, и подпись старше окна не принимается: иначе любой клиент
+мог бы навсегда увести свои чтения с реплик. Кеш ответов (api.cache) по
+той же причине читает с основной базы ресурсы, измененные за последние
+REPLICA_PIN_SECONDS секунд: иначе в кеш нового поколения попали бы
+старые данные.
+"""
+import logging
+import math
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.signing import BadSignature, TimestampSigner
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PIN_COOKIE = "primary_until"
+PIN_HEADER = "HTTP_X_PRIMARY_UNTIL"
+PIN_SALT = "api.replicas.pin"
+
+# Реплика -> time.monotonic(), до которого к ней не подключаемся.
+down = {}
+
+
+class ReadState(threading.local):
+    allowed = False
+    alias = None
+
+
+state = ReadState()
+
+
+@contextmanager
+def replica_reads(allowed=True):
+    """Чтения блока идут на реплику или, с allowed=False, в основную базу."""
+    previous = state.allowed, state.alias
+    state.allowed, state.alias = allowed, None
+    try:
+        yield
+    finally:
+        state.allowed, state.alias = previous
+
+
+def primary_reads():
+    return replica_reads(allowed=False)
+
+
+def written_recently(last_modified):
+    """Реплики могли еще не получить запись, сделанную в last_modified."""
+    return (
+        bool(settings.DATABASE_REPLICAS)
+        and time.time() - last_modified < settings.REPLICA_PIN_SECONDS
+    )
+
+
+def is_available(alias):
+    if down.get(alias, 0) > time.monotonic():
+        return False
+    connection = connections[alias]
+    if connection.connection is None:
+        try:
+            connection.ensure_connection()
+        except DatabaseError as error:
+            down[alias] = time.monotonic() + settings.REPLICA_RETRY_SECONDS
+            logger.warning("Реплика %s недоступна: %s", alias, error)
+            return False
+    return True
+
+
+def choose_replica():
+    replicas = list(settings.DATABASE_REPLICAS)
+    random.shuffle(replicas)
+    for alias in replicas:
+        if is_available(alias):
+            return alias
+    return DEFAULT_DB_ALIAS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not state.allowed:
+            return None
+        if state.alias is None:
+            state.alias = choose_replica()
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема приходит на реплики вместе с репликацией.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+def sign_pin(until):
+    # Округление вниз: срок не должен выйти за REPLICA_PIN_SECONDS.
+    until = math.floor(until * 1000) / 1000
+    return TimestampSigner(salt=PIN_SALT).sign("{:.3f}".format(until))
+
+
+def is_pinned(request):
+    value = request.COOKIES.get(PIN_COOKIE) or request.META.get(PIN_HEADER)
+    if not value:
+        return False
+    try:
+        until = float(
+            TimestampSigner(salt=PIN_SALT).unsign(
+                value, max_age=settings.REPLICA_PIN_SECONDS
+            )
+        )
+    except (BadSignature, ValueError):
+        return False
+    return time.time() < until
+
+
+def pin(response):
+    until = sign_pin(time.time() + settings.REPLICA_PIN_SECONDS)
+    response.set_cookie(
+        PIN_COOKIE, until, max_age=settings.REPLICA_PIN_SECONDS,
+        httponly=True, samesite="Lax",
+    )
+    response["X-Primary-Until"] = until
+
+
+def stream(content):
+    with replica_reads():
+        yield from content
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.method not in SAFE_METHODS:
+            response = self.get_response(request)
+            pin(response)
+            return response
+        if is_pinned(request):
+            return self.get_response(request)
+        with replica_reads():
+            response = self.get_response(request)
+        if response.streaming:
+            # Потоковый ответ читает базу уже после выхода из middleware.
+            response.streaming_content = stream(response.streaming_content)
+        return response
@@ -1,21 +1,48 @@
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
+from django.db import connection
 from django.utils import timezone
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.relations import SlugRelatedField
-from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.export import FORMATS
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from reviews.signals import rate_reviews
 
 User = get_user_model()
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class SparseFieldsSerializerMixin:
+    """Оставляет в ответе только поля из аргумента fields, см. api.sparse."""
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SlugSerializerMixin:
+    """slug попадает в путь .../<slug>/ и не должен совпасть с действием.
+
+    Категорию со slug bulk нельзя было бы удалить: DELETE .../bulk/
+    достается действию BulkCreateMixin.bulk.
+    """
+
+    reserved_slugs = ("bulk",)
+
+    def validate_slug(self, value):
+        if value in self.reserved_slugs:
+            raise ValidationError(f"slug {value} зарезервирован.")
+        return value
+
+
+class CategorySerializer(SlugSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ("name", "slug")
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(SlugSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Genre
         fields = ("name", "slug")
@@ -40,6 +67,7 @@ class TitleSerializer(serializers.ModelSerializer):
             "genre",
             "category",
         )
+        read_only_fields = ("rating",)
 
     def validate_year(self, value):
         if value > timezone.now().year:
@@ -47,7 +75,122 @@ class TitleSerializer(serializers.ModelSerializer):
         return value
 
 
-class TitleDisplaySerializer(serializers.ModelSerializer):
+class BulkListSerializer(serializers.ListSerializer):
+    """Пачка объектов для POST .../bulk/.
+
+    Связи и уникальность проверяются сразу для всей пачки, а не запросом
+    на каждый элемент. Ошибки — список по элементам пачки, у правильных
+    элементов пустые словари.
+    """
+
+    def to_internal_value(self, data):
+        # Здесь, а не в validate: ошибки из validate DRF сворачивает в
+        # non_field_errors, а нужен список, как у ошибок полей.
+        items = super().to_internal_value(data)
+        errors = [{} for _ in items]
+        self.check_items(items, errors)
+        if any(errors):
+            raise ValidationError(errors)
+        return items
+
+    def check_items(self, items, errors):
+        """Дополняет errors ошибками элементов; может менять items."""
+
+
+class UniqueSlugListSerializer(BulkListSerializer):
+    def check_items(self, items, errors):
+        model = self.child.Meta.model
+        slugs = [item["slug"] for item in items]
+        taken = set(
+            model.objects.filter(slug__in=slugs).values_list("slug", flat=True)
+        )
+        for item, item_errors in zip(items, errors):
+            if item["slug"] in taken:
+                item_errors["slug"] = ["Такой slug уже занят."]
+            taken.add(item["slug"])
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        return model.objects.bulk_create(
+            model(**item) for item in validated_data
+        )
+
+
+class CategoryBulkSerializer(CategorySerializer):
+    class Meta(CategorySerializer.Meta):
+        list_serializer_class = UniqueSlugListSerializer
+        # Занятые slug проверит UniqueSlugListSerializer одним запросом.
+        extra_kwargs = {"slug": {"validators": []}}
+
+
+class GenreBulkSerializer(GenreSerializer):
+    class Meta(GenreSerializer.Meta):
+        list_serializer_class = UniqueSlugListSerializer
+        extra_kwargs = {"slug": {"validators": []}}
+
+
+class TitleBulkListSerializer(BulkListSerializer):
+    def check_items(self, items, errors):
+        genres = Genre.objects.in_bulk(
+            {slug for item in items for slug in item["genre"]},
+            field_name="slug",
+        )
+        categories = Category.objects.in_bulk(
+            {item["category"] for item in items}, field_name="slug"
+        )
+        for item, item_errors in zip(items, errors):
+            missing = [slug for slug in item["genre"] if slug not in genres]
+            if missing:
+                item_errors["genre"] = [
+                    f"Жанра {slug} не существует." for slug in missing
+                ]
+            else:
+                # Повторы убираем, как genre.set() при создании по одному.
+                item["genre"] = [
+                    genres[slug] for slug in dict.fromkeys(item["genre"])
+                ]
+            if item["category"] in categories:
+                item["category"] = categories[item["category"]]
+            else:
+                item_errors["category"] = [
+                    f"Категории {item['category']} не существует."
+                ]
+
+    def create(self, validated_data):
+        genres = [item.pop("genre") for item in validated_data]
+        titles = [Title(**item) for item in validated_data]
+        if connection.features.can_return_ids_from_bulk_insert:
+            Title.objects.bulk_create(titles)
+        else:
+            # SQLite не возвращает ключи из bulk_create, а без них не
+            # связать произведения с жанрами.
+            for title in titles:
+                title.save()
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title=title, genre=genre)
+            for title, title_genres in zip(titles, genres)
+            for genre in title_genres
+        )
+        return (
+            Title.objects.filter(pk__in=[title.pk for title in titles])
+            .select_related("category")
+            .prefetch_related("genre")
+            .order_by("pk")
+        )
+
+
+class TitleBulkSerializer(TitleSerializer):
+    # Slug-и проверит TitleBulkListSerializer сразу для всей пачки.
+    genre = serializers.ListField(child=serializers.SlugField())
+    category = serializers.SlugField()
+
+    class Meta(TitleSerializer.Meta):
+        list_serializer_class = TitleBulkListSerializer
+
+
+class TitleDisplaySerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     genre = GenreSerializer(many=True)
     category = CategorySerializer()
 
@@ -64,7 +207,22 @@ class TitleDisplaySerializer(serializers.ModelSerializer):
         )
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class LimitQuerySerializer(serializers.Serializer):
+    """Размер подборки произведений, например /titles/trending/."""
+
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class TopTitlesQuerySerializer(LimitQuerySerializer):
+    """Параметры /titles/top/."""
+
+    genre = serializers.SlugField(required=False)
+    category = serializers.SlugField(required=False)
+
+
+class ReviewSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     author = SlugRelatedField(slug_field="username", read_only="True")
     score = serializers.IntegerField(required=True)
 
@@ -72,20 +230,68 @@ class ReviewSerializer(serializers.ModelSerializer):
         fields = ("id", "text", "author", "score", "pub_date")
         model = Review
 
-    def validate(self, attrs):
-        user = self.context["request"].user
-        title_id = self.context["view"].kwargs.get("title_id")
 
-        if title_id is not None and self.context["request"].method != "PATCH":
-            title = get_object_or_404(Title, pk=title_id)
-            if user.reviews.filter(title=title).exists():
-                raise ValidationError(
-                    "Вы уже оставили обзор на это произведение!"
-                )
-        return attrs
+class ExportQuerySerializer(serializers.Serializer):
+    """Параметры /export/<ресурс>/.
+
+    Не format: этот параметр DRF забирает под выбор рендерера.
+    """
+
+    output = serializers.ChoiceField(choices=FORMATS, default="ndjson")
+    since = serializers.DateTimeField(required=False)
+
+
+class ReviewBulkListSerializer(BulkListSerializer):
+    def check_items(self, items, errors):
+        title = self.context["title"]
+        authors = User.objects.in_bulk(
+            {item["author"] for item in items}, field_name="username"
+        )
+        reviewed = set(
+            Review.objects.filter(
+                title=title, author__in=authors.values()
+            ).values_list("author__username", flat=True)
+        )
+        for item, item_errors in zip(items, errors):
+            username = item["author"]
+            if username not in authors:
+                item_errors["author"] = [
+                    f"Пользователя {username} не существует."
+                ]
+            elif username in reviewed:
+                item_errors["author"] = [
+                    f"{username} уже оставил обзор на это произведение!"
+                ]
+            else:
+                item["author"] = authors[username]
+            reviewed.add(username)
+
+    def create(self, validated_data):
+        reviews = Review.objects.bulk_create(
+            Review(**item) for item in validated_data
+        )
+        title = validated_data[0]["title"]
+        rate_reviews(title.pk, reviews)
+        # Ключи из bulk_create есть не у всех баз, а пара произведение и
+        # автор уникальна.
+        return Review.objects.filter(
+            title=title, author__in=[review.author for review in reviews]
+        ).select_related("author")
+
+
+class ReviewBulkSerializer(ReviewSerializer):
+    """Отзыв для импорта: автора указывает администратор."""
+
+    author = serializers.CharField()
+    score = serializers.IntegerField(min_value=1, max_value=10)
+
+    class Meta(ReviewSerializer.Meta):
+        list_serializer_class = ReviewBulkListSerializer
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     author = SlugRelatedField(slug_field="username", read_only="True")
 
     class Meta:
@@ -93,7 +299,9 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
 
 
-class AdminSerializer(serializers.ModelSerializer):
+class AdminSerializer(
+    SparseFieldsSerializerMixin, serializers.ModelSerializer
+):
     class Meta:
         model = User
         fields = (
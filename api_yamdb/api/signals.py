@@ -0,0 +1,101 @@
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db import connections, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from reviews.models import Category, Comment, Genre, GenreTitle, Review, Title
+from reviews.signals import data_reloaded, is_muted
+
+from . import cache
+
+User = get_user_model()
+
+WRITE_SIGNALS = (post_save, post_delete)
+
+
+def bump_version(*resources):
+    """Новое поколение ресурсов после коммита записи.
+
+    До коммита параллельный GET еще читает прежние строки: смени поколение
+    раньше, он сохранил бы их в кеш нового поколения или отдал бы под
+    новым ETag. Вне транзакции on_commit выполняется сразу.
+    """
+    if not is_muted():
+        transaction.on_commit(lambda: cache.bump_version(*resources))
+
+
+@receiver(WRITE_SIGNALS, sender=Category)
+def category_changed(sender, **kwargs):
+    # Категория вложена в ответы произведений.
+    bump_version("categories", "titles")
+
+
+@receiver(WRITE_SIGNALS, sender=Genre)
+def genre_changed(sender, **kwargs):
+    bump_version("genres", "titles")
+
+
+@receiver(WRITE_SIGNALS, sender=GenreTitle)
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genres_changed(sender, **kwargs):
+    bump_version("titles")
+
+
+@receiver(WRITE_SIGNALS, sender=Title)
+def title_changed(sender, instance, **kwargs):
+    # Лента отзывов удаленного произведения тоже меняется: теперь это 404.
+    bump_version("titles", f"reviews:{instance.pk}")
+
+
+@receiver(WRITE_SIGNALS, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    # Отзыв меняет рейтинг произведения.
+    bump_version(
+        "titles", f"reviews:{instance.title_id}", f"comments:{instance.pk}"
+    )
+
+
+@receiver(WRITE_SIGNALS, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    bump_version(f"comments:{instance.review_id}")
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    # В отзывах и комментариях автор показан по username. У нового
+    # пользователя их еще нет.
+    if not created:
+        bump_version("users")
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, **kwargs):
+    bump_version("users")
+
+
+@receiver(data_reloaded)
+def data_reloaded_everywhere(sender, **kwargs):
+    # Ленты отзывов и комментариев зависят от поколения users.
+    transaction.on_commit(lambda: cache.bump_version(
+        "categories", "genres", "titles", "users"
+    ))
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """Закрывает постоянные соединения, которые база уже оборвала.
+
+    Иначе после перезапуска PostgreSQL или обрыва по таймауту первый
+    запрос каждого потока падал бы с ошибкой. Django 2.2 проверяет
+    соединение только после ошибки, поэтому здесь то же, что делает
+    CONN_HEALTH_CHECKS в Django 4.1+; новое соединение откроется при
+    первом обращении к базе.
+    """
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and connection.settings_dict.get("CONN_HEALTH_CHECKS")
+            and not connection.in_atomic_block
+            and not connection.is_usable()
+        ):
+            connection.close()
@@ -0,0 +1,89 @@
+"""Выборочные поля ответа: ?fields=id,name и ?omit=description.
+
+Выбор сужает не только ответ, но и запрос: ненужные колонки
+откладываются через only(), а JOIN-ы и prefetch связей, которых нет в
+ответе, не делаются вовсе.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def split_param(value):
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class SparseFieldsMixin:
+    """Поддержка ?fields= и ?omit= в представлении на чтение.
+
+    sparse_columns — какие поля модели нужны полю ответа; по умолчанию
+    одноименное поле. Поле через __ (category__slug) подтягивается
+    select_related. sparse_prefetch — связи для prefetch_related.
+    sparse_always — поля модели, которые нужны всегда, например для
+    курсора пагинации.
+    """
+
+    fields_query_param = "fields"
+    omit_query_param = "omit"
+    sparse_columns = {}
+    sparse_prefetch = {}
+    sparse_always = ()
+
+    def get_sparse_fields(self):
+        """Выбранные поля ответа или None, если нужны все."""
+        if hasattr(self, "_sparse_fields"):
+            return self._sparse_fields
+        self._sparse_fields = None
+        params = self.request.query_params
+        if self.request.method not in SAFE_METHODS or not (
+            self.fields_query_param in params
+            or self.omit_query_param in params
+        ):
+            return None
+        available = list(self.get_serializer_class()().fields)
+        selected = set(available)
+        errors = {}
+        for param in (self.fields_query_param, self.omit_query_param):
+            names = split_param(params.get(param, ""))
+            unknown = names - selected
+            if unknown:
+                errors[param] = [
+                    f"Неизвестные поля: {', '.join(sorted(unknown))}."
+                ]
+        if errors:
+            raise ValidationError(errors)
+        if self.fields_query_param in params:
+            selected = split_param(params[self.fields_query_param])
+        selected -= split_param(params.get(self.omit_query_param, ""))
+        if not selected:
+            raise ValidationError(
+                {self.fields_query_param: ["Не выбрано ни одного поля."]}
+            )
+        self._sparse_fields = selected
+        return selected
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_sparse_fields()
+        if fields is not None:
+            kwargs["fields"] = fields
+        return super().get_serializer(*args, **kwargs)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        fields = self.get_sparse_fields()
+        if fields is None:
+            return queryset
+        columns = set(self.sparse_always)
+        related = set()
+        prefetch = set()
+        for field in fields:
+            for column in self.sparse_columns.get(field, (field,)):
+                columns.add(column)
+                if "__" in column:
+                    related.add(column.rsplit("__", 1)[0])
+            prefetch.update(self.sparse_prefetch.get(field, ()))
+        queryset = queryset.select_related(None).prefetch_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.only(*columns)
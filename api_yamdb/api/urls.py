@@ -2,8 +2,8 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (CategoriesViewSet, CommentViewSet, GenresViewSet,
-                    ReviewViewSet, TitlesViewSet, UserViewSet, get_token,
-                    signup)
+                    ReviewViewSet, TitlesViewSet, UserViewSet, export_data,
+                    get_token, signup)
 
 app_name = "api"
 
@@ -25,5 +25,6 @@ router.register(r"users", UserViewSet, basename="user")
 urlpatterns = [
     path("v1/auth/signup/", signup, name="signup"),
     path("v1/auth/token/", get_token, name="get_token"),
+    path("v1/export/<str:resource>/", export_data, name="export"),
     path("v1/", include(router.urls)),
 ]
@@ -1,25 +1,42 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.contrib.auth.hashers import check_password, make_password
-from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, mixins, pagination, status, viewsets
 from rest_framework.decorators import action, api_view, permission_classes
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
-from reviews.models import Category, Genre, Review, Title
+from rest_framework.settings import api_settings
+from reviews import export
+from reviews.leaderboard import top_titles
+from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.signals import batched_reranks
+from users.authentication import RoleRefreshToken, get_user_row
+from users.outbox import enqueue
+from users.tokens import confirmation_codes
 
 from api_yamdb.settings import DOMAIN_NAME
 
-from .filters import TitleFilter
+from . import metrics as request_metrics
+from .cache import (CachedListMixin, CachedReadMixin, ConditionalReadMixin,
+                    bump_version)
+from .fast import (CommentFastSerializer, FastReadMixin, ReviewFastSerializer,
+                   TitleFastSerializer)
+from .filters import TitleFilter, TitleSearchFilter
+from .pagination import FeedPagination
 from .permissions import AdminOrReadOnly, IsAdmin, StaffOrAuthorOrReadOnly
-from .serializers import (AdminSerializer, CategorySerializer,
-                          CommentSerializer, GenreSerializer, ReviewSerializer,
-                          SignupSerializer, TitleDisplaySerializer,
-                          TitleSerializer, TokenSerializer)
+from .serializers import (AdminSerializer, CategoryBulkSerializer,
+                          CategorySerializer, CommentSerializer,
+                          ExportQuerySerializer, GenreBulkSerializer,
+                          GenreSerializer, LimitQuerySerializer,
+                          ReviewBulkSerializer, ReviewSerializer,
+                          SignupSerializer, TitleBulkSerializer,
+                          TitleDisplaySerializer, TitleSerializer,
+                          TokenSerializer, TopTitlesQuerySerializer)
+from .sparse import SparseFieldsMixin
 
 User = get_user_model()
 
@@ -33,47 +50,194 @@ class ListCreateDestroyViewSet(
     pass
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class BulkCreateMixin:
+    """POST .../bulk/: создает пачку объектов из JSON-массива.
+
+    Пачка проверяется целиком и сохраняется в одной транзакции: если
+    хоть один элемент не прошел проверку, не сохраняется ничего, а в
+    ответе 400 список ошибок по элементам. bulk_create не отправляет
+    сигналы моделей, поэтому кеш сбрасывается здесь.
+    """
+
+    bulk_serializer_class = None
+
+    def get_bulk_save_kwargs(self):
+        return {}
+
+    def get_bulk_cache_resources(self):
+        return self.get_cache_resources()
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: ["Ожидается список."]
+            })
+        if len(request.data) > settings.BULK_CREATE_MAX_ITEMS:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    "Не больше "
+                    f"{settings.BULK_CREATE_MAX_ITEMS} объектов за раз."
+                ]
+            })
+        serializer = self.bulk_serializer_class(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            context=self.get_serializer_context(),
+        )
+        serializer.is_valid(raise_exception=True)
+        try:
+            with transaction.atomic():
+                instances = serializer.save(**self.get_bulk_save_kwargs())
+        except IntegrityError:
+            # Параллельный запрос успел занять тот же slug или оставить
+            # отзыв от того же автора.
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    "Пачка конфликтует с уже сохраненными данными."
+                ]
+            })
+        bump_version(*self.get_bulk_cache_resources())
+        response = self.get_serializer(instances, many=True)
+        return Response(response.data, status=status.HTTP_201_CREATED)
+
+
+class CommentViewSet(
+    SparseFieldsMixin,
+    ConditionalReadMixin,
+    FastReadMixin,
+    viewsets.ModelViewSet,
+):
     """Комментарии к отзывам."""
 
     serializer_class = CommentSerializer
+    fast_serializer_class = CommentFastSerializer
     permission_classes = (StaffOrAuthorOrReadOnly,)
-    pagination_class = pagination.LimitOffsetPagination
+    pagination_class = FeedPagination
+    sparse_columns = {"author": ("author__username",)}
+    # По pub_date и id строится курсор ленты, а по review_id менеджер
+    # связи подставляет уже загруженный отзыв.
+    sparse_always = ("pub_date", "review_id")
+
+    def get_cache_resources(self):
+        return (f"comments:{self.kwargs.get('review_id')}", "users")
+
+    def get_review(self):
+        """Отзыв из URL, проверенный на принадлежность произведению.
+
+        Загружается один раз за запрос.
+        """
+        if not hasattr(self, "_review"):
+            self._review = get_object_or_404(
+                Review.objects.only("id", "title_id"),
+                pk=self.kwargs.get("review_id"),
+                title_id=self.kwargs.get("title_id"),
+            )
+        return self._review
 
     def get_queryset(self):
-        review_id = self.kwargs.get("review_id")
-        review = get_object_or_404(Review, pk=review_id)
-        return review.comments.all()
+        if self.detail:
+            # Родителя проверит тот же запрос, что ищет комментарий.
+            return Comment.objects.filter(
+                review_id=self.kwargs.get("review_id"),
+                review__title_id=self.kwargs.get("title_id"),
+            ).select_related("author")
+        return self.get_review().comments.select_related("author")
 
     def perform_create(self, serializer):
-        review_id = self.kwargs.get("review_id")
-        review = get_object_or_404(Review, pk=review_id)
-        serializer.save(review=review, author=self.request.user)
+        serializer.save(
+            review=self.get_review(), author=get_user_row(self.request.user)
+        )
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
-    """Только одно ревью к одному фильму."""
+class ReviewViewSet(
+    BulkCreateMixin,
+    SparseFieldsMixin,
+    ConditionalReadMixin,
+    FastReadMixin,
+    viewsets.ModelViewSet,
+):
+    """Только одно ревью к одному фильму.
+
+    Администратор может импортировать отзывы пачкой через bulk.
+    """
 
     serializer_class = ReviewSerializer
+    bulk_serializer_class = ReviewBulkSerializer
+    fast_serializer_class = ReviewFastSerializer
     permission_classes = [StaffOrAuthorOrReadOnly]
-    pagination_class = pagination.LimitOffsetPagination
+    pagination_class = FeedPagination
+    sparse_columns = {"author": ("author__username",)}
+    sparse_always = ("pub_date", "title_id")
+
+    def get_permissions(self):
+        if self.action == "bulk":
+            return [IsAdmin()]
+        return super().get_permissions()
+
+    def get_cache_resources(self):
+        return (f"reviews:{self.kwargs.get('title_id')}", "users")
+
+    def get_bulk_cache_resources(self):
+        # Отзывы меняют рейтинг произведения.
+        return (f"reviews:{self.kwargs.get('title_id')}", "titles")
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == "bulk":
+            context["title"] = self.get_title()
+        return context
+
+    def get_bulk_save_kwargs(self):
+        return {"title": self.get_title()}
+
+    def get_title(self):
+        """Произведение из URL; загружается один раз за запрос."""
+        if not hasattr(self, "_title"):
+            self._title = get_object_or_404(
+                Title.objects.only("id"), pk=self.kwargs.get("title_id")
+            )
+        return self._title
 
     def get_queryset(self):
-        title_id = self.kwargs.get("title_id")
-        title = get_object_or_404(Title, pk=title_id)
-        return title.reviews.all()
+        if self.detail:
+            return Review.objects.filter(
+                title_id=self.kwargs.get("title_id")
+            ).select_related("author")
+        return self.get_title().reviews.select_related("author")
 
     def perform_create(self, serializer):
-        title_id = self.kwargs.get("title_id")
-        title = get_object_or_404(Title, pk=title_id)
-        serializer.save(author=self.request.user, title=title)
-
-
-class CategoriesViewSet(ListCreateDestroyViewSet):
+        # Отзыв и рейтинг произведения сохраняются вместе или не
+        # сохраняются. Повторный отзыв отсекает ограничение уникальности
+        # в базе, без отдельного запроса на проверку.
+        try:
+            with transaction.atomic():
+                serializer.save(
+                    author=get_user_row(self.request.user),
+                    title=self.get_title(),
+                )
+        except IntegrityError:
+            raise ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [
+                    "Вы уже оставили обзор на это произведение!"
+                ]
+            })
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        serializer.save()
+
+
+class CategoriesViewSet(
+    BulkCreateMixin, CachedListMixin, ListCreateDestroyViewSet
+):
     """Получить список категорий, добавить или удалить категорию."""
 
+    cache_resource = "categories"
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    bulk_serializer_class = CategoryBulkSerializer
     lookup_field = "slug"
     permission_classes = (AdminOrReadOnly,)
     pagination_class = pagination.LimitOffsetPagination
@@ -82,11 +246,15 @@ class CategoriesViewSet(ListCreateDestroyViewSet):
     search_fields = ("name",)
 
 
-class GenresViewSet(ListCreateDestroyViewSet):
+class GenresViewSet(
+    BulkCreateMixin, CachedListMixin, ListCreateDestroyViewSet
+):
     """Получить список жанров, добавить или удалить жанр."""
 
+    cache_resource = "genres"
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
+    bulk_serializer_class = GenreBulkSerializer
     lookup_field = "slug"
     permission_classes = (AdminOrReadOnly,)
     pagination_class = pagination.LimitOffsetPagination
@@ -94,28 +262,115 @@ class GenresViewSet(ListCreateDestroyViewSet):
     filter_backends = (filters.SearchFilter,)
     search_fields = ("name",)
 
+    def perform_destroy(self, instance):
+        # Каскад удаляет связи жанра с каждым произведением по одной.
+        with batched_reranks():
+            instance.delete()
+
 
-class TitlesViewSet(viewsets.ModelViewSet):
+class TitlesViewSet(
+    BulkCreateMixin,
+    SparseFieldsMixin,
+    ConditionalReadMixin,
+    CachedReadMixin,
+    FastReadMixin,
+    viewsets.ModelViewSet,
+):
     """Получить список произведений и данные по одному произведению.
 
-    Также Добавить произведение, изменить и удалить его.
+    Также Добавить произведение, изменить и удалить его, в том числе
+    пачкой через bulk.
     """
 
-    queryset = Title.objects.all()
+    cache_resource = "titles"
+    bulk_serializer_class = TitleBulkSerializer
+    fast_serializer_class = TitleFastSerializer
+    # Категория подтягивается JOIN-ом, жанры одним запросом через
+    # GenreTitle, а рейтинг уже лежит в самой таблице произведений.
+    queryset = Title.objects.select_related("category").prefetch_related(
+        "genre"
+    )
     permission_classes = (AdminOrReadOnly,)
     pagination_class = pagination.LimitOffsetPagination
 
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (
+        DjangoFilterBackend,
+        TitleSearchFilter,
+        filters.OrderingFilter,
+    )
     filterset_class = TitleFilter
+    ordering_fields = ("name", "year", "rating")
+    sparse_columns = {
+        "genre": (),
+        "category": ("category__name", "category__slug"),
+    }
+    sparse_prefetch = {"genre": ("genre",)}
+
+    def perform_update(self, serializer):
+        with batched_reranks():
+            serializer.save()
 
     def get_serializer_class(self):
-        if self.action in ["list", "retrieve"]:
+        if self.action in ["list", "retrieve", "top", "trending"]:
             return TitleDisplaySerializer
         return TitleSerializer
 
+    @action(detail=False)
+    def top(self, request):
+        """Лучшие произведения по рейтингу в жанре и категории."""
+        return self.cached_response(self.top_titles, request)
+
+    def top_titles(self, request):
+        params = TopTitlesQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        titles = top_titles(**params.validated_data)
+        serializer = self.get_serializer(titles, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False)
+    def trending(self, request):
+        """Популярные сейчас произведения; фильтры те же, что у списка.
+
+        Не кешируется: популярность меняют и комментарии, а от них
+        поколение произведений не зависит.
+        """
+        params = LimitQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        titles = (
+            self.filter_queryset(self.get_queryset())
+            .filter(trending__gt=0)
+            .order_by("-trending", "pk")[:params.validated_data["limit"]]
+        )
+        return Response(self.serialize_many(titles))
+
+
+@api_view(["GET"])
+@permission_classes([IsAdmin])
+def export_data(request, resource):
+    """Потоковая выгрузка произведений, отзывов или комментариев.
+
+    Для аналитики вместо обхода страниц API, см. reviews.export.
+    """
+    if resource not in export.RESOURCES:
+        raise NotFound()
+    params = ExportQuerySerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    output = params.validated_data["output"]
+    response = StreamingHttpResponse(
+        export.export_lines(
+            resource, output, since=params.validated_data.get("since")
+        ),
+        content_type=f"{export.CONTENT_TYPES[output]}; charset=utf-8",
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="{resource}.{output}"'
+    )
+    return response
+
 
 @api_view(["POST"])
 @permission_classes([AllowAny])
+@transaction.atomic
 def signup(request):
     """Принимает почту и юзернейм, в ответ отправляет код подтверждения."""
     serializer = SignupSerializer(data=request.data)
@@ -124,16 +379,10 @@ def signup(request):
         email=serializer.validated_data["email"],
         username=serializer.validated_data["username"],
     )
+    confirmation_code = confirmation_codes.make_code(user)
 
-    confirmation_code = default_token_generator.make_token(user)
-    confirmation_code_hashed = make_password(
-        confirmation_code, salt="well"
-    )
-
-    user.confirmation_code = confirmation_code_hashed
-    user.save()
-
-    send_mail(
+    # Письмо отправит send_mail_queue, запрос его не ждет.
+    enqueue(
         "Код подтверждения",
         f"{user.username}, код: {confirmation_code} /api/v1/auth/token/",
         DOMAIN_NAME,
@@ -145,7 +394,7 @@ def signup(request):
 @api_view(["POST"])
 @permission_classes([AllowAny])
 def get_token(request):
-    """Принимает код подтверждения, сравнивает его с хешем.
+    """Принимает код подтверждения и проверяет его подпись и срок.
 
     В ответ отправляет токен.
     """
@@ -154,13 +403,13 @@ def get_token(request):
     username = serializer.data["username"]
     user = get_object_or_404(User, username=username)
     c_code = serializer.validated_data["confirmation_code"]
-    if check_password(c_code, user.confirmation_code):
-        refresh = RefreshToken.for_user(user)
+    if confirmation_codes.check_code(user, c_code):
+        refresh = RoleRefreshToken.for_user(user)
         return Response({"access": str(refresh.access_token)})
     raise ValidationError(f"Неверный код подтверждения: {c_code}!")
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     """Админ может получить список пользователей, добаввить одного.
 
     Получить, изменить его данные. Удалить его. Сам пользователь может
@@ -182,15 +431,29 @@ class UserViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,),
     )
     def about_me(self, request):
-        serializer = AdminSerializer(request.user)
-        if request.method == "PATCH":
-            serializer = AdminSerializer(
-                request.user, data=request.data, partial=True
+        if request.method == "GET":
+            serializer = self.get_serializer(get_user_row(request.user))
+        else:
+            # Изменяем свежую строку, а не копию из кеша.
+            user = get_object_or_404(User, pk=request.user.pk)
+            serializer = self.get_serializer(
+                user, data=request.data, partial=True
             )
             serializer.is_valid(raise_exception=True)
 
-            role_user = request.user.role
+            role_user = user.role
             if role_user == "moderator" or role_user == "user":
                 serializer.validated_data["role"] = role_user
             serializer.save()
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+def metrics(request):
+    """Метрики запросов всех воркеров для Prometheus.
+
+    Наружу не публикуется: nginx закрывает /metrics, Prometheus ходит
+    прямо в web:8000.
+    """
+    return HttpResponse(
+        request_metrics.render(), content_type=request_metrics.CONTENT_TYPE
+    )
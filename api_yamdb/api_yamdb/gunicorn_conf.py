@@ -0,0 +1,90 @@
+"""Настройки gunicorn для боя.
+
+    gunicorn api_yamdb.wsgi:application -c python:api_yamdb.gunicorn_conf
+
+Все подстраивается переменными окружения GUNICORN_*; ключи командной
+строки важнее этого файла. Класс воркеров GUNICORN_WORKER_CLASS:
+
+- "gthread" (по умолчанию) — cpu + 1 процессов по GUNICORN_THREADS
+  потоков: пока один поток ждет базу, другие обслуживают запросы;
+- "sync" — 2 * cpu + 1 однопоточных процессов, как советует
+  документация gunicorn.
+
+При постоянных соединениях (CONN_MAX_AGE) каждый поток каждого воркера
+держит свое соединение с PostgreSQL: workers * threads плюс mailer
+должны помещаться в max_connections базы (по умолчанию 100).
+"""
+import multiprocessing
+import os
+
+WORKER_CLASSES = ("gthread", "sync")
+
+cpus = multiprocessing.cpu_count()
+
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+if worker_class not in WORKER_CLASSES:
+    raise ValueError(
+        "GUNICORN_WORKER_CLASS должен быть одним из "
+        f"{', '.join(WORKER_CLASSES)}."
+    )
+if worker_class == "gthread":
+    workers = int(os.getenv("GUNICORN_WORKERS", cpus + 1))
+    threads = int(os.getenv("GUNICORN_THREADS", 4))
+else:
+    workers = int(os.getenv("GUNICORN_WORKERS", cpus * 2 + 1))
+    # С threads > 1 gunicorn сам переключает sync на gthread.
+    threads = 1
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = timeout
+keepalive = 5
+
+# Приложение импортируется один раз в мастере, воркеры получают его
+# через fork: быстрее старт и общие страницы памяти.
+preload_app = True
+# Перезапуск воркера после max_requests запросов страхует от утечек, а
+# разброс не дает всем воркерам уйти на перезапуск разом.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = max_requests // 10
+
+# Пульс воркеров в памяти, а не на диске контейнера.
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+
+def pre_fork(server, worker):
+    """Соединения мастера не должны достаться воркерам.
+
+    Одно соединение PostgreSQL в нескольких процессах ломает протокол, а
+    закрыть его в воркере — значит закрыть и у соседей.
+    """
+    from django.db import connections
+
+    connections.close_all()
+
+
+def worker_exit(server, worker):
+    """Воркер уходит (max_requests, остановка): последний снимок метрик."""
+    from django.conf import settings
+
+    if settings.METRICS_ENABLED:
+        from api.metrics import registry
+
+        registry.flush()
+
+
+def child_exit(server, worker):
+    """В мастере: счетчики ушедшего воркера — в общий файл, его файл — прочь.
+
+    Без этого каждый перезапуск по max_requests оставлял бы в METRICS_DIR
+    новый worker-<pid>.json, и /metrics читал бы их все.
+    """
+    from django.apps import apps
+
+    # Без preload_app Django в мастере не настроен.
+    if not apps.ready:
+        return
+    from api.metrics import retire_worker
+
+    retire_worker(worker.pid)
@@ -27,6 +27,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "api.instrumentation.InstrumentationMiddleware",
+    "api.profiling.ProfilingMiddleware",
+    "api.nplusone.QueryPatternMiddleware",
+    "api.replicas.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -65,10 +69,120 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', default='postgres'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres01'),
         'HOST': os.getenv('DB_HOST', default='db'),
-        'PORT': os.getenv('DB_PORT', default='5432')
+        'PORT': os.getenv('DB_PORT', default='5432'),
+        # Соединение живет между запросами воркера до CONN_MAX_AGE
+        # секунд. Держат их все потоки всех воркеров gunicorn, см.
+        # api_yamdb/gunicorn_conf.py и max_connections у PostgreSQL.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', default='60')),
+        # Проверка соединения перед запросом, см. api.signals; в Django
+        # 4.1+ этот ключ поддерживается самим фреймворком.
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', default='1'
+        ) == '1',
     }
 }
 
+# Реплики только для чтения, см. api.replicas: хосты через запятую в
+# DB_REPLICA_HOSTS, остальные параметры — как у основной базы.
+REPLICA_HOSTS = [
+    host.strip()
+    for host in os.getenv("DB_REPLICA_HOSTS", default="").split(",")
+    if host.strip()
+]
+DATABASE_REPLICAS = [
+    f"replica{number}" for number in range(1, len(REPLICA_HOSTS) + 1)
+]
+for alias, host in zip(DATABASE_REPLICAS, REPLICA_HOSTS):
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        # Тестовых баз на репликах не создаем.
+        "TEST": {"MIRROR": "default"},
+    }
+DATABASE_ROUTERS = ["api.replicas.ReplicaRouter"]
+# Сколько после записи клиент читает с основной базы: с запасом больше
+# обычного отставания реплик.
+REPLICA_PIN_SECONDS = 5
+REPLICA_RETRY_SECONDS = 30
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND",
+            default="django.core.cache.backends.filebased.FileBasedCache",
+        ),
+        "LOCATION": os.getenv(
+            "CACHE_LOCATION", default=os.path.join(BASE_DIR, "cache")
+        ),
+    }
+}
+
+# Кеш ответов каталога (категории, жанры, произведения). Бэкенд должен
+# быть общим для всех воркеров gunicorn, иначе сброс поколения в одном
+# воркере не увидят остальные.
+API_CACHE_ALIAS = "default"
+API_CACHE_TIMEOUT = 300
+
+# Списки произведений, отзывов и комментариев собираются из values() в
+# обход полей DRF, см. api.fast.
+API_FAST_READS = True
+
+# Сколько отзывов нужно произведению, чтобы попасть в лидерборд.
+LEADERBOARD_MIN_REVIEWS = 3
+
+# Популярность: вклад отзыва — вес плюс вес оценки, умноженный на оценку;
+# вклад комментария; за сколько секунд вклад затухает вдвое; оценки
+# меньше TRENDING_MIN_SCORE обнуляются командой decay_trending (сервис
+# trending в infra/docker-compose.yaml).
+TRENDING_REVIEW_WEIGHT = 1.0
+TRENDING_SCORE_WEIGHT = 0.1
+TRENDING_COMMENT_WEIGHT = 0.5
+TRENDING_HALF_LIFE = 60 * 60 * 24
+TRENDING_MIN_SCORE = 0.01
+
+# Сколько объектов можно создать одним запросом к .../bulk/.
+BULK_CREATE_MAX_ITEMS = 1000
+
+# Сколько строк выгрузки читать из курсора за раз, см. reviews.export.
+EXPORT_CHUNK_SIZE = 2000
+
+# Метрики запросов, см. api.instrumentation и api.metrics. Каждый воркер
+# раз в METRICS_FLUSH_INTERVAL секунд сбрасывает свои гистограммы в файл
+# в METRICS_DIR, /metrics складывает файлы всех воркеров.
+METRICS_ENABLED = True
+METRICS_DIR = os.getenv(
+    "METRICS_DIR", default=os.path.join(BASE_DIR, "metrics")
+)
+METRICS_FLUSH_INTERVAL = 10
+# Запросы дольше стольких миллисекунд пишутся в лог api.instrumentation
+# вместе с самыми долгими SQL.
+SLOW_REQUEST_MS = 500
+SLOW_REQUEST_TOP_QUERIES = 5
+
+# Поиск N+1, см. api.nplusone: "off", "warn" — в лог, "raise" — ошибка.
+# Сколько одинаковых запросов из одного места считать находкой; куда
+# дописывать находки строками JSON.
+QUERY_DETECTOR = os.getenv("QUERY_DETECTOR", default="off")
+QUERY_DETECTOR_THRESHOLD = 3
+QUERY_DETECTOR_REPORT = os.getenv("QUERY_DETECTOR_REPORT")
+
+# Выборочное профилирование запросов, см. api.profiling. Включается
+# переменной окружения; кроме доли PROFILING_SAMPLE_RATE профилируются
+# запросы с заголовком X-Profile от profile_report --token, он действует
+# PROFILING_TOKEN_MAX_AGE секунд.
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", default="") == "1"
+PROFILING_ENGINE = os.getenv("PROFILING_ENGINE", default="sampler")
+PROFILING_SAMPLE_RATE = float(
+    os.getenv("PROFILING_SAMPLE_RATE", default="0.001")
+)
+PROFILING_TOKEN_MAX_AGE = 60 * 60
+PROFILING_SAMPLER_INTERVAL = 0.005
+PROFILING_DIR = os.getenv(
+    "PROFILING_DIR", default=os.path.join(BASE_DIR, "profiles")
+)
+PROFILING_FLUSH_INTERVAL = 60
+PROFILING_MAX_FILES = 50
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -109,7 +223,7 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.RoleJWTAuthentication",
     ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 10,
@@ -120,6 +234,13 @@ SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
 
+# Кеш строк пользователей в каждом воркере, см. users.authentication.
+AUTH_USER_CACHE_SIZE = 1024
+AUTH_USER_CACHE_TTL = 60
+# Права пользователей в общем кеше; запись сбрасывается при изменении
+# пользователя, срок — страховка.
+AUTH_STATE_CACHE_TTL = 60 * 10
+
 
 # STATICFILES_DIRS = (os.path.join(BASE_DIR, "static/"),)
 
@@ -134,4 +255,13 @@ EMAIL_USE_TLS = True
 EMAIL_USE_SSL = False
 
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
+
+# Сколько секунд действует код подтверждения, см. users.tokens.
+CONFIRMATION_CODE_TIMEOUT = 60 * 60 * 24
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+
+# Очередь исходящих писем, см. users.outbox.
+OUTBOX_BATCH_SIZE = 100
+OUTBOX_MAX_ATTEMPTS = 5
+# Пауза перед первым повтором в секундах, дальше она удваивается.
+OUTBOX_RETRY_DELAY = 60
@@ -0,0 +1,32 @@
+import tempfile
+
+from .settings import *  # noqa: F401,F403
+from .settings import os
+
+# Без настроенной базы (например, в CI) тесты идут на SQLite в памяти.
+if "DB_ENGINE" not in os.environ:
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": ":memory:",
+        }
+    }
+
+# Вторая база для tests/test_replicas.py. Реплики она не получает, так
+# что «отставание» видно сразу; чтения идут на нее только в тестах,
+# которые включают DATABASE_REPLICAS.
+DATABASES["replica"] = {
+    "ENGINE": "django.db.backends.sqlite3",
+    "NAME": ":memory:",
+}
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+METRICS_DIR = os.path.join(tempfile.gettempdir(), "yamdb-test-metrics")
+
+# Новый N+1 роняет тест; см. api.nplusone.
+QUERY_DETECTOR = os.getenv("QUERY_DETECTOR", default="raise")
@@ -0,0 +1,134 @@
+"""Лидерборды: лучшие произведения по рейтингу в жанре и категории.
+
+Каждое произведение, у которого не меньше LEADERBOARD_MIN_REVIEWS
+отзывов, представлено в LeaderboardEntry строкой для каждого среза, куда
+оно попадает: каждый его жанр и «любой жанр» на его категорию и «любую
+категорию». Тогда любой top-N — один запрос по leaderboard_top_idx.
+
+Отзывы обновляют строки своего произведения через сигналы, смена
+жанров и категории перестраивает их, а rebuild_leaderboard и
+data_reloaded перестраивают весь лидерборд.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import (ExpressionWrapper, F, FloatField, OuterRef, Q,
+                              Subquery)
+from django.db.models.functions import Cast
+
+from .models import GenreTitle, LeaderboardEntry, Title
+
+TITLE_FIELDS = ("id", "category_id", "rating_sum", "rating_count")
+
+
+def min_reviews():
+    # Без отзывов нет и средней оценки.
+    return max(1, settings.LEADERBOARD_MIN_REVIEWS)
+
+
+def eligible_titles():
+    return (
+        Title.objects.filter(rating_count__gte=min_reviews())
+        .order_by("pk")
+        .values(*TITLE_FIELDS)
+    )
+
+
+def build_entries(titles):
+    """Строки лидерборда для произведений, выбранных через eligible_titles."""
+    genres = defaultdict(list)
+    pairs = GenreTitle.objects.filter(
+        title_id__in=[title["id"] for title in titles]
+    ).values_list("title_id", "genre_id")
+    for title_id, genre_id in pairs:
+        genres[title_id].append(genre_id)
+    for title in titles:
+        average = title["rating_sum"] / title["rating_count"]
+        categories = {None, title["category_id"]}
+        for genre_id in [None] + genres[title["id"]]:
+            for category_id in categories:
+                yield LeaderboardEntry(
+                    title_id=title["id"],
+                    genre_id=genre_id,
+                    category_id=category_id,
+                    average=average,
+                    review_count=title["rating_count"],
+                )
+
+
+def refresh_titles(title_ids, batch_size=10000):
+    """Перестраивает строки произведений, например после смены жанров."""
+    title_ids = sorted(title_ids)
+    for start in range(0, len(title_ids), batch_size):
+        batch = title_ids[start:start + batch_size]
+        LeaderboardEntry.objects.filter(title_id__in=batch).delete()
+        titles = list(eligible_titles().filter(pk__in=batch))
+        if titles:
+            LeaderboardEntry.objects.bulk_create(build_entries(titles))
+
+
+def update_title(title_id, count_delta):
+    """Переносит в лидерборд новый рейтинг произведения.
+
+    count_delta — на сколько изменилось число его отзывов. Обычно это
+    один UPDATE: новые значения берутся подзапросом из произведения.
+    Строки создаются или удаляются, только когда число отзывов переходит
+    порог.
+    """
+    entries = LeaderboardEntry.objects.filter(title_id=title_id)
+    if count_delta < 0 and entries.filter(
+        review_count__lte=min_reviews()
+    ).delete()[0]:
+        return
+    title = Title.objects.filter(pk=OuterRef("title_id"))
+    updated = entries.update(
+        average=Subquery(
+            title.annotate(
+                average=ExpressionWrapper(
+                    Cast("rating_sum", FloatField()) / F("rating_count"),
+                    output_field=FloatField(),
+                )
+            ).values("average")
+        ),
+        review_count=Subquery(title.values("rating_count")),
+    )
+    if not updated and count_delta > 0:
+        titles = list(eligible_titles().filter(pk=title_id))
+        if titles:
+            LeaderboardEntry.objects.bulk_create(build_entries(titles))
+
+
+def rebuild(batch_size=10000):
+    """Заполняет лидерборд заново по рейтингам произведений."""
+    created = 0
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        last_pk = 0
+        while True:
+            titles = list(
+                eligible_titles().filter(pk__gt=last_pk)[:batch_size]
+            )
+            if not titles:
+                return created
+            created += len(
+                LeaderboardEntry.objects.bulk_create(build_entries(titles))
+            )
+            last_pk = titles[-1]["id"]
+
+
+def top_titles(genre=None, category=None, limit=10):
+    """Первые limit произведений среза лидерборда.
+
+    genre и category — слаги; без них срез по всем жанрам или категориям.
+    """
+    entries = LeaderboardEntry.objects.filter(
+        Q(genre__slug=genre) if genre else Q(genre__isnull=True),
+        Q(category__slug=category) if category else Q(category__isnull=True),
+    )
+    entries = (
+        entries.select_related("title__category")
+        .prefetch_related("title__genre")
+        .order_by("-average", "-review_count", "title_id")[:limit]
+    )
+    return [entry.title for entry in entries]
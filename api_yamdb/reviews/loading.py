@@ -0,0 +1,77 @@
+"""Массовая вставка строк в обход ORM для insert_data и generate_data.
+
+На PostgreSQL строки идут через COPY, на остальных базах — пачками
+INSERT через executemany. Значения должны быть уже готовы для базы.
+"""
+import csv
+import io
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connection
+
+from . import models
+
+COPY_NULL = r"\N"
+
+
+def batches(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def copy_rows(table, columns, rows):
+    """COPY строк в таблицу PostgreSQL; columns — имена колонок в базе."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(COPY_NULL if value is None else value for value in row)
+    buffer.seek(0)
+    quote = connection.ops.quote_name
+    sql = "COPY {} ({}) FROM STDIN WITH (FORMAT csv, NULL '{}')".format(
+        quote(table), ", ".join(quote(column) for column in columns), COPY_NULL
+    )
+    with connection.cursor() as cursor:
+        cursor.cursor.copy_expert(sql, buffer)
+
+
+def insert_rows(model, fields, rows, use_copy):
+    """Вставляет кортежи значений полей fields (name или attname)."""
+    columns = [model._meta.get_field(name).column for name in fields]
+    if use_copy:
+        copy_rows(model._meta.db_table, columns, rows)
+        return
+    quote = connection.ops.quote_name
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        quote(model._meta.db_table),
+        ", ".join(quote(column) for column in columns),
+        ", ".join(["%s"] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def clear_tables(model_list):
+    """Очищает таблицы от зависимых к главным одним DELETE на таблицу.
+
+    Пользователей удаляем через ORM: на них ссылаются таблицы вне
+    загрузки (журнал админки, группы).
+    """
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in reversed(model_list):
+            if model is models.User:
+                model.objects.all().delete()
+            else:
+                cursor.execute(f"DELETE FROM {quote(model._meta.db_table)}")
+
+
+def reset_sequences(model_list):
+    """Продвигает счетчики первичных ключей после вставки с явными id."""
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), model_list):
+            cursor.execute(sql)
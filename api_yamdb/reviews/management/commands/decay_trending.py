@@ -0,0 +1,105 @@
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from reviews.models import Comment, Review, Title
+from reviews.signals import review_weight
+
+# Старше стольких периодов полураспада вклад меньше тысячной.
+REBUILD_HALF_LIVES = 10
+
+
+class Command(BaseCommand):
+    help = (
+        "Приводит оценки популярности произведений к текущему моменту. "
+        "Запускать периодически, например раз в час, или с --loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Сколько произведений обрабатывать в одной транзакции.",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Посчитать оценки заново по датам отзывов и комментариев.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Не завершаться, а повторять каждые --interval секунд.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=60 * 60,
+            help="Пауза между проходами в режиме --loop, секунды.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        if options["rebuild"]:
+            self.rebuild(batch_size)
+            return
+        while True:
+            self.decay(batch_size)
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
+
+    def decay(self, batch_size):
+        now = time.time()
+        last_pk = Title.objects.aggregate(last=Max("pk"))["last"] or 0
+        updated = 0
+        for start in range(0, last_pk, batch_size):
+            with transaction.atomic():
+                updated += Title.objects.filter(
+                    pk__gt=start, pk__lte=start + batch_size
+                ).decay_trending(now)
+        self.stdout.write(f"Обновлена популярность произведений: {updated}")
+
+    def rebuild(self, batch_size):
+        now = time.time()
+        since = datetime.now(timezone.utc) - timedelta(
+            seconds=settings.TRENDING_HALF_LIFE * REBUILD_HALF_LIVES
+        )
+        scores = defaultdict(float)
+
+        def add(title_id, weight, pub_date):
+            age = now - pub_date.timestamp()
+            scores[title_id] += weight * 0.5 ** (
+                age / settings.TRENDING_HALF_LIFE
+            )
+
+        reviews = Review.objects.filter(pub_date__gte=since).values_list(
+            "title_id", "score", "pub_date"
+        )
+        for title_id, score, pub_date in reviews.iterator():
+            add(title_id, review_weight(score), pub_date)
+        comments = Comment.objects.filter(pub_date__gte=since).values_list(
+            "review__title_id", "pub_date"
+        )
+        for title_id, pub_date in comments.iterator():
+            add(title_id, settings.TRENDING_COMMENT_WEIGHT, pub_date)
+
+        with transaction.atomic():
+            Title.objects.filter(trending__gt=0).update(
+                trending=0, trending_at=now
+            )
+            titles = [
+                Title(pk=pk, trending=score, trending_at=now)
+                for pk, score in scores.items()
+            ]
+            Title.objects.bulk_update(
+                titles, ["trending", "trending_at"], batch_size=batch_size
+            )
+        self.stdout.write(
+            f"Пересчитана популярность произведений: {len(titles)}"
+        )
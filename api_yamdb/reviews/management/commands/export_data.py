@@ -0,0 +1,69 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from reviews import export
+
+
+def parse_since(value):
+    """Момент из ISO 8601; дата без времени — ее начало."""
+    try:
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is not None:
+                since = datetime.combine(day, time.min)
+    except ValueError:
+        since = None
+    if since is None:
+        raise CommandError("Неверная дата в --since.")
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+class Command(BaseCommand):
+    help = (
+        "Выгружает произведения, отзывы или комментарии в NDJSON или CSV. "
+        "Память не зависит от размера таблицы."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("resource", choices=export.RESOURCES)
+        parser.add_argument(
+            "--format", choices=export.FORMATS, default="ndjson"
+        )
+        parser.add_argument(
+            "--since",
+            help=(
+                "Только изменения с этого момента, ISO 8601, например "
+                "2024-01-31 или 2024-01-31T12:00:00+03:00."
+            ),
+        )
+        parser.add_argument(
+            "--output", help="Файл для выгрузки; по умолчанию stdout."
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            help="Сколько строк читать из курсора за раз.",
+        )
+
+    def handle(self, *args, **options):
+        since = options["since"]
+        if since is not None:
+            since = parse_since(since)
+        lines = export.export_lines(
+            options["resource"],
+            options["format"],
+            since=since,
+            chunk_size=options["chunk_size"],
+        )
+        if options["output"] is None:
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        # newline="": переводы строк в CSV уже расставил csv.writer.
+        with open(options["output"], "w", encoding="utf-8", newline="") as f:
+            f.writelines(lines)
@@ -0,0 +1,337 @@
+"""Синтетические данные заданного объема для нагрузочных тестов.
+
+Популярность произведений распределена по Зипфу: немногие собирают
+большую часть отзывов, а у длинного хвоста их единицы. Комментарии
+достаются отзывам равномерно и потому тоже тянутся к популярным
+произведениям. Длина текстов — логнормальная, свежих отзывов больше,
+чем старых.
+
+Строки собираются кортежами без объектов модели и вставляются пачками
+через reviews.loading. Результат зависит только от --seed и --end:
+у каждой таблицы свой генератор случайных чисел, поэтому, например,
+число комментариев не меняет отзывы.
+"""
+import math
+import random
+import time
+from array import array
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from reviews import models
+from reviews.loading import batches, clear_tables, insert_rows, reset_sequences
+from reviews.signals import data_reloaded, muted
+from users.models import ADMIN, MODERATOR, USER
+
+WORDS = (
+    "ночь", "город", "море", "звезда", "дорога", "тайна", "война", "мир",
+    "сердце", "небо", "остров", "зима", "лето", "тень", "огонь", "ветер",
+    "память", "дом", "река", "песня", "время", "свет", "сад", "охота",
+    "сюжет", "актер", "финал", "герой", "автор", "книга", "глава", "сцена",
+    "очень", "совсем", "слишком", "немного", "хорошо", "плохо", "скучно",
+    "сильно", "и", "но", "а", "не", "в", "на", "про", "как", "это", "был",
+)
+# Сколько разных текстов нагенерировать заранее: собирать текст заново
+# для каждого из миллионов отзывов слишком долго.
+TEXT_POOL = 2000
+# Ограничение year_lte_now в базе зафиксировало год создания миграции.
+LAST_YEAR = 2020
+MODEL_LIST = [
+    models.User,
+    models.Category,
+    models.Genre,
+    models.Title,
+    models.GenreTitle,
+    models.Review,
+    models.Comment,
+]
+
+
+def zipf_cum_weights(count, exponent):
+    """Накопленные веса рангов 1..count для random.choices."""
+    ranks = range(1, count + 1)
+    return list(accumulate(1 / rank ** exponent for rank in ranks))
+
+
+def spread(total, weights, cap):
+    """Делит total пропорционально весам, не больше cap на каждого."""
+    weight_sum = sum(weights)
+    counts = [min(cap, int(total * weight / weight_sum)) for weight in weights]
+    left = total - sum(counts)
+    while left:
+        for idx, count in enumerate(counts):
+            if count < cap:
+                counts[idx] += 1
+                left -= 1
+                if not left:
+                    break
+    return counts
+
+
+def coprime_step(rnd, modulo):
+    step = rnd.randrange(1, modulo) if modulo > 1 else 1
+    while math.gcd(step, modulo) != 1:
+        step = rnd.randrange(1, modulo)
+    return step
+
+
+class Command(BaseCommand):
+    help = (
+        "Заменяет данные сгенерированными: пользователи, каталог, отзывы "
+        "и комментарии заданного объема. Для нагрузочных тестов."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in (
+            ("users", 10000),
+            ("categories", 10),
+            ("genres", 30),
+            ("titles", 100000),
+            ("reviews", 1000000),
+            ("comments", 1000000),
+        ):
+            parser.add_argument(f"--{name}", type=int, default=default)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--zipf",
+            type=float,
+            default=1.1,
+            help="Показатель распределения популярности произведений.",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=365,
+            help="За сколько дней до --end раскидать отзывы.",
+        )
+        parser.add_argument(
+            "--end",
+            help="Дата последних отзывов, YYYY-MM-DD; по умолчанию сегодня.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Сколько строк вставлять за один запрос.",
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Не использовать COPY даже на PostgreSQL.",
+        )
+
+    def random(self, name):
+        return random.Random(f"{self.seed}:{name}")
+
+    def timestamp(self, seconds):
+        return self.adapt(datetime.fromtimestamp(seconds, timezone.utc))
+
+    def text_pool(self, name, mu, sigma):
+        rnd = self.random(f"{name}-texts")
+        pool = []
+        for _ in range(TEXT_POOL):
+            length = min(500, max(1, int(rnd.lognormvariate(mu, sigma))))
+            pool.append(" ".join(rnd.choices(WORDS, k=length)).capitalize())
+        return pool
+
+    def users(self, count):
+        rnd = self.random("users")
+        joined = self.timestamp(self.start)
+        for idx in range(1, count + 1):
+            role = USER
+            if idx == 1:
+                role = ADMIN
+            elif rnd.random() < 0.01:
+                role = MODERATOR
+            yield (
+                idx, "!", None, False, f"user{idx}", "", "",
+                f"user{idx}@yamdb.fake", False, True, joined, "", role,
+            )
+
+    def titles(self, count, categories):
+        rnd = self.random("titles")
+        descriptions = self.text_pool("titles", 3.5, 0.6)
+        cum_weights = zipf_cum_weights(categories, 1.0)
+        ids = range(1, categories + 1)
+        modified = self.timestamp(self.end)
+        for idx in range(1, count + 1):
+            name = " ".join(rnd.choices(WORDS[:32], k=rnd.randint(1, 4)))
+            category = None
+            if categories and rnd.random() > 0.05:
+                category = rnd.choices(ids, cum_weights=cum_weights)[0]
+            yield (
+                idx, name.capitalize()[:64], rnd.randint(1900, LAST_YEAR),
+                rnd.choice(descriptions), category, None, 0, 0, 0.0, 0.0,
+                modified,
+            )
+
+    def genre_titles(self, titles, genres):
+        if not genres:
+            return
+        rnd = self.random("genre-titles")
+        cum_weights = zipf_cum_weights(genres, 1.0)
+        ids = range(1, genres + 1)
+        pk = 0
+        for title_id in range(1, titles + 1):
+            picked = rnd.choices(ids, cum_weights=cum_weights, k=3)
+            for genre_id in sorted(set(picked[:rnd.randint(1, 3)])):
+                pk += 1
+                yield pk, title_id, genre_id
+
+    def reviews(self, total, titles, users, exponent, dates):
+        """Отзывы по произведениям; даты складываются в dates."""
+        if not total:
+            return
+        rnd = self.random("reviews")
+        texts = self.text_pool("reviews", 3.0, 0.9)
+        ranked = list(range(1, titles + 1))
+        rnd.shuffle(ranked)
+        weights = [1 / rank ** exponent for rank in range(1, titles + 1)]
+        counts = spread(total, weights, users)
+        span = self.end - self.start
+        pk = 0
+        for title_id, count in zip(ranked, counts):
+            quality = rnd.gauss(6.5, 1.5)
+            # Разные авторы без выборки без повторений: шаг, взаимно
+            # простой с числом пользователей, обходит их всех.
+            author = rnd.randrange(users)
+            step = coprime_step(rnd, users)
+            for _ in range(count):
+                pk += 1
+                score = min(10, max(1, round(rnd.gauss(quality, 2))))
+                # Квадрат сдвигает даты к концу периода.
+                published = self.end - span * rnd.random() ** 2
+                dates.append(published)
+                stamp = self.timestamp(published)
+                yield (
+                    pk, title_id, author + 1, rnd.choice(texts), score,
+                    stamp, stamp,
+                )
+                author = (author + step) % users
+
+    def comments(self, total, users, dates):
+        rnd = self.random("comments")
+        texts = self.text_pool("comments", 2.3, 0.8)
+        for pk in range(1, total + 1):
+            review = rnd.randrange(len(dates))
+            # Обсуждение затухает за несколько дней после отзыва.
+            published = min(
+                self.end, dates[review] + rnd.expovariate(1 / 259200)
+            )
+            stamp = self.timestamp(published)
+            yield (
+                pk, review + 1, rnd.randrange(users) + 1, rnd.choice(texts),
+                stamp, stamp,
+            )
+
+    def insert(self, model, fields, rows):
+        loaded = 0
+        started = time.monotonic()
+        for batch in batches(rows, self.batch_size):
+            insert_rows(model, fields, batch, self.use_copy)
+            loaded += len(batch)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{model.__name__}: {loaded} строк, "
+                f"{loaded / max(elapsed, 1e-9):.0f} строк/с",
+                ending="\r",
+            )
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            f"{model.__name__}: {loaded} строк за {elapsed:.1f} с "
+            f"({loaded / max(elapsed, 1e-9):.0f} строк/с)"
+        )
+
+    def check_options(self, options):
+        if any(
+            options[name] < 0
+            for name in ("users", "categories", "genres", "titles",
+                         "reviews", "comments")
+        ):
+            raise CommandError("Объемы не могут быть отрицательными.")
+        if options["reviews"] > options["titles"] * options["users"]:
+            raise CommandError(
+                "Отзывов больше, чем пар произведение и автор: "
+                "у автора только один отзыв на произведение."
+            )
+        if options["comments"] and not (
+            options["reviews"] and options["users"]
+        ):
+            raise CommandError("Комментариям нужны отзывы и пользователи.")
+        if options["end"] is None:
+            return timezone.now().date()
+        try:
+            end = parse_date(options["end"])
+        except ValueError:
+            end = None
+        if end is None:
+            raise CommandError("Неверная дата в --end.")
+        return end
+
+    def handle(self, *args, **options):
+        end = self.check_options(options)
+        self.seed = options["seed"]
+        self.batch_size = options["batch_size"]
+        self.use_copy = (
+            connection.vendor == "postgresql" and not options["no_copy"]
+        )
+        self.adapt = connection.ops.adapt_datetimefield_value
+        self.end = datetime(
+            end.year, end.month, end.day, tzinfo=timezone.utc
+        ).timestamp()
+        self.start = self.end - timedelta(days=options["days"]).total_seconds()
+        dates = array("d")
+        with transaction.atomic(), muted():
+            clear_tables(MODEL_LIST + [models.LeaderboardEntry])
+            self.insert(
+                models.User,
+                ("id", "password", "last_login", "is_superuser", "username",
+                 "first_name", "last_name", "email", "is_staff", "is_active",
+                 "date_joined", "bio", "role"),
+                self.users(options["users"]),
+            )
+            for model, count in (
+                (models.Category, options["categories"]),
+                (models.Genre, options["genres"]),
+            ):
+                name = model._meta.model_name
+                self.insert(model, ("id", "name", "slug"), (
+                    (idx, f"{model._meta.verbose_name} {idx}", f"{name}-{idx}")
+                    for idx in range(1, count + 1)
+                ))
+            self.insert(
+                models.Title,
+                ("id", "name", "year", "description", "category_id",
+                 "rating", "rating_sum", "rating_count", "trending",
+                 "trending_at", "modified"),
+                self.titles(options["titles"], options["categories"]),
+            )
+            self.insert(
+                models.GenreTitle,
+                ("id", "title_id", "genre_id"),
+                self.genre_titles(options["titles"], options["genres"]),
+            )
+            self.insert(
+                models.Review,
+                ("id", "title_id", "author_id", "text", "score", "pub_date",
+                 "modified"),
+                self.reviews(
+                    options["reviews"], options["titles"], options["users"],
+                    options["zipf"], dates,
+                ),
+            )
+            self.insert(
+                models.Comment,
+                ("id", "review_id", "author_id", "text", "pub_date",
+                 "modified"),
+                self.comments(options["comments"], options["users"], dates),
+            )
+            reset_sequences(MODEL_LIST)
+            models.Title.objects.recalculate_rating()
+        data_reloaded.send(sender=models.Title)
+        call_command("decay_trending", rebuild=True, stdout=self.stdout)
@@ -1,9 +1,16 @@
 import csv
 import os
+import time
+from collections import Counter
 
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
 from reviews import models
+from reviews.loading import batches, clear_tables, copy_rows, reset_sequences
+from reviews.signals import data_reloaded, muted
 
 FILES_MODELS = {
     "category.csv": "Category",
@@ -15,67 +22,340 @@ FILES_MODELS = {
     "genre_title.csv": "GenreTitle",
 }
 
-PK_FIELDS = {"author": "User", "category": "Category"}
+# Порядок загрузки: сначала те, на кого ссылаются остальные.
+FILENAMES = [
+    "users.csv",
+    "category.csv",
+    "genre.csv",
+    "titles.csv",
+    "genre_title.csv",
+    "review.csv",
+    "comments.csv",
+]
+
+
+def read_rows(file_path):
+    """Лениво отдает строки CSV: заголовок и далее списки значений."""
+    with open(file_path, encoding="UTF-8") as csv_file:
+        for row in csv.reader(csv_file, delimiter=","):
+            if row:
+                yield [word.strip() for word in row]
 
 
 class Command(BaseCommand):
-    def send_to_db(self, fields, values, model_name):
-        model = getattr(models, model_name)
-        model.objects.all().delete()
-
-        # Заменим числа на объекты, где встречаются ForeignKey
-        # Если название поля есть в PK_FIELDS, то это ключ, а не просто число
-        fks = []
-        for word in fields:
-            if word in PK_FIELDS and len(word) > 2:
-                fk_index = fields.index(word)
-                fk_obj = getattr(models, PK_FIELDS.get(word))
-                fks.append((fk_index, fk_obj))
-
-        for row in values:
-            # Если список ключей не пуст, надо найти объекты и записать по
-            # нужным индексам
-            if fks:
-                for fk in fks:
-                    fk_ind = fk[0]
-                    fk_obj = fk[1]
-                    found_obj = fk_obj.objects.get(pk=row[fk_ind])
-                    row[fk_ind] = found_obj
-
-            new_row = dict(zip(fields, row))
-            model.objects.create(**new_row)
-
-    def handle(self, *args, **kwargs):
-        files_dir = os.path.join(settings.STATICFILES_DIRS[0], "data")
-        # Надежнее вручную установить порядок обработки файлов,
-        # т.к. они могут зависеть от данных в других файлах
-        # Сначала хотел брать их из аргументов, но не нашел смысла в этом.
-        filenames = [
-            "users.csv",
-            "review.csv",
-            "comments.csv",
-            "category.csv",
-            "titles.csv",
-            "genre.csv",
-            "genre_title.csv",
+    help = "Загружает данные из CSV, заменяя содержимое таблиц или сверяя его."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--data-dir",
+            default=os.path.join(settings.STATIC_ROOT, "data"),
+            help="Каталог с CSV-файлами.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Сколько строк вставлять за один запрос.",
+        )
+        parser.add_argument(
+            "--sync",
+            action="store_true",
+            help=(
+                "Не очищать таблицы, а сверить CSV с базой по id или slug: "
+                "добавить новые строки и обновить измененные поля."
+            ),
+        )
+        parser.add_argument(
+            "--delete-missing",
+            action="store_true",
+            help=(
+                "При --sync удалить строки, которых нет в CSV. "
+                "Пользователей не трогает, см. --delete-missing-users."
+            ),
+        )
+        parser.add_argument(
+            "--delete-missing-users",
+            action="store_true",
+            help=(
+                "С --delete-missing удалять и пользователей, которых нет в "
+                "users.csv, вместе с их отзывами и комментариями."
+            ),
+        )
+        parser.add_argument(
+            "--no-copy",
+            action="store_true",
+            help="Не использовать COPY даже на PostgreSQL.",
+        )
+
+    def get_columns(self, model, header):
+        """Поля модели по заголовку CSV.
+
+        Для внешних ключей значение пишется сразу в *_id, без загрузки
+        связанного объекта.
+        """
+        fields = {}
+        for field in model._meta.concrete_fields:
+            fields[field.name] = field
+            fields[field.attname] = field
+        try:
+            return [fields[name] for name in header]
+        except KeyError as error:
+            raise CommandError(
+                f"{model.__name__}: неизвестная колонка {error}"
+            )
+
+    def build_objects(self, model, columns, rows, known_ids, key=None):
+        """Создает объекты модели, пропуская строки с висячими ключами.
+
+        Ключи пропущенных строк все равно попадают в seen: строка есть в
+        CSV, и --delete-missing не должен удалять ее из базы.
+        """
+        for row in rows:
+            values = {}
+            for field, raw in zip(columns, row):
+                if raw == "" and field.null:
+                    value = None
+                else:
+                    try:
+                        value = field.to_python(raw)
+                    except ValidationError as error:
+                        raise CommandError(
+                            f"{model.__name__}.{field.name}: {error.messages}"
+                        )
+                values[field.attname] = value
+            if any(
+                field.is_relation
+                and values[field.attname] is not None
+                and values[field.attname] not in known_ids[field.name]
+                for field in columns
+            ):
+                self.skipped += 1
+                if key is not None:
+                    self.seen.add(values[key])
+                continue
+            yield model(**values)
+
+    def copy_batch(self, model, objs):
+        fields = [
+            field
+            for field in model._meta.concrete_fields
+            if not (field.primary_key and objs[0].pk is None)
+        ]
+        copy_rows(
+            model._meta.db_table,
+            [field.column for field in fields],
+            (
+                [
+                    field.get_db_prep_save(
+                        field.pre_save(obj, True), connection
+                    )
+                    for field in fields
+                ]
+                for obj in objs
+            ),
+        )
+
+    def insert(self, model, objs):
+        if self.use_copy:
+            self.copy_batch(model, objs)
+        else:
+            model.objects.bulk_create(objs)
+        self.touch_titles(model, objs)
+        self.stats["создано"] += len(objs)
+
+    def touch_titles(self, model, objs):
+        """Запоминает произведения, чей рейтинг или лидерборд изменился."""
+        if model is models.Title:
+            self.touched_titles.update(obj.pk for obj in objs)
+        elif model in (models.Review, models.GenreTitle):
+            self.touched_titles.update(obj.title_id for obj in objs)
+
+    def sync_batch(self, model, columns, key, objs):
+        """Вставляет новые строки и обновляет только изменившиеся поля."""
+        # Даты с auto_now_add выставляет Django, из CSV они не берутся.
+        compared = [
+            field.attname
+            for field in columns
+            if field.attname != key
+            and not getattr(field, "auto_now_add", False)
+            and not getattr(field, "auto_now", False)
         ]
-        for filename in filenames:
-            model_name = FILES_MODELS.get(filename)
-            # Добавляем данные только в модели, которые уже созданы в БД
-            if not hasattr(models, model_name):
+        existing = {
+            row[key]: row
+            for row in model.objects.filter(
+                **{f"{key}__in": [getattr(obj, key) for obj in objs]}
+            ).values("pk", key, *compared)
+        }
+        new, changed = [], {}
+        for obj in objs:
+            self.seen.add(getattr(obj, key))
+            row = existing.get(getattr(obj, key))
+            if row is None:
+                new.append(obj)
                 continue
+            fields = tuple(
+                name for name in compared if getattr(obj, name) != row[name]
+            )
+            if fields:
+                obj.pk = row["pk"]
+                changed.setdefault(fields, []).append(obj)
+                # Отзыв или жанр мог переехать к другому произведению.
+                if "title_id" in row:
+                    self.touched_titles.add(row["title_id"])
+                self.touch_titles(model, [obj])
+        if new:
+            self.insert(model, new)
+        # bulk_update не вызывает pre_save, и auto_now-поля (modified для
+        # выгрузки изменений) сами не сдвигаются.
+        touched = tuple(
+            field.attname
+            for field in model._meta.concrete_fields
+            if getattr(field, "auto_now", False)
+        )
+        now = timezone.now()
+        for fields, group in changed.items():
+            for obj in group:
+                for name in touched:
+                    setattr(obj, name, now)
+            model.objects.bulk_update(group, fields + touched)
+            self.stats["обновлено"] += len(group)
+
+    def delete_missing(self, model, key):
+        """Удаляет пачками строки, которых больше нет в CSV."""
+        missing = [
+            value
+            for value in model.objects.values_list(key, flat=True).iterator()
+            if value not in self.seen
+        ]
+        for batch in batches(missing, self.batch_size):
+            queryset = model.objects.filter(**{f"{key}__in": batch})
+            self.touched_titles.update(self.affected_titles(model, queryset))
+            queryset.delete()
+            self.stats["удалено"] += len(batch)
 
-            file_path = os.path.join(files_dir, filename)
-            with open(file_path, encoding="UTF-8") as csv_file:
-                csv_reader = csv.reader(csv_file, delimiter=",")
-                fields, values = [], []
-                for idx, row in enumerate(csv_reader):
-                    if row == "":
-                        continue
-                    # Названия полей сохраняем отдельно
-                    if idx == 0:
-                        fields = [word.strip() for word in row]
-                        continue
-                    values.append([word.strip() for word in row])
-
-                self.send_to_db(fields, values, model_name)
+    def affected_titles(self, model, queryset):
+        """Произведения, чей рейтинг или лидерборд изменит удаление.
+
+        Сигналы заглушены, а каскад удаляет отзывы и связи с жанрами
+        молча: их произведения нужно найти до удаления.
+        """
+        if model in (models.Review, models.GenreTitle):
+            return queryset.values_list("title_id", flat=True)
+        if model is models.User:
+            return models.Review.objects.filter(
+                author__in=queryset
+            ).values_list("title_id", flat=True)
+        if model is models.Genre:
+            return models.GenreTitle.objects.filter(
+                genre__in=queryset
+            ).values_list("title_id", flat=True)
+        if model is models.Category:
+            return models.Title.objects.filter(
+                category__in=queryset
+            ).values_list("pk", flat=True)
+        # Удаленные произведения пересчитывать незачем.
+        return ()
+
+    def get_key(self, model, columns):
+        """Поле, по которому строки CSV сопоставляются с базой."""
+        names = {field.name for field in columns}
+        if "id" in names:
+            return "id"
+        if "slug" in names:
+            return "slug"
+        raise CommandError(
+            f"{model.__name__}: для синхронизации нужна колонка id или slug"
+        )
+
+    def send_to_db(self, file_path, model):
+        rows = read_rows(file_path)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = self.get_columns(model, header)
+        key = self.get_key(model, columns) if self.sync else None
+        # Множества существующих ключей загружаются один раз на файл.
+        known_ids = {
+            field.name: set(
+                field.related_model.objects.values_list(
+                    field.target_field.attname, flat=True
+                )
+            )
+            for field in columns
+            if field.is_relation
+        }
+        self.skipped = 0
+        self.seen = set()
+        self.stats = Counter()
+        loaded = 0
+        started = time.monotonic()
+        objs = self.build_objects(model, columns, rows, known_ids, key)
+        for batch in batches(objs, self.batch_size):
+            if self.sync:
+                self.sync_batch(model, columns, key, batch)
+            else:
+                self.insert(model, batch)
+            loaded += len(batch)
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"{model.__name__}: {loaded} строк, "
+                f"{loaded / max(elapsed, 1e-9):.0f} строк/с",
+                ending="\r",
+            )
+        if self.sync and self.delete_missing_rows and (
+            model is not models.User or self.delete_missing_users
+        ):
+            self.delete_missing(model, key)
+        elapsed = time.monotonic() - started
+        stats = ", ".join(
+            f"{action} {self.stats[action]}"
+            for action in ("создано", "обновлено", "удалено")
+        )
+        self.stdout.write(
+            f"{model.__name__}: {stats}, пропущено {self.skipped} "
+            f"за {elapsed:.1f} с ({loaded / max(elapsed, 1e-9):.0f} строк/с)"
+        )
+
+    def handle(self, *args, **options):
+        files_dir = options["data_dir"]
+        self.batch_size = options["batch_size"]
+        self.sync = options["sync"]
+        self.delete_missing_rows = options["delete_missing"]
+        self.delete_missing_users = options["delete_missing_users"]
+        self.use_copy = (
+            connection.vendor == "postgresql" and not options["no_copy"]
+        )
+        self.touched_titles = set()
+        if self.delete_missing_rows and not self.sync:
+            raise CommandError("--delete-missing работает только с --sync")
+        if self.delete_missing_users and not self.delete_missing_rows:
+            raise CommandError(
+                "--delete-missing-users работает только с --delete-missing"
+            )
+        model_list = [
+            getattr(models, FILES_MODELS[filename]) for filename in FILENAMES
+        ]
+        for filename in FILENAMES:
+            if not os.path.isfile(os.path.join(files_dir, filename)):
+                raise CommandError(f"Нет файла {filename} в {files_dir}")
+        with transaction.atomic(), muted():
+            if not self.sync:
+                # Лидерборд ссылается на произведения, жанры и категории,
+                # а заполнит его заново data_reloaded.
+                clear_tables(model_list + [models.LeaderboardEntry])
+            for filename, model in zip(FILENAMES, model_list):
+                self.send_to_db(os.path.join(files_dir, filename), model)
+            # Ключи пришли из файлов, счетчики первичных ключей нужно
+            # продвинуть вручную.
+            reset_sequences(model_list)
+            if self.sync:
+                for batch in batches(self.touched_titles, self.batch_size):
+                    models.Title.objects.filter(
+                        pk__in=batch
+                    ).recalculate_rating()
+            else:
+                models.Title.objects.recalculate_rating()
+        data_reloaded.send(
+            sender=models.Title,
+            title_ids=self.touched_titles if self.sync else None,
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from reviews import leaderboard
+
+
+class Command(BaseCommand):
+    help = "Перестраивает лидерборды произведений по рейтингу."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Сколько произведений обрабатывать за один запрос.",
+        )
+
+    def handle(self, *args, **options):
+        created = leaderboard.rebuild(options["batch_size"])
+        self.stdout.write(f"Строк в лидерборде: {created}")
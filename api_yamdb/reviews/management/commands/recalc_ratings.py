@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from reviews.models import Title
+from reviews.signals import data_reloaded
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рейтинг произведений по отзывам."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Сколько произведений пересчитывать в одной транзакции.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        last_pk = Title.objects.aggregate(last=Max("pk"))["last"] or 0
+        updated = 0
+        # Идем диапазонами первичного ключа, чтобы не держать блокировку
+        # на всей таблице сразу.
+        for start in range(0, last_pk, batch_size):
+            with transaction.atomic():
+                updated += Title.objects.filter(
+                    pk__gt=start, pk__lte=start + batch_size
+                ).recalculate_rating()
+        data_reloaded.send(sender=Title)
+        self.stdout.write(f"Пересчитан рейтинг произведений: {updated}")
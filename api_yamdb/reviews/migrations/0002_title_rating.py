@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:07
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def fill_rating(apps, schema_editor):
+    Title = apps.get_model("reviews", "Title")
+    Review = apps.get_model("reviews", "Review")
+    totals = (
+        Review.objects.order_by()
+        .values("title")
+        .annotate(total=Sum("score"), count=Count("pk"))
+    )
+    for row in totals.iterator():
+        Title.objects.filter(pk=row["title"]).update(
+            rating_sum=row["total"],
+            rating_count=row["count"],
+            rating=(2 * row["total"] + row["count"]) // (2 * row["count"]),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='rating',
+            field=models.PositiveSmallIntegerField(blank=True, db_index=True, null=True, verbose_name='Рейтинг'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество оценок'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Сумма оценок'),
+        ),
+        migrations.RunPython(fill_rating, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:16
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0003_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='comment',
+            options={'ordering': ['-pub_date', '-id'], 'verbose_name': 'Комментарии'},
+        ),
+        migrations.AlterModelOptions(
+            name='review',
+            options={'ordering': ['-pub_date', '-id'], 'verbose_name': 'Обзор'},
+        ),
+    ]
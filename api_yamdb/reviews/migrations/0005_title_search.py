@@ -0,0 +1,63 @@
+from django.db import migrations
+
+# Словарь должен совпадать с reviews.search.SEARCH_CONFIG.
+FORWARD_SQL = [
+    """
+    ALTER TABLE reviews_title ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+        || setweight(to_tsvector('russian', coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX reviews_title_search_idx "
+    "ON reviews_title USING gin (search_vector)",
+]
+
+# pg_trgm входит в contrib и есть почти везде, но не обязателен: без него
+# поиск работает только по search_vector.
+TRIGRAM_SQL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    # Совпадает с выражением, которое Django строит для name__icontains.
+    "CREATE INDEX reviews_title_name_trgm_idx "
+    "ON reviews_title USING gin (UPPER(name::text) gin_trgm_ops)",
+]
+
+BACKWARD_SQL = [
+    "DROP INDEX IF EXISTS reviews_title_name_trgm_idx",
+    "DROP INDEX IF EXISTS reviews_title_search_idx",
+    "ALTER TABLE reviews_title DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def forwards(apps, schema_editor):
+    # Индекс FTS5 для SQLite создается в post_migrate, см. reviews.search.
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in FORWARD_SQL:
+        schema_editor.execute(sql)
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+        )
+        if cursor.fetchone() is None:
+            return
+    for sql in TRIGRAM_SQL:
+        schema_editor.execute(sql)
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in BACKWARD_SQL:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0004_feed_ordering'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
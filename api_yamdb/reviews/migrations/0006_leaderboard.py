@@ -0,0 +1,72 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:44
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_leaderboard(apps, schema_editor):
+    Title = apps.get_model("reviews", "Title")
+    GenreTitle = apps.get_model("reviews", "GenreTitle")
+    LeaderboardEntry = apps.get_model("reviews", "LeaderboardEntry")
+    titles = Title.objects.filter(
+        rating_count__gte=settings.LEADERBOARD_MIN_REVIEWS
+    )
+    genres = {}
+    for title_id, genre_id in GenreTitle.objects.filter(
+        title__in=titles
+    ).values_list("title_id", "genre_id").iterator():
+        genres.setdefault(title_id, []).append(genre_id)
+    LeaderboardEntry.objects.bulk_create(
+        LeaderboardEntry(
+            title_id=title.pk,
+            genre_id=genre_id,
+            category_id=category_id,
+            average=title.rating_sum / title.rating_count,
+            review_count=title.rating_count,
+        )
+        for title in titles.iterator()
+        for genre_id in [None] + genres.get(title.pk, [])
+        for category_id in {None, title.category_id}
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_title_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('average', models.FloatField(verbose_name='Средняя оценка')),
+                ('review_count', models.PositiveIntegerField(verbose_name='Количество оценок')),
+            ],
+            options={
+                'verbose_name': 'Место в лидерборде',
+            },
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='category',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.Category'),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='genre',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reviews.Genre'),
+        ),
+        migrations.AddField(
+            model_name='leaderboardentry',
+            name='title',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to='reviews.Title'),
+        ),
+        migrations.AddIndex(
+            model_name='leaderboardentry',
+            index=models.Index(fields=['genre', 'category', '-average', '-review_count'], name='leaderboard_top_idx'),
+        ),
+        migrations.RunPython(fill_leaderboard, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-17 07:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0006_leaderboard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='title',
+            name='trending',
+            field=models.FloatField(db_index=True, default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddField(
+            model_name='title',
+            name='trending_at',
+            field=models.FloatField(default=0, editable=False),
+        ),
+    ]
@@ -1,9 +1,15 @@
+import time
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
-from django.db.models import Avg
+from django.db.models import Case, Count, F, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Coalesce, Least, Now, Power
 from django.utils import timezone
 
+from .search import search_titles
+
 User = get_user_model()
 
 
@@ -29,11 +35,117 @@ class Category(models.Model):
         verbose_name = "Категория"
 
 
+def trending_fields(weight, now=None):
+    """Поля UPDATE, приводящие оценку популярности к моменту now.
+
+    Накопленная оценка затухает вдвое за TRENDING_HALF_LIFE секунд с
+    прошлого обновления строки, затем к ней прибавляется weight.
+    """
+    now = time.time() if now is None else now
+    # Дальше множитель все равно что ноль, а PostgreSQL на исчезающе
+    # малой степени падает с ошибкой.
+    half_lives = Least(
+        (now - F("trending_at")) / settings.TRENDING_HALF_LIFE, 1000.0
+    )
+    return {
+        "trending": F("trending") * Power(0.5, half_lives) + weight,
+        "trending_at": now,
+    }
+
+
+class TitleQuerySet(models.QuerySet):
+    def shift_rating(self, score_delta, count_delta, trending=0):
+        """Сдвигает сумму оценок и число отзывов одним UPDATE.
+
+        Рейтинг пересчитывается в том же запросе из новых значений,
+        поэтому параллельные отзывы не затирают друг друга. trending
+        прибавляется к оценке популярности в том же запросе. Рейтинг
+        экспортируется, поэтому сдвигается и время изменения.
+        """
+        new_sum = F("rating_sum") + score_delta
+        new_count = F("rating_count") + count_delta
+        extra = trending_fields(trending) if trending else {}
+        return self.update(
+            **extra,
+            rating_sum=new_sum,
+            rating_count=new_count,
+            modified=Now(),
+            # Целочисленное деление с округлением половины вверх.
+            rating=Case(
+                When(rating_count__lte=-count_delta, then=None),
+                default=(2 * new_sum + new_count) / (2 * new_count),
+                output_field=models.PositiveSmallIntegerField(),
+            ),
+        )
+
+    def recalculate_rating(self):
+        """Пересчитывает рейтинг по отзывам без выборки в Python."""
+        reviews = (
+            Review.objects.filter(title=OuterRef("pk"))
+            .order_by()
+            .values("title")
+        )
+        self.update(
+            rating_sum=Coalesce(
+                Subquery(reviews.annotate(total=Sum("score")).values("total")),
+                0,
+            ),
+            rating_count=Coalesce(
+                Subquery(reviews.annotate(total=Count("pk")).values("total")),
+                0,
+            ),
+        )
+        return self.shift_rating(0, 0)
+
+    def bump_trending(self, weight):
+        """Прибавляет weight к оценке популярности одним UPDATE."""
+        return self.update(**trending_fields(weight))
+
+    def decay_trending(self, now=None):
+        """Приводит оценки популярности к текущему моменту.
+
+        Совсем затухшие оценки обнуляются, чтобы выпасть из выборки.
+        """
+        decayed = self.filter(trending__gt=0)
+        updated = decayed.update(**trending_fields(0, now))
+        if updated:
+            decayed.filter(
+                trending__lt=settings.TRENDING_MIN_SCORE
+            ).update(trending=0)
+        return updated
+
+    def search(self, text):
+        """Поиск по названию и описанию, самые релевантные первыми."""
+        return search_titles(self, text)
+
+    def delete(self):
+        # signals импортирует модели, поэтому импорт здесь.
+        from .signals import deleting_titles
+
+        with deleting_titles(self.values_list("pk", flat=True)):
+            return super().delete()
+
+
 class Title(models.Model):
     name = models.CharField(max_length=64)
     year = models.PositiveSmallIntegerField(verbose_name="Год выхода")
     rating = models.PositiveSmallIntegerField(
-        blank=True, null=True, verbose_name="Рейтинг"
+        blank=True, null=True, db_index=True, verbose_name="Рейтинг"
+    )
+    rating_sum = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Сумма оценок"
+    )
+    rating_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name="Количество оценок"
+    )
+    # Оценка популярности на момент trending_at (секунды эпохи Unix).
+    trending = models.FloatField(
+        default=0, db_index=True, editable=False, verbose_name="Популярность"
+    )
+    trending_at = models.FloatField(default=0, editable=False)
+    # Для выгрузки изменений с заданного момента, см. reviews.export.
+    modified = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name="Изменено"
     )
     description = models.TextField(
         blank=True, null=True, verbose_name="Описание"
@@ -45,6 +157,8 @@ class Title(models.Model):
         Category, on_delete=models.SET_NULL, blank=True, null=True
     )
 
+    objects = TitleQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.CheckConstraint(
@@ -55,9 +169,11 @@ class Title(models.Model):
         ordering = ["name"]
         verbose_name = "Название"
 
-    @property
-    def rating(self):
-        return self.reviews.aggregate(Avg("score"))["score__avg"]
+    def delete(self, *args, **kwargs):
+        from .signals import deleting_titles
+
+        with deleting_titles([self.pk]):
+            return super().delete(*args, **kwargs)
 
 
 class GenreTitle(models.Model):
@@ -91,6 +207,10 @@ class Review(models.Model):
     pub_date = models.DateTimeField(
         auto_now_add=True, db_index=True, verbose_name="Дата публикации"
     )
+    # Для выгрузки изменений с заданного момента, см. reviews.export.
+    modified = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name="Изменено"
+    )
 
     class Meta:
         constraints = [
@@ -98,10 +218,23 @@ class Review(models.Model):
                 fields=["title", "author"], name="unique author review"
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["title", "pub_date", "id"], name="review_feed_idx"
+            )
+        ]
 
-        ordering = ["-pub_date"]
+        ordering = ["-pub_date", "-id"]
         verbose_name = "Обзор"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Запоминаем, что уже учтено в рейтинге произведения.
+        if {"title_id", "score"}.issubset(field_names):
+            instance._rated = (instance.title_id, instance.score)
+        return instance
+
 
 class Comment(models.Model):
     review = models.ForeignKey(
@@ -119,7 +252,48 @@ class Comment(models.Model):
     pub_date = models.DateTimeField(
         auto_now_add=True, db_index=True, verbose_name="Дата публикации"
     )
+    # Для выгрузки изменений с заданного момента, см. reviews.export.
+    modified = models.DateTimeField(
+        auto_now=True, db_index=True, verbose_name="Изменено"
+    )
 
     class Meta:
-        ordering = ["-pub_date"]
+        indexes = [
+            models.Index(
+                fields=["review", "pub_date", "id"], name="comment_feed_idx"
+            )
+        ]
+        ordering = ["-pub_date", "-id"]
         verbose_name = "Комментарии"
+
+
+class LeaderboardEntry(models.Model):
+    """Место произведения в лидерборде жанра и категории.
+
+    Пустой жанр или категория означают «любой»: так каждый срез
+    лидерборда читается одним запросом по индексу. Заполняется из
+    reviews.leaderboard.
+    """
+
+    title = models.ForeignKey(
+        Title, on_delete=models.CASCADE, related_name="leaderboard_entries"
+    )
+    genre = models.ForeignKey(
+        Genre, on_delete=models.CASCADE, null=True, related_name="+"
+    )
+    category = models.ForeignKey(
+        Category, on_delete=models.CASCADE, null=True, related_name="+"
+    )
+    average = models.FloatField(verbose_name="Средняя оценка")
+    review_count = models.PositiveIntegerField(
+        verbose_name="Количество оценок"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["genre", "category", "-average", "-review_count"],
+                name="leaderboard_top_idx",
+            )
+        ]
+        verbose_name = "Место в лидерборде"
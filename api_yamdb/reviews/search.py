@@ -0,0 +1,162 @@
+"""Полнотекстовый поиск произведений по названию и описанию.
+
+На PostgreSQL ищем по генерируемой колонке search_vector (tsvector с
+GIN-индексом) и по триграммам названия: их создает миграция
+0005_title_search. На SQLite, для разработки и тестов, — по таблице
+FTS5, которую создает prepare_sqlite_index. Запрос на обеих базах один:
+все слова пользователя, каждое как префикс.
+"""
+from django.db import connection, connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+# Словарь должен совпадать с указанным в миграции.
+SEARCH_CONFIG = "russian"
+
+PG_MATCH = "reviews_title.search_vector @@ to_tsquery(%s, %s)"
+PG_RANK = "ts_rank(reviews_title.search_vector, to_tsquery(%s, %s))"
+# С pg_trgm находим и части слов в названии. Без триграммного индекса
+# LIKE превратил бы запрос в полный просмотр таблицы.
+PG_TRIGRAM_MATCH = (
+    PG_MATCH + " OR UPPER(reviews_title.name::text) LIKE UPPER(%s)"
+)
+PG_TRIGRAM_RANK = PG_RANK + " + similarity(reviews_title.name, %s)"
+# bm25 тем меньше, чем лучше совпадение; название весит больше описания.
+SQLITE_RANK = "-bm25(reviews_title_fts, 10.0, 1.0)"
+
+
+def fts5_query(text):
+    """Запрос FTS5 из слов пользователя: каждое слово как префикс."""
+    words = text.split()
+    return " ".join('"{}"*'.format(word.replace('"', '""')) for word in words)
+
+
+def pg_tsquery(text):
+    """Запрос to_tsquery из слов пользователя, как fts5_query."""
+    words = text.split()
+    return " & ".join(
+        "'{}':*".format(word.replace("\\", "\\\\").replace("'", "''"))
+        for word in words
+    )
+
+
+def has_trigrams(db):
+    """Установлен ли pg_trgm; проверяется один раз на соединение."""
+    if not hasattr(db, "_has_trigrams"):
+        with db.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            )
+            db._has_trigrams = cursor.fetchone() is not None
+    return db._has_trigrams
+
+
+def search_titles(queryset, text):
+    """Произведения, подходящие под запрос, с релевантностью search_rank."""
+    text = text.strip()
+    if not text:
+        return queryset
+    if connection.vendor == "postgresql":
+        query = pg_tsquery(text)
+        if has_trigrams(connection):
+            like = "%{}%".format(
+                text.replace("\\", "\\\\")
+                .replace("%", "\\%")
+                .replace("_", "\\_")
+            )
+            match = RawSQL(
+                PG_TRIGRAM_MATCH,
+                (SEARCH_CONFIG, query, like),
+                output_field=BooleanField(),
+            )
+            rank = RawSQL(
+                PG_TRIGRAM_RANK,
+                (SEARCH_CONFIG, query, text),
+                output_field=FloatField(),
+            )
+        else:
+            match = RawSQL(
+                PG_MATCH, (SEARCH_CONFIG, query), output_field=BooleanField()
+            )
+            rank = RawSQL(
+                PG_RANK, (SEARCH_CONFIG, query), output_field=FloatField()
+            )
+        queryset = queryset.annotate(
+            search_match=match, search_rank=rank
+        ).filter(search_match=True)
+    elif connection.vendor == "sqlite":
+        # Через ORM к виртуальной таблице не присоединиться, а bm25()
+        # работает только в запросе с ее MATCH.
+        queryset = queryset.extra(
+            select={"search_rank": SQLITE_RANK},
+            tables=["reviews_title_fts"],
+            where=[
+                "reviews_title_fts.rowid = reviews_title.id",
+                "reviews_title_fts MATCH %s",
+            ],
+            params=[fts5_query(text)],
+        )
+    else:
+        return queryset.filter(
+            Q(name__icontains=text) | Q(description__icontains=text)
+        )
+    return queryset.order_by("-search_rank", "name")
+
+
+SQLITE_TRIGGERS = {
+    "reviews_title_fts_ai": """
+        CREATE TRIGGER IF NOT EXISTS reviews_title_fts_ai
+        AFTER INSERT ON reviews_title BEGIN
+            INSERT INTO reviews_title_fts (rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+    "reviews_title_fts_ad": """
+        CREATE TRIGGER IF NOT EXISTS reviews_title_fts_ad
+        AFTER DELETE ON reviews_title BEGIN
+            INSERT INTO reviews_title_fts
+                (reviews_title_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+        END
+    """,
+    "reviews_title_fts_au": """
+        CREATE TRIGGER IF NOT EXISTS reviews_title_fts_au
+        AFTER UPDATE OF name, description ON reviews_title BEGIN
+            INSERT INTO reviews_title_fts
+                (reviews_title_fts, rowid, name, description)
+            VALUES ('delete', old.id, old.name, old.description);
+            INSERT INTO reviews_title_fts (rowid, name, description)
+            VALUES (new.id, new.name, new.description);
+        END
+    """,
+}
+
+
+def prepare_sqlite_index(using, **kwargs):
+    """Создает индекс FTS5 и триггеры после миграций на SQLite.
+
+    SQLite пересоздает таблицу при многих изменениях схемы и теряет при
+    этом триггеры, поэтому проверяем их после каждого migrate и, если
+    чего-то не хватало, перестраиваем индекс целиком.
+    """
+    db = connections[using]
+    if db.vendor != "sqlite":
+        return
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+            "AND name LIKE 'reviews_title_fts_%'"
+        )
+        if {row[0] for row in cursor.fetchall()} == set(SQLITE_TRIGGERS):
+            return
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS reviews_title_fts USING "
+            "fts5(name, description, content='reviews_title', "
+            "content_rowid='id', tokenize='unicode61')"
+        )
+        for sql in SQLITE_TRIGGERS.values():
+            cursor.execute(sql)
+        cursor.execute(
+            "INSERT INTO reviews_title_fts (reviews_title_fts) "
+            "VALUES ('rebuild')"
+        )
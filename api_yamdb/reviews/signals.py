@@ -0,0 +1,217 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models import Subquery
+from django.db.models.functions import Now
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import Signal, receiver
+
+from . import leaderboard
+from .models import (Category, Comment, Genre, GenreTitle, LeaderboardEntry,
+                     Review, Title)
+
+# Отправляется после массовой загрузки или пересчета данных в обход
+# обычных сигналов моделей: подписчики сбрасывают все, что зависит от
+# этих данных. title_ids — затронутые произведения, если они известны.
+data_reloaded = Signal(providing_args=["title_ids"])
+
+# Произведения, которые сейчас удаляются вместе со своими отзывами:
+# пересчитывать им рейтинг незачем. Помечает deleting_titles.
+_deleting = threading.local()
+_muted = threading.local()
+_reranks = threading.local()
+
+
+def review_weight(score):
+    """Вклад нового отзыва в популярность произведения."""
+    return (
+        settings.TRENDING_REVIEW_WEIGHT
+        + settings.TRENDING_SCORE_WEIGHT * score
+    )
+
+
+def _deleting_titles():
+    if not hasattr(_deleting, "titles"):
+        _deleting.titles = set()
+    return _deleting.titles
+
+
+@contextmanager
+def deleting_titles(title_ids):
+    """Помечает произведения удаляемыми на время блока.
+
+    Пометка снимается и при ошибке удаления: иначе отзывы этих
+    произведений на этом потоке перестали бы менять рейтинг.
+    """
+    titles = _deleting_titles()
+    added = set(title_ids) - titles
+    titles |= added
+    try:
+        yield
+    finally:
+        titles -= added
+
+
+def is_muted():
+    return getattr(_muted, "value", False)
+
+
+@contextmanager
+def muted():
+    """Отключает реакции на запись отдельных объектов.
+
+    Для массовой загрузки: по ее окончании отправляется data_reloaded,
+    а рейтинг пересчитывается целиком.
+    """
+    _muted.value = True
+    try:
+        yield
+    finally:
+        _muted.value = False
+
+
+@contextmanager
+def batched_reranks():
+    """Перестраивает лидерборд затронутых произведений один раз на выходе.
+
+    Правка произведения — это сохранение и смена жанров, и каждый шаг
+    шлет свой сигнал; без этого строки лидерборда пересобирались бы на
+    каждый.
+    """
+    if getattr(_reranks, "titles", None) is not None:
+        yield
+        return
+    _reranks.titles = titles = set()
+    try:
+        yield
+    finally:
+        _reranks.titles = None
+    if titles:
+        leaderboard.refresh_titles(titles)
+
+
+def rerank(title_ids):
+    pending = getattr(_reranks, "titles", None)
+    if pending is None:
+        leaderboard.refresh_titles(title_ids)
+    else:
+        pending.update(title_ids)
+
+
+@receiver(post_save, sender=Review)
+def rate_title(sender, instance, created, raw, **kwargs):
+    if raw or is_muted():
+        return
+    rated = getattr(instance, "_rated", None)
+    current = (instance.title_id, instance.score)
+    if created:
+        Title.objects.filter(pk=instance.title_id).shift_rating(
+            instance.score, 1, trending=review_weight(instance.score)
+        )
+        leaderboard.update_title(instance.title_id, 1)
+    elif rated is not None and rated != current:
+        if rated[0] == instance.title_id:
+            Title.objects.filter(pk=instance.title_id).shift_rating(
+                instance.score - rated[1], 0
+            )
+            leaderboard.update_title(instance.title_id, 0)
+        else:
+            Title.objects.filter(pk=rated[0]).shift_rating(-rated[1], -1)
+            Title.objects.filter(pk=instance.title_id).shift_rating(
+                instance.score, 1
+            )
+            leaderboard.update_title(rated[0], -1)
+            leaderboard.update_title(instance.title_id, 1)
+    instance._rated = current
+
+
+def rate_reviews(title_id, reviews):
+    """То же, что rate_title, для новых отзывов из bulk_create.
+
+    Рейтинг, популярность и лидерборд сдвигаются один раз на всю пачку.
+    """
+    if not reviews:
+        return
+    Title.objects.filter(pk=title_id).shift_rating(
+        sum(review.score for review in reviews),
+        len(reviews),
+        trending=sum(review_weight(review.score) for review in reviews),
+    )
+    leaderboard.update_title(title_id, len(reviews))
+
+
+@receiver(post_save, sender=Comment)
+def comment_trending(sender, instance, created, raw, **kwargs):
+    if not created or raw or is_muted():
+        return
+    # Произведение находим подзапросом: отзыв может быть не загружен.
+    Title.objects.filter(
+        pk=Subquery(
+            Review.objects.filter(pk=instance.review_id).values("title_id")
+        )
+    ).bump_trending(settings.TRENDING_COMMENT_WEIGHT)
+
+
+@receiver(post_delete, sender=Review)
+def unrate_title(sender, instance, **kwargs):
+    title_id, score = getattr(
+        instance, "_rated", (instance.title_id, instance.score)
+    )
+    if is_muted() or title_id in _deleting_titles():
+        return
+    Title.objects.filter(pk=title_id).shift_rating(-score, -1)
+    leaderboard.update_title(title_id, -1)
+
+
+@receiver(pre_delete, sender=Category)
+@receiver(pre_delete, sender=Genre)
+def touch_titles(sender, instance, **kwargs):
+    """Произведения теряют категорию или жанр: это изменение для выгрузки.
+
+    Категорию удаление обнуляет одним UPDATE в обход save() и auto_now,
+    связи с жанром удаляются каскадом.
+    """
+    field = "category" if sender is Category else "genre"
+    Title.objects.filter(**{field: instance}).update(modified=Now())
+
+
+@receiver(post_save, sender=Title)
+def rerank_title(sender, instance, created, raw, **kwargs):
+    # У нового произведения нет отзывов, а значит и места в лидерборде.
+    if created or raw or is_muted():
+        return
+    rerank([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=GenreTitle)
+def rerank_genre_title(sender, instance, **kwargs):
+    if (
+        kwargs.get("raw")
+        or is_muted()
+        or instance.title_id in _deleting_titles()
+    ):
+        return
+    rerank([instance.title_id])
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def rerank_title_genres(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_") or is_muted():
+        return
+    if not reverse:
+        rerank([instance.pk])
+    elif pk_set:
+        rerank(pk_set)
+    else:
+        # У жанра убрали все произведения.
+        LeaderboardEntry.objects.filter(genre=instance).delete()
+
+
+@receiver(data_reloaded)
+def rebuild_leaderboard(sender, title_ids=None, **kwargs):
+    if title_ids is None:
+        leaderboard.rebuild()
+    else:
+        leaderboard.refresh_titles(title_ids)
@@ -0,0 +1,162 @@
+"""JWT-аутентификация почти без запросов к базе.
+
+Юзернейм кладется в claims токена, а роль, признак суперпользователя и
+активность берутся из общего кеша Django (get_auth_state), при промахе
+— одним запросом из базы. Изменение или удаление пользователя сбрасывает
+эту запись после коммита (см. users.signals), так что новые права
+действуют во всех воркерах со следующего запроса, а удаленный или
+отключенный пользователь теряет доступ сразу, несмотря на живой токен.
+
+Там, где нужна вся строка пользователя (автор нового отзыва, профиль),
+ее отдает user_cache — небольшой кеш на процесс с ограниченным сроком
+жизни записей. Изменение пользователя сбрасывает его запись в этом
+процессе, в остальных она устареет не позже чем через
+AUTH_USER_CACHE_TTL секунд.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class UserCache:
+    """Пользователи по id: LRU на AUTH_USER_CACHE_SIZE записей."""
+
+    def __init__(self):
+        self._users = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._users)
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._users.move_to_end(user_id)
+                return entry[1]
+        user = get_user_model().objects.get(pk=user_id)
+        self.put(user)
+        return user
+
+    def put(self, user):
+        expires = time.monotonic() + settings.AUTH_USER_CACHE_TTL
+        with self._lock:
+            self._users[user.pk] = (expires, user)
+            self._users.move_to_end(user.pk)
+            while len(self._users) > settings.AUTH_USER_CACHE_SIZE:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache()
+
+
+AUTH_STATE_FIELDS = ("role", "is_superuser", "is_active")
+
+
+def auth_state_key(user_id):
+    return f"auth:state:{user_id}"
+
+
+def check_active(is_active):
+    if not is_active:
+        raise AuthenticationFailed(
+            "Пользователь неактивен", code="user_inactive"
+        )
+
+
+def get_auth_state(user_id):
+    """Роль, суперпользователь и активность из общего кеша или из базы.
+
+    Права читаются с основной базы, а не с реплики: отстающая реплика
+    вернула бы в кеш прежнюю роль. Строка заодно попадает в user_cache.
+    """
+    key = auth_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        user = get_user_model().objects.using(DEFAULT_DB_ALIAS).filter(
+            pk=user_id
+        ).first()
+        if user is None:
+            raise AuthenticationFailed(
+                "Пользователь не найден", code="user_not_found"
+            )
+        user_cache.put(user)
+        state = {field: getattr(user, field) for field in AUTH_STATE_FIELDS}
+        cache.set(key, state, settings.AUTH_STATE_CACHE_TTL)
+    check_active(state["is_active"])
+    return state
+
+
+def forget_auth_state(user_id):
+    cache.delete(auth_state_key(user_id))
+
+
+def load_user(user_id):
+    try:
+        user = user_cache.get(user_id)
+    except get_user_model().DoesNotExist:
+        raise AuthenticationFailed(
+            "Пользователь не найден", code="user_not_found"
+        )
+    check_active(user.is_active)
+    return user
+
+
+def get_user_row(user):
+    """Модель пользователя для записи в базу или полной сериализации."""
+    if isinstance(user, RoleTokenUser):
+        return load_user(user.id)
+    return user
+
+
+class RoleTokenUser(TokenUser):
+    """Пользователь из claims токена с правами из get_auth_state."""
+
+    def __init__(self, token, state):
+        super().__init__(token)
+        self.role = state["role"]
+        self.is_superuser = state["is_superuser"]
+
+    def __str__(self):
+        return self.username
+
+
+class RoleRefreshToken(RefreshToken):
+    """Токен с claims, которых хватает для проверки разрешений."""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token["username"] = user.username
+        token["role"] = user.role
+        token["is_superuser"] = user.is_superuser
+        return token
+
+
+class RoleJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if "role" in validated_token:
+            return RoleTokenUser(validated_token, get_auth_state(user_id))
+        # Токены, выданные до появления роли в claims.
+        return load_user(user_id)
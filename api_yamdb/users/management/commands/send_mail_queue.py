@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from users.models import OutgoingEmail
+from users.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = "Отправляет письма из очереди исходящих."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            help="Сколько писем отправлять через одно соединение.",
+        )
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Не завершаться, а ждать новые письма.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=5,
+            help="Пауза между проверками очереди в режиме --loop, секунды.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = failed = 0
+            # Выбираем очередь до конца, потом ждем новых писем.
+            while True:
+                batch = send_pending(options["batch_size"])
+                if not batch:
+                    break
+                for email in batch:
+                    if email.status == OutgoingEmail.SENT:
+                        sent += 1
+                    else:
+                        failed += 1
+            if sent or failed or not options["loop"]:
+                self.stdout.write(
+                    f"Отправлено писем: {sent}, не отправлено: {failed}"
+                )
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
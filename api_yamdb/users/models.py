@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from reviews.validators import validate_username
 
 USER = "user"
@@ -26,10 +27,51 @@ class User(AbstractUser):
         choices=ROLE_CHOICES,
         default=USER,
     )
-    confirmation_code = models.CharField(max_length=30)
 
     def __str__(self):
         return self.username
 
     class Meta:
         ordering = ["username"]
+
+
+class OutgoingEmail(models.Model):
+    """Письмо в очереди на отправку.
+
+    Запросы только складывают письма сюда, отправляет их команда
+    send_mail_queue, см. users.outbox.
+    """
+
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, PENDING),
+        (SENT, SENT),
+        (FAILED, FAILED),
+    ]
+
+    subject = models.CharField(max_length=255, verbose_name="Тема")
+    body = models.TextField(verbose_name="Текст")
+    from_email = models.CharField(max_length=254, verbose_name="Отправитель")
+    to = models.TextField(verbose_name="Получатели через запятую")
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    send_after = models.DateTimeField(default=timezone.now)
+    created = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["status", "send_after"], name="outbox_queue_idx"
+            )
+        ]
+        ordering = ["send_after", "id"]
+        verbose_name = "Исходящее письмо"
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to}"
@@ -0,0 +1,95 @@
+"""Очередь исходящих писем.
+
+Вьюхи вызывают enqueue и сразу отвечают клиенту, а письма пачками
+отправляет send_pending из команды send_mail_queue: одно соединение с
+SMTP-сервером на пачку, неудачные письма повторяются с растущей паузой.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def enqueue(subject, body, from_email, recipient_list):
+    """Ставит письмо в очередь; вызывается вместо send_mail."""
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email,
+        to=",".join(recipient_list),
+    )
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой: удваивается после каждой неудачи."""
+    return timedelta(
+        seconds=settings.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1)
+    )
+
+
+def _fail(email, error, now, permanent=False):
+    email.attempts += 1
+    email.last_error = f"{type(error).__name__}: {error}"
+    if permanent or email.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+        email.status = OutgoingEmail.FAILED
+    else:
+        email.send_after = now + retry_delay(email.attempts)
+
+
+def send_pending(batch_size=None, connection=None):
+    """Отправляет одну пачку писем, которым подошло время.
+
+    Возвращает обработанные письма: по ним видно, какие ушли, а какие
+    отложены. Пачка блокируется до конца отправки, а заблокированные
+    другим воркером письма пропускаются, поэтому воркеров может быть
+    несколько.
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.PENDING, send_after__lte=now)
+            [:batch_size]
+        )
+        if not batch:
+            return batch
+        connection = connection or get_connection(fail_silently=False)
+        # Ошибки SMTP и сети — наследники OSError.
+        try:
+            connection.open()
+        except OSError as error:
+            for email in batch:
+                _fail(email, error, now)
+        else:
+            try:
+                for email in batch:
+                    try:
+                        EmailMessage(
+                            email.subject,
+                            email.body,
+                            email.from_email,
+                            email.to.split(","),
+                            connection=connection,
+                        ).send()
+                    except OSError as error:
+                        _fail(email, error, now)
+                    except Exception as error:
+                        # Битый адрес или заголовок: повтор не поможет, а
+                        # исключение откатило бы всю пачку вместе с уже
+                        # отправленными письмами.
+                        _fail(email, error, now, permanent=True)
+                    else:
+                        email.status = OutgoingEmail.SENT
+                        email.sent_at = timezone.now()
+            finally:
+                connection.close()
+        OutgoingEmail.objects.bulk_update(
+            batch,
+            ["status", "attempts", "send_after", "sent_at", "last_error"],
+        )
+    return batch
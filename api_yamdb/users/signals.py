@@ -0,0 +1,18 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import forget_auth_state, user_cache
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user(sender, instance, **kwargs):
+    user_cache.invalidate(instance.pk)
+    forget_auth_state(instance.pk)
+    # До коммита параллельный запрос мог прочитать из базы прежние права и
+    # снова положить их в кеш: после коммита запись сбрасывается еще раз.
+    transaction.on_commit(lambda: forget_auth_state(instance.pk))
@@ -0,0 +1,43 @@
+"""Коды подтверждения для получения токена.
+
+Код — метка времени и HMAC на SECRET_KEY от данных пользователя. Его
+не нужно хранить и хешировать медленным хешем пароля: проверка сводится
+к одному HMAC. Код перестает действовать через
+CONFIRMATION_CODE_TIMEOUT секунд, а также если у пользователя сменились
+почта, пароль или активность.
+"""
+import time
+
+from django.conf import settings
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import base36_to_int, int_to_base36
+
+
+class ConfirmationCodeGenerator:
+    key_salt = "users.tokens.ConfirmationCodeGenerator"
+
+    def make_code(self, user):
+        return self._make_code(user, int(time.time()))
+
+    def check_code(self, user, code):
+        if not (user and code):
+            return False
+        try:
+            ts_b36, _ = code.split("-")
+            timestamp = base36_to_int(ts_b36)
+        except ValueError:
+            return False
+        if not constant_time_compare(self._make_code(user, timestamp), code):
+            return False
+        age = time.time() - timestamp
+        return 0 <= age <= settings.CONFIRMATION_CODE_TIMEOUT
+
+    def _make_code(self, user, timestamp):
+        value = (
+            f"{user.pk}{user.password}{user.email}{user.is_active}{timestamp}"
+        )
+        digest = salted_hmac(self.key_salt, value).hexdigest()[::2]
+        return f"{int_to_base36(timestamp)}-{digest}"
+
+
+confirmation_codes = ConfirmationCodeGenerator()
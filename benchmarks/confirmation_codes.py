@@ -0,0 +1,67 @@
+"""Стоимость кода подтверждения: PBKDF2 против HMAC.
+
+    python -m benchmarks.confirmation_codes --repeat 200
+
+Все идет в одном потоке, так что операции в секунду — это пропускная
+способность одного ядра. Строки pbkdf2 повторяют прежние signup и
+get_token: токен default_token_generator, хешированный make_password
+при регистрации и проверяемый check_password при получении JWT.
+"""
+import argparse
+
+from .utils import measure, print_table, setup_django, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import check_password, make_password
+    from django.contrib.auth.tokens import default_token_generator
+    from django.test import Client
+    from users.tokens import confirmation_codes
+
+    user = get_user_model().objects.create(
+        username="bench", email="bench@yamdb.fake"
+    )
+    hashed = make_password(default_token_generator.make_token(user))
+    code = confirmation_codes.make_code(user)
+    client = Client()
+    signups = iter(range(10 ** 9))
+
+    def signup():
+        idx = next(signups)
+        client.post(
+            "/api/v1/auth/signup/",
+            {"username": f"bench{idx}", "email": f"bench{idx}@yamdb.fake"},
+        )
+
+    cases = {
+        ("pbkdf2", "make"): lambda: make_password(
+            default_token_generator.make_token(user), salt="well"
+        ),
+        ("pbkdf2", "check"): lambda: check_password("code", hashed),
+        ("hmac", "make"): lambda: confirmation_codes.make_code(user),
+        ("hmac", "check"): lambda: confirmation_codes.check_code(user, code),
+        ("hmac", "signup"): signup,
+        ("hmac", "token"): lambda: client.post(
+            "/api/v1/auth/token/",
+            {"username": "bench", "confirmation_code": code},
+        ),
+    }
+    rows = []
+    for (engine, operation), func in cases.items():
+        stats = summary(measure(func, repeat=args.repeat))
+        rows.append((
+            engine, operation,
+            f"{stats['p50']:.3f}", f"{stats['p95']:.3f}",
+            f"{1000 / stats['p50']:.0f}",
+        ))
+    print_table(("engine", "operation", "p50, ms", "p95, ms", "ops/s"), rows)
+
+
+if __name__ == "__main__":
+    main()
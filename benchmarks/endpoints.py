@@ -0,0 +1,431 @@
+"""Все маршруты API на сгенерированных данных: задержки и пропускная.
+
+    python -m benchmarks.endpoints --reviews 100000
+    python -m benchmarks.endpoints --mode client --save-baseline
+
+Данные создает generate_data — прежние данные в базе удаляются. Без
+DB_ENGINE база — временный файл SQLite, чтобы ее видел и gunicorn.
+Каждый маршрут прогоняется двумя способами:
+
+- client — тестовым клиентом Django в этом же процессе, запросы по
+  одному; кэш ответов чистится перед каждым запросом, считаются
+  SQL-запросы;
+- gunicorn — локальным сервером с --workers воркерами в --concurrency
+  потоков; кэш ответов работает как в бою.
+
+Результаты пишутся в JSON (--output) и сравниваются с сохраненной базой
+(--baseline): рост p50 больше чем на --tolerance (p95 — на две
+--tolerance), рост числа SQL-запросов или ошибки там, где их не было,
+считаются регрессией, и команда завершается с кодом 1. База зависит от
+машины: на новой сначала сохраните свою, --save-baseline. На машине с
+одним-двумя ядрами gunicorn делит их с потоками нагрузки, и задержки
+заметно плавают между прогонами.
+"""
+import argparse
+import http.client
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from .utils import print_table, root_dir, setup_django, summary
+
+Case = namedtuple("Case", "name method path role body")
+
+
+def signup_body(context):
+    idx = next(context["signups"])
+    return {"username": f"bench{idx}", "email": f"bench{idx}@yamdb.fake"}
+
+
+def token_body(context):
+    return {
+        "username": context["username"],
+        "confirmation_code": context["code"],
+    }
+
+
+CASES = (
+    Case("titles list", "GET", "/api/v1/titles/", None, None),
+    Case(
+        "titles filter", "GET",
+        "/api/v1/titles/?genre={genre}&category={category}", None, None,
+    ),
+    Case("title detail", "GET", "/api/v1/titles/{title}/", None, None),
+    Case(
+        "reviews list", "GET", "/api/v1/titles/{title}/reviews/", None, None
+    ),
+    Case(
+        "review detail", "GET", "/api/v1/titles/{title}/reviews/{review}/",
+        None, None,
+    ),
+    Case(
+        "comments list", "GET",
+        "/api/v1/titles/{title}/reviews/{review}/comments/", None, None,
+    ),
+    Case("categories", "GET", "/api/v1/categories/", None, None),
+    Case("genres", "GET", "/api/v1/genres/", None, None),
+    Case("users list", "GET", "/api/v1/users/", "admin", None),
+    Case("users me", "GET", "/api/v1/users/me/", "user", None),
+    Case("signup", "POST", "/api/v1/auth/signup/", None, signup_body),
+    Case("token", "POST", "/api/v1/auth/token/", None, token_body),
+)
+MODES = ("client", "gunicorn")
+BASELINE = os.path.join(root_dir, "benchmarks", "baselines", "endpoints.json")
+OUTPUT = os.path.join(root_dir, "benchmarks", "results", "endpoints.json")
+# Меньше этого рост p95 в миллисекундах не считается: шум таймера.
+NOISE_MS = 0.5
+
+
+def prepare():
+    """Объекты для адресов и тел запросов, токены ролей."""
+    from django.db.models import Count
+    from reviews.models import Review, Title
+    from users.authentication import RoleRefreshToken
+    from users.models import ADMIN, USER, User
+    from users.tokens import confirmation_codes
+
+    title = (
+        Title.objects.filter(category__isnull=False, genre__isnull=False)
+        .order_by("-rating_count", "pk")
+        .first()
+    )
+    review = (
+        Review.objects.filter(title=title)
+        .annotate(volume=Count("comments"))
+        .order_by("-volume", "pk")
+        .first()
+    )
+    admin = User.objects.filter(role=ADMIN).order_by("pk").first()
+    user = User.objects.filter(role=USER).order_by("pk").first()
+    return {
+        "title": title.pk,
+        "review": review.pk,
+        "genre": title.genre.order_by("pk").first().slug,
+        "category": title.category.slug,
+        "tokens": {
+            role: str(RoleRefreshToken.for_user(account).access_token)
+            for role, account in (("admin", admin), ("user", user))
+        },
+        "username": user.username,
+        "code": confirmation_codes.make_code(user),
+        "signups": itertools.count(),
+    }
+
+
+def build(case, context):
+    """Адрес, тело и заголовки очередного запроса."""
+    headers = {}
+    if case.role:
+        headers["Authorization"] = f"Bearer {context['tokens'][case.role]}"
+    body = None
+    if case.body:
+        body = json.dumps(case.body(context))
+        headers["Content-Type"] = "application/json"
+    return case.path.format(**context), body, headers
+
+
+def stats(timings, elapsed, errors, queries=None):
+    result = {
+        key: round(value, 3) for key, value in summary(timings).items()
+    }
+    result.update(
+        requests=len(timings),
+        errors=errors,
+        rps=round(len(timings) / elapsed, 1),
+        queries=queries,
+    )
+    return result
+
+
+def run_client(cases, context, repeat, warmup=3, warm=False):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    results = {}
+    for case in cases:
+        timings, errors, queries = [], 0, 0
+        for idx in range(warmup + repeat):
+            path, body, headers = build(case, context)
+            extra = {
+                "HTTP_" + name.upper().replace("-", "_"): value
+                for name, value in headers.items()
+                if name != "Content-Type"
+            }
+            if not warm:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.generic(
+                    case.method, path, body or "",
+                    content_type="application/json", **extra
+                )
+                timing = (time.perf_counter() - started) * 1000
+            if idx < warmup:
+                continue
+            timings.append(timing)
+            errors += response.status_code >= 400
+            queries = max(queries, len(captured))
+        results[case.name] = stats(
+            timings, sum(timings) / 1000, errors, queries
+        )
+    return results
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def gunicorn(cache_dir, options=(), env=None):
+    """Запускает gunicorn с той же базой и ждет, пока он ответит.
+
+    options — ключи командной строки gunicorn, env — добавка к окружению.
+    """
+    port = free_port()
+    env = dict(
+        os.environ,
+        DJANGO_SETTINGS_MODULE="api_yamdb.settings",
+        CACHE_LOCATION=cache_dir,
+        **(env or {}),
+    )
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn.app.wsgiapp",
+            "api_yamdb.wsgi:application", *options,
+            "--bind", f"127.0.0.1:{port}", "--log-level", "warning",
+        ],
+        cwd=os.path.join(root_dir, "api_yamdb"),
+        env=env,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), 1).close()
+                break
+            except OSError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("gunicorn не запустился")
+                time.sleep(0.1)
+        yield port
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def load(port, case, context, total, concurrency, warmup=3):
+    """total запросов в concurrency потоков, у потока свое соединение."""
+    slots = itertools.count()
+    timings, errors = [], []
+
+    def worker(count):
+        connection = http.client.HTTPConnection("127.0.0.1", port, 30)
+        while next(slots) < count:
+            path, body, headers = build(case, context)
+            started = time.perf_counter()
+            connection.request(case.method, path, body, headers)
+            response = connection.getresponse()
+            response.read()
+            timings.append((time.perf_counter() - started) * 1000)
+            if response.status >= 400:
+                errors.append(response.status)
+        connection.close()
+
+    worker(warmup)
+    del timings[:], errors[:]
+    slots = itertools.count()
+    threads = [
+        threading.Thread(target=worker, args=(total,))
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats(timings, time.perf_counter() - started, len(errors))
+
+
+def run_gunicorn(cases, context, requests, concurrency, workers):
+    cache_dir = tempfile.mkdtemp(prefix="yamdb-cache-")
+    try:
+        with gunicorn(cache_dir, ["--workers", str(workers)]) as port:
+            return {
+                case.name: load(port, case, context, requests, concurrency)
+                for case in cases
+            }
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def compare(results, baseline, tolerance):
+    """Регрессии относительно базы: (режим, маршрут) -> описания."""
+    regressions = {}
+    for mode, cases in results.items():
+        for name, current in cases.items():
+            base = baseline.get(mode, {}).get(name)
+            if base is None:
+                continue
+            problems = []
+            # Хвост по нескольким десяткам запросов шумит сильнее
+            # медианы, поэтому для p95 допуск вдвое больше.
+            for key, share in (("p50", tolerance), ("p95", 2 * tolerance)):
+                if current[key] > base[key] * (1 + share) + NOISE_MS:
+                    problems.append(
+                        f"{key} {base[key]} -> {current[key]} ms"
+                    )
+            if (current["queries"] or 0) > (base["queries"] or 0):
+                problems.append(
+                    f"queries {base['queries']} -> {current['queries']}"
+                )
+            # Ошибки записи под нагрузкой на SQLite (database is locked)
+            # плавают от прогона к прогону: регрессия — только если в
+            # базе ошибок не было вовсе.
+            if current["errors"] and not base["errors"]:
+                problems.append(f"errors 0 -> {current['errors']}")
+            if problems:
+                regressions[mode, name] = problems
+    return regressions
+
+
+def report(results, baseline, regressions):
+    rows = []
+    for mode, cases in results.items():
+        for name, current in cases.items():
+            base = baseline.get(mode, {}).get(name, {})
+            problems = regressions.get((mode, name))
+            rows.append((
+                mode, name, current["rps"], current["p50"], current["p95"],
+                current["p99"],
+                "-" if current["queries"] is None else current["queries"],
+                current["errors"], base.get("p95", "-"),
+                "; ".join(problems) if problems else "ok",
+            ))
+    print_table(
+        ("mode", "endpoint", "rps", "p50, ms", "p95, ms", "p99, ms",
+         "queries", "errors", "base p95", "status"),
+        rows,
+    )
+
+
+def write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as json_file:
+        json.dump(data, json_file, ensure_ascii=False, indent=2)
+        json_file.write("\n")
+
+
+def generate(args):
+    from django.core.management import call_command
+
+    call_command(
+        "generate_data", users=args.users, titles=args.titles,
+        reviews=args.reviews, comments=args.comments, seed=args.seed,
+        stdout=io.StringIO(),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--titles", type=int, default=5000)
+    parser.add_argument("--reviews", type=int, default=50000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--mode", choices=MODES, nargs="+", default=list(MODES)
+    )
+    parser.add_argument("--only", nargs="+", help="Только эти маршруты.")
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument(
+        "--warm", action="store_true",
+        help="Не чистить кэш ответов в режиме client.",
+    )
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--output", default=OUTPUT)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.5,
+        help="Допустимый рост p50, доля от базы.",
+    )
+    args = parser.parse_args()
+
+    db_dir = None
+    if "DB_ENGINE" not in os.environ:
+        db_dir = tempfile.mkdtemp(prefix="yamdb-bench-")
+        os.environ["DB_ENGINE"] = "django.db.backends.sqlite3"
+        os.environ["DB_NAME"] = os.path.join(db_dir, "db.sqlite3")
+    try:
+        setup_django()
+        from django.db import connection
+
+        generate(args)
+        context = prepare()
+        cases = [
+            case for case in CASES if not args.only or case.name in args.only
+        ]
+        results = {}
+        if "client" in args.mode:
+            results["client"] = run_client(
+                cases, context, args.repeat, warm=args.warm
+            )
+        if "gunicorn" in args.mode:
+            connection.close()
+            results["gunicorn"] = run_gunicorn(
+                cases, context, args.requests, args.concurrency, args.workers
+            )
+    finally:
+        if db_dir:
+            shutil.rmtree(db_dir, ignore_errors=True)
+
+    data = {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "database": connection.vendor,
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "cpus": os.cpu_count(),
+            "options": {
+                key: value for key, value in vars(args).items()
+                if key not in ("output", "baseline", "save_baseline")
+            },
+        },
+        "results": results,
+    }
+    write_json(args.output, data)
+    if args.save_baseline:
+        write_json(args.baseline, data)
+        print(f"База сохранена в {args.baseline}")
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as json_file:
+            baseline = json.load(json_file)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    report(results, baseline, regressions)
+    print(f"Результаты: {args.output}")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
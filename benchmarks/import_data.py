@@ -0,0 +1,109 @@
+"""Загрузка сгенерированного набора CSV командой insert_data.
+
+    python -m benchmarks.import_data --reviews 1000000
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+from .utils import print_table, setup_django
+
+
+def write_csv(path, header, rows):
+    with open(path, "w", encoding="UTF-8", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def generate(data_dir, reviews, comments, titles, seed):
+    rnd = random.Random(seed)
+    users = -(-reviews // titles)
+    write_csv(
+        os.path.join(data_dir, "users.csv"),
+        ["id", "username", "email", "role", "bio", "first_name", "last_name"],
+        ((idx, f"user{idx}", f"user{idx}@yamdb.fake", "user", "", "", "")
+         for idx in range(1, users + 1)),
+    )
+    write_csv(
+        os.path.join(data_dir, "category.csv"),
+        ["id", "name", "slug"],
+        ((idx, f"Категория {idx}", f"category-{idx}") for idx in range(1, 6)),
+    )
+    write_csv(
+        os.path.join(data_dir, "genre.csv"),
+        ["id", "name", "slug"],
+        ((idx, f"Жанр {idx}", f"genre-{idx}") for idx in range(1, 21)),
+    )
+    write_csv(
+        os.path.join(data_dir, "titles.csv"),
+        ["id", "name", "year", "category"],
+        ((idx, f"Произведение {idx}", rnd.randint(1950, 2020),
+          rnd.randint(1, 5)) for idx in range(1, titles + 1)),
+    )
+    write_csv(
+        os.path.join(data_dir, "genre_title.csv"),
+        ["id", "title_id", "genre_id"],
+        ((idx, idx, rnd.randint(1, 20)) for idx in range(1, titles + 1)),
+    )
+    # Каждый пользователь пишет по отзыву на каждое произведение подряд,
+    # пока не наберется нужное число: пары (title, author) уникальны.
+    write_csv(
+        os.path.join(data_dir, "review.csv"),
+        ["id", "title_id", "text", "author", "score", "pub_date"],
+        ((idx + 1, idx % titles + 1, "Текст отзыва " * rnd.randint(1, 20),
+          idx // titles + 1, rnd.randint(1, 10), "2020-01-01T00:00:00Z")
+         for idx in range(reviews)),
+    )
+    write_csv(
+        os.path.join(data_dir, "comments.csv"),
+        ["id", "review_id", "text", "author", "pub_date"],
+        ((idx, rnd.randint(1, reviews), "Комментарий",
+          rnd.randint(1, users), "2020-01-01T00:00:00Z")
+         for idx in range(1, comments + 1)),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reviews", type=int, default=1000000)
+    parser.add_argument("--comments", type=int, default=100000)
+    parser.add_argument("--titles", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from django.db import connection
+
+    modes = [("bulk_create", {"no_copy": True})]
+    if connection.vendor == "postgresql":
+        modes.append(("copy", {"no_copy": False}))
+    # Повторная сверка тех же файлов: ничего не меняется, только чтение.
+    modes.append(("sync", {"sync": True}))
+    with tempfile.TemporaryDirectory() as data_dir:
+        generate(
+            data_dir, args.reviews, args.comments, args.titles, args.seed
+        )
+        rows = []
+        for mode, options in modes:
+            started = time.perf_counter()
+            call_command(
+                "insert_data", data_dir=data_dir,
+                batch_size=args.batch_size, stdout=open(os.devnull, "w"),
+                **options,
+            )
+            elapsed = time.perf_counter() - started
+            rows.append((
+                connection.vendor, mode, args.reviews, f"{elapsed:.1f}",
+                f"{args.reviews / elapsed:.0f}",
+            ))
+    print_table(("db", "mode", "reviews", "total, s", "reviews/s"), rows)
+
+
+if __name__ == "__main__":
+    main()
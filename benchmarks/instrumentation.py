@@ -0,0 +1,114 @@
+"""Цена InstrumentationMiddleware: запросы к API с ней и без нее.
+
+    python -m benchmarks.instrumentation --repeat 2000
+
+Замеряются запрос к API целиком (кэш ответов работает, как в бою, —
+так доля накладных расходов видна лучше всего), сам middleware вокруг
+пустого представления и добавка к одному SQL-запросу от обертки
+execute_wrapper.
+"""
+import argparse
+
+from .utils import measure, print_table, setup_django, summary
+
+INSTRUMENTATION = "api.instrumentation.InstrumentationMiddleware"
+
+
+def fill(titles):
+    from reviews.models import Category, Genre, Title
+
+    category = Category.objects.create(name="Кино", slug="movie")
+    genre = Genre.objects.create(name="Драма", slug="drama")
+    for idx in range(titles):
+        title = Title.objects.create(
+            name=f"Произведение {idx}", year=2000, category=category
+        )
+        title.genre.add(genre)
+
+
+def request_cases(args):
+    from django.conf import settings
+    from django.test import Client, override_settings
+
+    without = [name for name in settings.MIDDLEWARE if name != INSTRUMENTATION]
+    rows = []
+    for url in ("/api/v1/genres/", "/api/v1/titles/"):
+        timings = {"off": [], "on": []}
+        # Замеры с middleware и без чередуются, чтобы дрейф машины за
+        # время прогона не записался ни одному из вариантов.
+        for _ in range(args.rounds):
+            for name, middleware in (
+                ("off", without), ("on", settings.MIDDLEWARE)
+            ):
+                with override_settings(MIDDLEWARE=middleware):
+                    client = Client()
+                    timings[name].extend(measure(
+                        lambda: client.get(url),
+                        repeat=args.repeat // args.rounds, warmup=20,
+                    ))
+        off, on = summary(timings["off"])["p50"], summary(timings["on"])["p50"]
+        rows.append((
+            url, f"{off:.3f}", f"{on:.3f}", f"{(on - off) * 1000:+.0f}",
+            f"{(on - off) / off * 100:+.1f}%",
+        ))
+    return rows
+
+
+def middleware_case(repeat):
+    from api.instrumentation import InstrumentationMiddleware
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+
+    request = RequestFactory().get("/api/v1/genres/")
+    # С content_type Django 2.2 не трогает устаревший DEFAULT_CONTENT_TYPE,
+    # обращение к которому само стоит десятки микросекунд.
+    middleware = InstrumentationMiddleware(
+        lambda request: HttpResponse(content_type="text/plain")
+    )
+    return summary(measure(lambda: middleware(request), repeat=repeat))
+
+
+def query_case(repeat, queries=100):
+    from api.instrumentation import RequestRecord
+    from django.db import connection
+
+    def run():
+        with connection.cursor() as cursor:
+            for _ in range(queries):
+                cursor.execute("SELECT 1")
+
+    plain = summary(measure(run, repeat=repeat))
+    with RequestRecord().capture():
+        wrapped = summary(measure(run, repeat=repeat))
+    return (plain["p50"] * 1000 / queries, wrapped["p50"] * 1000 / queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    setup_django()
+    fill(args.titles)
+
+    print_table(
+        ("endpoint", "off p50, ms", "on p50, ms", "delta, us", "delta"),
+        request_cases(args),
+    )
+    print()
+    stats = middleware_case(args.repeat * 10)
+    plain, wrapped = query_case(args.repeat // 5)
+    print_table(
+        ("case", "p50, us"),
+        (
+            ("middleware, empty view", f"{stats['p50'] * 1000:.1f}"),
+            ("SELECT 1, plain", f"{plain:.1f}"),
+            ("SELECT 1, wrapped", f"{wrapped:.1f}"),
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Первая и глубокая страница ленты отзывов: offset против курсора.
+
+    python -m benchmarks.pagination --reviews 100000 --page 10000
+"""
+import argparse
+
+from .utils import measure, print_table, setup_django, summary
+
+
+def fill(reviews):
+    from django.contrib.auth import get_user_model
+    from reviews.models import Comment, Review, Title
+
+    user_model = get_user_model()
+    title = Title.objects.create(name="Бенчмарк", year=2000)
+    user_model.objects.bulk_create(
+        (user_model(username=f"bench{idx}", email=f"bench{idx}@yamdb.fake")
+         for idx in range(reviews))
+    )
+    authors = user_model.objects.filter(username__startswith="bench")
+    Review.objects.bulk_create(
+        (Review(title=title, author_id=author_id, text="Текст", score=5)
+         for author_id in authors.values_list("id", flat=True).iterator())
+    )
+    review = Review.objects.filter(title=title).first()
+    Comment.objects.bulk_create(
+        (Comment(review=review, author_id=review.author_id, text="Текст")
+         for _ in range(reviews))
+    )
+    return title, review
+
+
+def cursor_at(queryset, position):
+    from api.pagination import FeedPagination
+
+    obj = queryset.order_by(*FeedPagination.ordering)[position]
+    return FeedPagination().encode_cursor(obj)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reviews", type=int, default=100000)
+    parser.add_argument("--page", type=int, default=10000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client
+
+    title, review = fill(args.reviews)
+    client = Client()
+    feeds = {
+        "reviews": (
+            f"/api/v1/titles/{title.pk}/reviews/",
+            title.reviews.all(),
+        ),
+        "comments": (
+            f"/api/v1/titles/{title.pk}/reviews/{review.pk}/comments/",
+            review.comments.all(),
+        ),
+    }
+    offset = (args.page - 1) * args.limit
+    rows = []
+    for feed, (url, queryset) in feeds.items():
+        modes = {
+            ("offset", 1): {"limit": args.limit},
+            ("offset", args.page): {"limit": args.limit, "offset": offset},
+            ("cursor", 1): {"limit": args.limit, "cursor": ""},
+            ("cursor", args.page): {
+                "limit": args.limit,
+                "cursor": cursor_at(queryset, offset - 1),
+            },
+        }
+        for (mode, page), params in modes.items():
+            timings = measure(
+                lambda: client.get(url, params), repeat=args.repeat
+            )
+            stats = summary(timings)
+            rows.append((
+                feed, mode, page,
+                f"{stats['p50']:.2f}", f"{stats['p95']:.2f}",
+            ))
+    print_table(("feed", "mode", "page", "p50, ms", "p95, ms"), rows)
+
+
+if __name__ == "__main__":
+    main()
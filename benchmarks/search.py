@@ -0,0 +1,81 @@
+"""Поиск произведений: ?search= против фильтра ?name= (icontains).
+
+    python -m benchmarks.search --titles 1000000
+
+Кэш ответов отключен, чтобы каждый запрос доходил до базы.
+"""
+import argparse
+import random
+
+from .utils import measure, print_table, setup_django, summary
+
+WORDS = (
+    "ночь", "город", "море", "звезда", "дорога", "тайна", "война", "мир",
+    "сердце", "небо", "остров", "зима", "лето", "тень", "огонь", "ветер",
+    "память", "дом", "река", "песня", "время", "свет", "сад", "охота",
+)
+QUERIES = ("звезда", "тайна острова", "песня ветра", "шоушенк")
+CHUNK = 10000
+
+
+def phrase(rnd, length):
+    return " ".join(rnd.choice(WORDS) for _ in range(length))
+
+
+def fill(titles):
+    from django.db import transaction
+    from reviews.models import Title
+    from reviews.signals import muted
+
+    rnd = random.Random(0)
+    with muted(), transaction.atomic():
+        for start in range(0, titles, CHUNK):
+            Title.objects.bulk_create(
+                Title(
+                    name=phrase(rnd, 3),
+                    year=rnd.randint(1900, 2020),
+                    description=phrase(rnd, 12),
+                )
+                for _ in range(start, min(titles, start + CHUNK))
+            )
+        Title.objects.create(
+            name="Побег из Шоушенка", year=1994, description="Надежда"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=1000000)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test import Client, override_settings
+
+    fill(args.titles)
+    client = Client()
+    rows = []
+    dummy = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.dummy.DummyCache",
+        },
+    }
+    with override_settings(CACHES=dummy):
+        for query in QUERIES:
+            for param in ("name", "search"):
+                params = {param: query, "limit": args.limit}
+                timings = measure(
+                    lambda: client.get("/api/v1/titles/", params),
+                    repeat=args.repeat,
+                )
+                stats = summary(timings)
+                rows.append((
+                    param, query,
+                    f"{stats['p50']:.2f}", f"{stats['p95']:.2f}",
+                ))
+    print_table(("param", "query", "p50, ms", "p95, ms"), rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""Сериализация списков: обычные сериализаторы DRF против api.fast.
+
+    python -m benchmarks.serializers --titles 2000 --limit 500
+
+Замеряются запрос к API целиком (кэш ответов чистится перед каждым
+запросом) и отдельно сборка ответа из уже загруженной страницы —
+стоимость на один объект. Быстрой сборке произведений в это время
+входит запрос жанров: у DRF они к этому моменту уже подгружены
+prefetch_related.
+"""
+import argparse
+import random
+
+from .utils import measure, print_table, setup_django, summary
+
+CHUNK = 10000
+
+
+def fill(titles, reviews):
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+    from reviews.models import Category, Genre, GenreTitle, Review, Title
+    from reviews.signals import muted
+
+    user_model = get_user_model()
+    rnd = random.Random(0)
+    with muted(), transaction.atomic():
+        Genre.objects.bulk_create(
+            Genre(name=f"Жанр {idx}", slug=f"genre-{idx}") for idx in range(20)
+        )
+        Category.objects.bulk_create(
+            Category(name=f"Категория {idx}", slug=f"category-{idx}")
+            for idx in range(5)
+        )
+        genres = list(Genre.objects.all())
+        categories = list(Category.objects.all())
+        for start in range(0, titles, CHUNK):
+            Title.objects.bulk_create(
+                Title(
+                    name=f"Произведение {idx}",
+                    year=rnd.randint(1900, 2020),
+                    rating=rnd.randint(1, 10),
+                    description="Описание " * 20,
+                    category=rnd.choice(categories),
+                )
+                for idx in range(start, min(titles, start + CHUNK))
+            )
+        title_ids = list(Title.objects.values_list("id", flat=True))
+        GenreTitle.objects.bulk_create(
+            GenreTitle(title_id=title_id, genre=genre)
+            for title_id in title_ids
+            for genre in rnd.sample(genres, 3)
+        )
+        user_model.objects.bulk_create(
+            user_model(username=f"bench{idx}", email=f"bench{idx}@yamdb.fake")
+            for idx in range(reviews)
+        )
+        Review.objects.bulk_create(
+            Review(
+                title_id=title_ids[0],
+                author=author,
+                text="Текст отзыва " * 10,
+                score=rnd.randint(1, 10),
+            )
+            for author in user_model.objects.filter(
+                username__startswith="bench"
+            )
+        )
+        return title_ids[0]
+
+
+def serializer_cases(title_id, limit):
+    from api.fast import ReviewFastSerializer, TitleFastSerializer
+    from api.serializers import ReviewSerializer, TitleDisplaySerializer
+    from reviews.models import Review, Title
+
+    titles = Title.objects.select_related("category").prefetch_related(
+        "genre"
+    )[:limit]
+    title_objects = list(titles)
+    title_rows = list(TitleFastSerializer().rows(titles))
+    reviews = Review.objects.filter(title_id=title_id).select_related(
+        "author"
+    )[:limit]
+    review_objects = list(reviews)
+    review_rows = list(ReviewFastSerializer().rows(reviews))
+    return {
+        "titles, DRF": (
+            len(title_objects),
+            lambda: TitleDisplaySerializer(title_objects, many=True).data,
+        ),
+        "titles, fast": (
+            len(title_rows),
+            lambda: TitleFastSerializer().serialize(title_rows),
+        ),
+        "reviews, DRF": (
+            len(review_objects),
+            lambda: ReviewSerializer(review_objects, many=True).data,
+        ),
+        "reviews, fast": (
+            len(review_rows),
+            lambda: ReviewFastSerializer().serialize(review_rows),
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--titles", type=int, default=2000)
+    parser.add_argument("--reviews", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+
+    title_id = fill(args.titles, args.reviews)
+    client = Client()
+
+    def get(url):
+        cache.clear()
+        return client.get(url, {"limit": args.limit})
+
+    rows = []
+    urls = (
+        "/api/v1/titles/",
+        f"/api/v1/titles/{title_id}/reviews/",
+    )
+    for url in urls:
+        for fast in (False, True):
+            with override_settings(API_FAST_READS=fast):
+                stats = summary(
+                    measure(lambda: get(url), repeat=args.repeat)
+                )
+            rows.append((
+                url, "fast" if fast else "DRF",
+                f"{stats['p50']:.2f}", f"{stats['p95']:.2f}",
+            ))
+    print_table(("endpoint", "engine", "p50, ms", "p95, ms"), rows)
+    print()
+
+    rows = []
+    for name, (count, func) in serializer_cases(title_id, args.limit).items():
+        stats = summary(measure(func, repeat=args.repeat))
+        rows.append((
+            name, count, f"{stats['p50']:.2f}",
+            f"{stats['p50'] * 1000 / max(count, 1):.1f}",
+        ))
+    print_table(("serializer", "items", "p50, ms", "per item, us"), rows)
+
+
+if __name__ == "__main__":
+    main()
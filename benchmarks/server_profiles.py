@@ -0,0 +1,146 @@
+"""Профили сервера: пропускная и хвост задержек под нагрузкой.
+
+    python -m benchmarks.server_profiles --concurrency 8
+    DB_ENGINE=django.db.backends.postgresql ... \\
+        python -m benchmarks.server_profiles --workers 4
+
+Сравниваются запуск gunicorn, как он был в Dockerfile (один sync-воркер,
+соединение с базой на каждый запрос), и профили из
+api_yamdb/gunicorn_conf.py с постоянными соединениями: sync и gthread.
+Данные создает generate_data, как в benchmarks.endpoints; без DB_ENGINE
+база — временный файл SQLite. Список произведений отдается из кэша
+ответов, отзывы каждый раз читаются из базы. Число воркеров профили
+берут из числа ядер; на машине с одним-двумя ядрами нагрузка делит их с
+сервером, так что сравнивайте профили между собой, а не с прошлыми
+прогонами.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from .endpoints import CASES, generate, gunicorn, load, prepare, write_json
+from .utils import print_table, root_dir, setup_django
+
+Profile = namedtuple("Profile", "name options env")
+
+CONFIG = ("--config", "python:api_yamdb.gunicorn_conf")
+PROFILES = (
+    Profile("default", (), {"DB_CONN_MAX_AGE": "0"}),
+    Profile(
+        "sync", CONFIG,
+        {"GUNICORN_WORKER_CLASS": "sync", "DB_CONN_MAX_AGE": "60"},
+    ),
+    Profile(
+        "gthread", CONFIG,
+        {"GUNICORN_WORKER_CLASS": "gthread", "DB_CONN_MAX_AGE": "60"},
+    ),
+)
+ENDPOINTS = ("titles list", "reviews list")
+OUTPUT = os.path.join(
+    root_dir, "benchmarks", "results", "server_profiles.json"
+)
+
+
+def run_profiles(profiles, cases, context, args):
+    results = {}
+    for profile in profiles:
+        env = dict(profile.env)
+        if args.workers and profile.options:
+            env["GUNICORN_WORKERS"] = str(args.workers)
+        # Файловый кэш в памяти: запись на диск иначе заслонила бы
+        # разницу между профилями.
+        cache_dir = tempfile.mkdtemp(
+            prefix="yamdb-cache-",
+            dir="/dev/shm" if os.path.isdir("/dev/shm") else None,
+        )
+        try:
+            with gunicorn(cache_dir, profile.options, env) as port:
+                results[profile.name] = {
+                    case.name: load(
+                        port, case, context, args.requests, args.concurrency
+                    )
+                    for case in cases
+                }
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+def report(results):
+    rows = []
+    for name, cases in results.items():
+        for case, row in cases.items():
+            base = results["default"][case] if "default" in results else row
+            rows.append((
+                name, case, row["rps"], f"{row['rps'] / base['rps']:.2f}x",
+                row["p50"], row["p99"], row["errors"],
+            ))
+    print_table(
+        ("profile", "endpoint", "rps", "vs default", "p50, ms", "p99, ms",
+         "errors"),
+        rows,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--titles", type=int, default=5000)
+    parser.add_argument("--reviews", type=int, default=50000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--profile", nargs="+", choices=[p.name for p in PROFILES],
+        default=[p.name for p in PROFILES],
+    )
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--workers", type=int, default=None,
+        help="Воркеров в профилях gunicorn_conf вместо расчета по ядрам.",
+    )
+    parser.add_argument("--output", default=OUTPUT)
+    args = parser.parse_args()
+
+    db_dir = None
+    if "DB_ENGINE" not in os.environ:
+        db_dir = tempfile.mkdtemp(prefix="yamdb-bench-")
+        os.environ["DB_ENGINE"] = "django.db.backends.sqlite3"
+        os.environ["DB_NAME"] = os.path.join(db_dir, "db.sqlite3")
+    try:
+        setup_django()
+        from django.db import connection
+
+        generate(args)
+        context = prepare()
+        connection.close()
+        results = run_profiles(
+            [p for p in PROFILES if p.name in args.profile],
+            [case for case in CASES if case.name in ENDPOINTS],
+            context, args,
+        )
+    finally:
+        if db_dir:
+            shutil.rmtree(db_dir, ignore_errors=True)
+
+    write_json(args.output, {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "database": connection.vendor,
+            "cpus": os.cpu_count(),
+            "options": {
+                key: value for key, value in vars(args).items()
+                if key != "output"
+            },
+        },
+        "results": results,
+    })
+    report(results)
+    print(f"Результаты: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
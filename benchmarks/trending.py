@@ -0,0 +1,131 @@
+"""Лента популярного: готовая оценка против агрегации по отзывам.
+
+    python -m benchmarks.trending --reviews 10000000 --titles 100000
+
+Отзывы равномерно раскиданы по последним --days дням. Для сравнения
+лента считается и на лету, только по числу отзывов за неделю, — даже
+эта упрощенная агрегация читает все свежие отзывы. Отдельно замеряются
+проход decay_trending и полный пересчет --rebuild.
+"""
+import argparse
+import io
+import random
+import time
+from datetime import timedelta
+
+from .utils import measure, print_table, setup_django, summary
+
+CHUNK = 10000
+
+
+def fill(reviews, titles, days):
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+    from django.utils import timezone
+    from reviews.models import Review, Title
+    from reviews.signals import muted
+
+    user_model = get_user_model()
+    per_title = -(-reviews // titles)
+    rnd = random.Random(0)
+    now = timezone.now()
+    # Даты из прошлого: auto_now_add перезаписал бы их при вставке.
+    Review._meta.get_field("pub_date").auto_now_add = False
+    with muted(), transaction.atomic():
+        user_model.objects.bulk_create(
+            user_model(username=f"bench{idx}", email=f"bench{idx}@yamdb.fake")
+            for idx in range(per_title)
+        )
+        authors = list(
+            user_model.objects.filter(
+                username__startswith="bench"
+            ).values_list("id", flat=True)
+        )
+        for start in range(0, titles, CHUNK):
+            Title.objects.bulk_create(
+                Title(name=f"Произведение {idx}", year=2000)
+                for idx in range(start, min(titles, start + CHUNK))
+            )
+        title_ids = list(Title.objects.values_list("id", flat=True))
+        pairs = (
+            (title_id, author_id)
+            for author_id in authors
+            for title_id in title_ids
+        )
+        left = reviews
+        while left:
+            chunk = []
+            for title_id, author_id in pairs:
+                chunk.append(Review(
+                    title_id=title_id,
+                    author_id=author_id,
+                    text="Текст",
+                    score=rnd.randint(1, 10),
+                    pub_date=now - timedelta(
+                        seconds=rnd.uniform(0, days * 86400)
+                    ),
+                ))
+                if len(chunk) == min(CHUNK, left):
+                    break
+            Review.objects.bulk_create(chunk)
+            left -= len(chunk)
+
+
+def aggregate_feed(limit):
+    from django.db.models import Count
+    from django.utils import timezone
+    from reviews.models import Review
+
+    since = timezone.now() - timedelta(days=7)
+    return list(
+        Review.objects.filter(pub_date__gte=since)
+        .order_by()
+        .values("title")
+        .annotate(volume=Count("id"))
+        .order_by("-volume")[:limit]
+    )
+
+
+def timed(func):
+    started = time.perf_counter()
+    func()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reviews", type=int, default=10000000)
+    parser.add_argument("--titles", type=int, default=100000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.management import call_command
+    from django.test import Client
+
+    fill(args.reviews, args.titles, args.days)
+    quiet = io.StringIO()
+    rebuild = timed(
+        lambda: call_command("decay_trending", rebuild=True, stdout=quiet)
+    )
+    decay = timed(lambda: call_command("decay_trending", stdout=quiet))
+
+    client = Client()
+    rows = []
+    cases = {
+        "/titles/trending/": lambda: client.get(
+            "/api/v1/titles/trending/", {"limit": args.limit}
+        ),
+        "aggregate by pub_date": lambda: aggregate_feed(args.limit),
+    }
+    for name, func in cases.items():
+        stats = summary(measure(func, repeat=args.repeat))
+        rows.append((name, f"{stats['p50']:.2f}", f"{stats['p95']:.2f}"))
+    print_table(("feed", "p50, ms", "p95, ms"), rows)
+    print(f"decay_trending: {decay:.0f} ms, --rebuild: {rebuild:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Общие помощники для бенчмарков.
+
+Запуск из корня репозитория: ``python -m benchmarks.<имя>``. Без
+переменной DB_ENGINE бенчмарки работают на SQLite в памяти, с ней — на
+базе из настроек проекта.
+"""
+import os
+import statistics
+import sys
+import time
+from os.path import abspath, dirname, join
+
+root_dir = dirname(dirname(abspath(__file__)))
+sys.path.insert(0, join(root_dir, "api_yamdb"))
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "api_yamdb.settings_test")
+    # Строгий поиск N+1 из тестовых настроек исказил бы замеры.
+    os.environ.setdefault("QUERY_DETECTOR", "off")
+    import django
+    from django.core.management import call_command
+
+    django.setup()
+    call_command("migrate", verbosity=0)
+
+
+def measure(func, repeat=20, warmup=2):
+    """Время вызовов func в миллисекундах."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def percentile(ordered, share):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def summary(timings):
+    ordered = sorted(timings)
+    return {
+        "p50": statistics.median(ordered),
+        "p95": percentile(ordered, 0.95),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1],
+    }
+
+
+def print_table(columns, rows):
+    rows = [[str(value) for value in row] for row in rows]
+    widths = [
+        max([len(column)] + [len(row[idx]) for row in rows])
+        for idx, column in enumerate(columns)
+    ]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(v.ljust(w) for v, w in zip(row, widths)))
@@ -1,9 +1,37 @@
 import sys
 from os.path import abspath, dirname, join
 
+import pytest
+
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
 infra_dir_path = join(root_dir, 'infra')
 
 pytest_plugins = [
+    'tests.fixtures.fixture_user',
+    'tests.fixtures.fixture_data',
+    'tests.fixtures.fixture_mail',
 ]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    from django.core.cache import cache
+    from users.authentication import user_cache
+
+    cache.clear()
+    user_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def immediate_on_commit(request, monkeypatch):
+    """В обычном тесте транзакция не коммитится: on_commit выполняется сразу.
+
+    Тесты с django_db(transaction=True) видят настоящий on_commit.
+    """
+    marker = request.node.get_closest_marker('django_db')
+    if marker is None or marker.kwargs.get('transaction'):
+        return
+    monkeypatch.setattr(
+        'django.db.transaction.on_commit', lambda func, using=None: func()
+    )
@@ -0,0 +1,49 @@
+import pytest
+
+
+@pytest.fixture
+def categories():
+    from reviews.models import Category
+
+    return [
+        Category.objects.create(name='Фильм', slug='movie'),
+        Category.objects.create(name='Книга', slug='book'),
+    ]
+
+
+@pytest.fixture
+def genres():
+    from reviews.models import Genre
+
+    return [
+        Genre.objects.create(name='Драма', slug='drama'),
+        Genre.objects.create(name='Комедия', slug='comedy'),
+        Genre.objects.create(name='Фантастика', slug='sci-fi'),
+    ]
+
+
+@pytest.fixture
+def titles(categories, genres):
+    from reviews.models import Title
+
+    result = []
+    for idx in range(3):
+        title = Title.objects.create(
+            name=f'Произведение {idx}',
+            year=2000 + idx,
+            description=f'Описание {idx}',
+            category=categories[idx % len(categories)],
+        )
+        title.genre.set(genres[:idx + 1])
+        result.append(title)
+    return result
+
+
+@pytest.fixture
+def authors(django_user_model):
+    return [
+        django_user_model.objects.create_user(
+            username=f'author{idx}', email=f'author{idx}@yamdb.fake'
+        )
+        for idx in range(4)
+    ]
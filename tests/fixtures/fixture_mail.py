@@ -0,0 +1,62 @@
+import socketserver
+import threading
+
+import pytest
+
+
+class FakeSMTPHandler(socketserver.StreamRequestHandler):
+    """Минимальный SMTP-сервер: принимает письма и запоминает их."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        server = self.server
+        server.connections += 1
+        self.reply('220 fake')
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == 'QUIT':
+                self.reply('221 bye')
+                return
+            if command in ('EHLO', 'HELO'):
+                self.reply('250 fake')
+            elif command == 'RCPT':
+                address = line.split(':', 1)[1].strip(' <>')
+                if address in server.refused:
+                    self.reply('550 refused')
+                else:
+                    self.reply('250 ok')
+            elif command == 'DATA':
+                self.reply('354 go')
+                lines = []
+                for data in self.rfile:
+                    if data == b'.\r\n':
+                        break
+                    lines.append(data.decode())
+                server.messages.append(''.join(lines))
+                self.reply('250 queued')
+            else:
+                self.reply('250 ok')
+
+
+@pytest.fixture
+def smtp_server(settings):
+    server = socketserver.ThreadingTCPServer(
+        ('127.0.0.1', 0), FakeSMTPHandler
+    )
+    server.daemon_threads = True
+    server.connections = 0
+    server.messages = []
+    server.refused = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    settings.EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+    settings.EMAIL_HOST, settings.EMAIL_PORT = server.server_address
+    settings.EMAIL_HOST_USER = ''
+    settings.EMAIL_HOST_PASSWORD = ''
+    settings.EMAIL_USE_TLS = False
+    yield server
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,66 @@
+import pytest
+
+
+@pytest.fixture
+def admin(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestAdmin',
+        email='testadmin@yamdb.fake',
+        password='1234567',
+        role='admin',
+        bio='admin bio',
+    )
+
+
+@pytest.fixture
+def moderator(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestModerator',
+        email='testmoder@yamdb.fake',
+        password='1234567',
+        role='moderator',
+        bio='moder bio',
+    )
+
+
+@pytest.fixture
+def user(django_user_model):
+    return django_user_model.objects.create_user(
+        username='TestUser',
+        email='testuser@yamdb.fake',
+        password='1234567',
+        role='user',
+        bio='user bio',
+    )
+
+
+def get_client(user):
+    from rest_framework.test import APIClient
+    from users.authentication import RoleRefreshToken
+
+    client = APIClient()
+    refresh = RoleRefreshToken.for_user(user)
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {refresh.access_token}')
+    return client
+
+
+@pytest.fixture
+def admin_client(admin):
+    return get_client(admin)
+
+
+@pytest.fixture
+def moderator_client(moderator):
+    return get_client(moderator)
+
+
+@pytest.fixture
+def user_client(user):
+    return get_client(user)
+
+
+@pytest.fixture
+def anon_client():
+    from rest_framework.test import APIClient
+
+    return APIClient()
@@ -0,0 +1,14 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def count_queries(func):
+    # Тест идет внутри транзакции, и atomic() добавляет точки сохранения:
+    # в работе их нет, поэтому не считаем.
+    with CaptureQueriesContext(connection) as context:
+        response = func()
+    queries = [
+        query['sql'] for query in context.captured_queries
+        if 'SAVEPOINT' not in query['sql']
+    ]
+    return response, len(queries)
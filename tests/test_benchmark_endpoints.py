@@ -0,0 +1,59 @@
+import io
+
+import pytest
+from django.core.management import call_command
+
+from benchmarks import endpoints
+
+
+def result(p50=1.0, p95=2.0, queries=3, errors=0):
+    return {'p50': p50, 'p95': p95, 'queries': queries, 'errors': errors}
+
+
+class TestCompare:
+
+    def test_within_tolerance(self):
+        baseline = {'client': {'titles list': result()}}
+        results = {'client': {
+            'titles list': result(p50=1.4, p95=2.9),
+            'genres': result(p50=100),
+        }}
+        assert endpoints.compare(results, baseline, 0.25) == {}, (
+            'Проверьте, что шум и маршруты без базы не считаются регрессией'
+        )
+
+    def test_regressions(self):
+        baseline = {'client': {
+            'titles list': result(),
+            'signup': result(errors=2),
+        }}
+        results = {'client': {
+            'titles list': result(p50=2.0, queries=4, errors=1),
+            'signup': result(errors=5),
+        }}
+        regressions = endpoints.compare(results, baseline, 0.25)
+        assert list(regressions) == [('client', 'titles list')]
+        problems = regressions['client', 'titles list']
+        assert [problem.split()[0] for problem in problems] == [
+            'p50', 'queries', 'errors'
+        ]
+
+
+@pytest.mark.django_db
+class TestRunClient:
+
+    def test_all_routes(self):
+        call_command(
+            'generate_data', users=20, titles=10, reviews=60, comments=30,
+            stdout=io.StringIO(),
+        )
+        context = endpoints.prepare()
+        results = endpoints.run_client(
+            endpoints.CASES, context, repeat=3, warmup=1
+        )
+        assert list(results) == [case.name for case in endpoints.CASES]
+        failed = [name for name, row in results.items() if row['errors']]
+        assert failed == [], 'Проверьте, что все маршруты отвечают без ошибок'
+        assert results['titles list']['queries'] > 0
+        assert results['titles list']['requests'] == 3
+        assert set(results['token']) >= {'p50', 'p95', 'p99', 'rps'}
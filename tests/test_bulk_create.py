@@ -0,0 +1,248 @@
+import pytest
+from django.db import connection
+
+from tests.fixtures.queries import count_queries
+
+
+def title_items(count, genre='drama', category='movie'):
+    return [
+        {
+            'name': f'Новое {idx}',
+            'year': 1990 + idx % 30,
+            'description': 'Описание',
+            'genre': [genre, 'comedy'],
+            'category': category,
+        }
+        for idx in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestBulkCreate:
+
+    def test_titles(self, admin_client, genres, categories):
+        from reviews.models import Title
+
+        response = admin_client.post(
+            '/api/v1/titles/bulk/', title_items(3), format='json'
+        )
+        assert response.status_code == 201, response.json()
+        data = response.json()
+        assert [item['name'] for item in data] == [
+            'Новое 0', 'Новое 1', 'Новое 2'
+        ]
+        assert data[0]['genre'] == ['drama', 'comedy']
+        assert data[0]['category'] == 'movie'
+        title = Title.objects.get(pk=data[2]['id'])
+        assert set(title.genre.values_list('slug', flat=True)) == {
+            'drama', 'comedy'
+        }
+        assert title.category == categories[0]
+
+    def test_titles_reset_cache(self, admin_client, anon_client, genres,
+                                categories):
+        assert anon_client.get('/api/v1/titles/').json()['count'] == 0
+        admin_client.post(
+            '/api/v1/titles/bulk/', title_items(2), format='json'
+        )
+        assert anon_client.get('/api/v1/titles/').json()['count'] == 2, (
+            'Проверьте, что пачка сбрасывает кеш списка произведений'
+        )
+
+    def test_titles_queries(self, admin_client, genres, categories):
+        if not connection.features.can_return_ids_from_bulk_insert:
+            pytest.skip('База не возвращает ключи из bulk_create')
+        # Права администратора попадают в общий кеш первым запросом.
+        admin_client.get('/api/v1/users/me/')
+        _, small = count_queries(lambda: admin_client.post(
+            '/api/v1/titles/bulk/', title_items(2), format='json'
+        ))
+        _, large = count_queries(lambda: admin_client.post(
+            '/api/v1/titles/bulk/', title_items(50), format='json'
+        ))
+        assert small == large, (
+            'Проверьте, что число запросов не зависит от размера пачки'
+        )
+
+    def test_titles_repeated_genre(self, admin_client, genres, categories):
+        from reviews.models import GenreTitle
+
+        items = title_items(1)
+        items[0]['genre'] = ['comedy', 'drama', 'comedy']
+        response = admin_client.post(
+            '/api/v1/titles/bulk/', items, format='json'
+        )
+        assert response.status_code == 201, response.json()
+        assert sorted(response.json()[0]['genre']) == ['comedy', 'drama']
+        assert GenreTitle.objects.count() == 2, (
+            'Проверьте, что повтор жанра не создает лишнюю связь'
+        )
+
+    def test_titles_item_errors(self, admin_client, genres, categories):
+        from reviews.models import Title
+
+        items = title_items(3)
+        items[1]['genre'] = ['drama', 'western']
+        items[2]['category'] = 'music'
+        response = admin_client.post(
+            '/api/v1/titles/bulk/', items, format='json'
+        )
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        assert list(errors[1]) == ['genre']
+        assert list(errors[2]) == ['category']
+        assert not Title.objects.exists(), (
+            'Проверьте, что пачка с ошибками не сохраняется даже частично'
+        )
+
+    def test_titles_field_errors(self, admin_client, genres, categories):
+        items = title_items(2)
+        items[1]['year'] = 3000
+        response = admin_client.post(
+            '/api/v1/titles/bulk/', items, format='json'
+        )
+        assert response.status_code == 400
+        assert response.json()[0] == {}
+        assert 'year' in response.json()[1]
+
+    def test_bad_payload(self, admin_client):
+        url = '/api/v1/titles/bulk/'
+        for payload in ({'name': 'Не список'}, []):
+            response = admin_client.post(url, payload, format='json')
+            assert response.status_code == 400
+
+    def test_too_many_items(self, admin_client, genres, categories,
+                            settings):
+        settings.BULK_CREATE_MAX_ITEMS = 2
+        response = admin_client.post(
+            '/api/v1/titles/bulk/', title_items(3), format='json'
+        )
+        assert response.status_code == 400
+
+    def test_permissions(self, user_client, anon_client, genres, categories):
+        url = '/api/v1/titles/bulk/'
+        assert user_client.post(
+            url, title_items(1), format='json'
+        ).status_code == 403
+        assert anon_client.post(
+            url, title_items(1), format='json'
+        ).status_code == 401
+
+    def test_genres(self, admin_client, genres):
+        from reviews.models import Genre
+
+        response = admin_client.post('/api/v1/genres/bulk/', [
+            {'name': 'Вестерн', 'slug': 'western'},
+            {'name': 'Нуар', 'slug': 'noir'},
+        ], format='json')
+        assert response.status_code == 201
+        assert response.json()[1] == {'name': 'Нуар', 'slug': 'noir'}
+        assert Genre.objects.filter(slug__in=['western', 'noir']).count() == 2
+
+    def test_slug_conflicts(self, admin_client, categories):
+        from reviews.models import Category
+
+        response = admin_client.post('/api/v1/categories/bulk/', [
+            {'name': 'Музыка', 'slug': 'music'},
+            {'name': 'Кино', 'slug': 'movie'},
+            {'name': 'Песни', 'slug': 'music'},
+        ], format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        assert 'slug' in errors[1], 'Проверьте проверку занятых slug'
+        assert 'slug' in errors[2], 'Проверьте повторы slug внутри пачки'
+        assert Category.objects.count() == 2
+
+    @pytest.mark.parametrize('url', [
+        '/api/v1/categories/', '/api/v1/genres/'
+    ])
+    def test_reserved_slug(self, admin_client, url):
+        item = {'name': 'Пачка', 'slug': 'bulk'}
+        response = admin_client.post(url, item, format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что slug bulk не занимает путь действия bulk'
+        )
+        response = admin_client.post(url + 'bulk/', [item], format='json')
+        assert response.status_code == 400
+        assert 'slug' in response.json()[0]
+
+
+@pytest.mark.django_db
+class TestBulkReviews:
+
+    def test_import(self, admin_client, titles, authors):
+        from reviews.models import LeaderboardEntry
+
+        title = titles[0]
+        response = admin_client.post(
+            f'/api/v1/titles/{title.pk}/reviews/bulk/',
+            [
+                {'author': author.username, 'text': 'Текст', 'score': score}
+                for author, score in zip(authors, (4, 6, 8))
+            ],
+            format='json',
+        )
+        assert response.status_code == 201, response.json()
+        assert {item['author'] for item in response.json()} == {
+            'author0', 'author1', 'author2'
+        }
+        title.refresh_from_db()
+        assert (title.rating_count, title.rating) == (3, 6), (
+            'Проверьте, что импорт обновляет рейтинг произведения'
+        )
+        assert title.trending > 0
+        assert LeaderboardEntry.objects.filter(title=title).exists(), (
+            'Проверьте, что импорт обновляет лидерборд'
+        )
+
+    def test_one_review_per_author(self, admin_client, titles, authors):
+        from reviews.models import Review
+
+        title = titles[0]
+        Review.objects.create(
+            title=title, author=authors[0], text='Текст', score=5
+        )
+        response = admin_client.post(
+            f'/api/v1/titles/{title.pk}/reviews/bulk/',
+            [
+                {'author': 'author0', 'text': 'Текст', 'score': 7},
+                {'author': 'author1', 'text': 'Текст', 'score': 7},
+                {'author': 'author1', 'text': 'Еще', 'score': 2},
+                {'author': 'nobody', 'text': 'Текст', 'score': 7},
+            ],
+            format='json',
+        )
+        assert response.status_code == 400
+        errors = response.json()
+        assert 'author' in errors[0]
+        assert errors[1] == {}
+        assert 'author' in errors[2]
+        assert 'author' in errors[3]
+        assert Review.objects.filter(title=title).count() == 1
+        title.refresh_from_db()
+        assert title.rating == 5
+
+    def test_score_range(self, admin_client, titles, authors):
+        response = admin_client.post(
+            f'/api/v1/titles/{titles[0].pk}/reviews/bulk/',
+            [{'author': 'author0', 'text': 'Текст', 'score': 11}],
+            format='json',
+        )
+        assert response.status_code == 400
+
+    def test_admin_only(self, user_client, moderator_client, titles):
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/bulk/'
+        payload = [{'author': 'TestUser', 'text': 'Текст', 'score': 7}]
+        for client in (user_client, moderator_client):
+            response = client.post(url, payload, format='json')
+            assert response.status_code == 403
+
+    def test_missing_title(self, admin_client, authors):
+        response = admin_client.post(
+            '/api/v1/titles/0/reviews/bulk/',
+            [{'author': 'author0', 'text': 'Текст', 'score': 7}],
+            format='json',
+        )
+        assert response.status_code == 404
@@ -0,0 +1,127 @@
+import time
+
+import pytest
+from django.utils.http import http_date
+
+
+@pytest.fixture
+def later(monkeypatch):
+    """Переводит часы вперед: секунда последних записей уже прошла."""
+    def move(seconds=2):
+        now = time.time() + seconds
+        monkeypatch.setattr('time.time', lambda: now)
+
+    return move
+
+
+@pytest.fixture
+def review(titles, user):
+    from reviews.models import Review
+
+    return Review.objects.create(
+        title=titles[0], author=user, text='Текст', score=6
+    )
+
+
+@pytest.mark.django_db
+class TestConditionalGet:
+
+    def urls(self, review):
+        title_url = f'/api/v1/titles/{review.title_id}/'
+        return (
+            title_url,
+            f'{title_url}reviews/',
+            f'{title_url}reviews/{review.id}/',
+            f'{title_url}reviews/{review.id}/comments/',
+        )
+
+    def test_headers(self, review, anon_client, later):
+        for url in self.urls(review):
+            anon_client.get(url)
+        later()
+        for url in self.urls(review):
+            response = anon_client.get(url)
+            assert response.status_code == 200
+            assert response['ETag'].startswith('"'), (
+                f'Проверьте, что {url} отдает сильный ETag'
+            )
+            assert 'Last-Modified' in response
+
+    def test_not_modified_without_queries(
+        self, review, anon_client, django_assert_num_queries
+    ):
+        for url in self.urls(review):
+            etag = anon_client.get(url)['ETag']
+            with django_assert_num_queries(0):
+                response = anon_client.get(url, HTTP_IF_NONE_MATCH=etag)
+            assert response.status_code == 304, (
+                f'Проверьте, что {url} отвечает 304 на совпавший ETag'
+            )
+
+    def test_if_modified_since(self, review, anon_client, later):
+        url = self.urls(review)[1]
+        anon_client.get(url)
+        later()
+        last_modified = anon_client.get(url)['Last-Modified']
+        response = anon_client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304
+
+    def test_write_in_same_second(self, review, anon_client, user_client):
+        urls = self.urls(review)
+        response = anon_client.get(urls[1])
+        assert 'Last-Modified' not in response, (
+            'Проверьте, что Last-Modified не отдается, пока секунда '
+            'последней записи не прошла'
+        )
+        since = http_date(time.time())
+        response = user_client.patch(urls[2], data={'text': 'Правка'})
+        assert response.status_code == 200
+        response = anon_client.get(urls[1], HTTP_IF_MODIFIED_SINCE=since)
+        assert response.status_code == 200, (
+            'Проверьте, что запись в ту же секунду не дает ответа 304'
+        )
+
+    def test_writes_change_etag(self, review, anon_client, user_client):
+        urls = self.urls(review)
+        reviews_etag = anon_client.get(urls[1])['ETag']
+        comments_etag = anon_client.get(urls[3])['ETag']
+
+        response = user_client.post(urls[3], data={'text': 'Комментарий'})
+        assert response.status_code == 201
+        response = anon_client.get(urls[3], HTTP_IF_NONE_MATCH=comments_etag)
+        assert response.status_code == 200, (
+            'Проверьте, что новый комментарий меняет ETag ленты'
+        )
+        response = user_client.patch(urls[2], data={'text': 'Правка'})
+        assert response.status_code == 200
+        response = anon_client.get(urls[1], HTTP_IF_NONE_MATCH=reviews_etag)
+        assert response.status_code == 200, (
+            'Проверьте, что правка отзыва меняет ETag ленты'
+        )
+
+    def test_username_change_changes_etag(self, review, anon_client, user):
+        url = self.urls(review)[1]
+        etag = anon_client.get(url)['ETag']
+        user.username = 'Renamed'
+        user.save()
+        response = anon_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.json()['results'][0]['author'] == 'Renamed'
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConditionalGetTransactions:
+
+    def test_etag_changes_on_commit(self, review, anon_client):
+        from django.db import transaction
+
+        url = f'/api/v1/titles/{review.title_id}/reviews/'
+        etag = anon_client.get(url)['ETag']
+        with transaction.atomic():
+            review.text = 'Новый текст'
+            review.save()
+            assert anon_client.get(url)['ETag'] == etag, (
+                'Проверьте, что ETag не меняется до коммита записи: иначе '
+                'под новым ETag может уйти прежнее содержимое'
+            )
+        assert anon_client.get(url)['ETag'] != etag
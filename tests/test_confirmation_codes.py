@@ -0,0 +1,73 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def signup(client, username='newbie'):
+    from users.models import OutgoingEmail
+
+    response = client.post(
+        '/api/v1/auth/signup/',
+        {'username': username, 'email': f'{username}@yamdb.fake'},
+    )
+    assert response.status_code == 200
+    body = OutgoingEmail.objects.get(to=f'{username}@yamdb.fake').body
+    return re.search(r'код: (\S+)', body).group(1)
+
+
+def get_token(client, code, username='newbie'):
+    return client.post(
+        '/api/v1/auth/token/',
+        {'username': username, 'confirmation_code': code},
+    )
+
+
+@pytest.mark.django_db
+class TestConfirmationCodes:
+
+    def test_code_gives_token(self, client):
+        code = signup(client)
+        response = get_token(client, code)
+        assert response.status_code == 200
+        assert 'access' in response.json()
+
+    def test_signup_does_not_update_user(self, client):
+        with CaptureQueriesContext(connection) as context:
+            signup(client)
+        updates = [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('UPDATE')
+        ]
+        assert updates == [], (
+            'Проверьте, что код подтверждения не сохраняется в пользователе'
+        )
+
+    @pytest.mark.parametrize('code', ['', 'abc', 'zz-zz', '1-2-3'])
+    def test_invalid_code(self, client, code):
+        signup(client)
+        assert get_token(client, code).status_code == 400
+
+    def test_code_of_other_user(self, client):
+        signup(client, 'other')
+        code = signup(client)
+        assert get_token(client, code, 'other').status_code == 400
+
+    def test_code_expires(self, client, settings, monkeypatch):
+        from users import tokens
+
+        code = signup(client)
+        now = tokens.time.time()
+        settings.CONFIRMATION_CODE_TIMEOUT = 60
+        monkeypatch.setattr(tokens.time, 'time', lambda: now + 61)
+        assert get_token(client, code).status_code == 400, (
+            'Проверьте, что код действует ограниченное время'
+        )
+
+    def test_code_bound_to_email(self, client, django_user_model):
+        code = signup(client)
+        django_user_model.objects.filter(username='newbie').update(
+            email='changed@yamdb.fake'
+        )
+        assert get_token(client, code).status_code == 400
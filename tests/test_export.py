@@ -0,0 +1,179 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+
+@pytest.fixture
+def comments(titles, authors):
+    from reviews.models import Comment, Review
+
+    result = []
+    for idx, author in enumerate(authors[:3]):
+        review = Review.objects.create(
+            title=titles[idx % 2], author=author, text=f'Отзыв {idx}',
+            score=idx + 4,
+        )
+        result.append(Comment.objects.create(
+            review=review, author=authors[3], text=f'Комментарий, "{idx}"'
+        ))
+    return result
+
+
+def content(response):
+    assert response.status_code == 200
+    assert response.streaming, 'Проверьте, что выгрузка отдается потоком'
+    return b''.join(response.streaming_content).decode()
+
+
+def ndjson(response):
+    return [json.loads(line) for line in content(response).splitlines()]
+
+
+def age(queryset, days=10):
+    queryset.update(modified=timezone.now() - timedelta(days=days))
+
+
+@pytest.mark.django_db
+class TestExport:
+
+    def test_titles_ndjson(self, titles, admin_client):
+        response = admin_client.get('/api/v1/export/titles/')
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        rows = ndjson(response)
+        assert [row['id'] for row in rows] == [title.pk for title in titles]
+        assert rows[2]['genre'] == ['comedy', 'drama', 'sci-fi']
+        assert rows[1]['category'] == 'book'
+        assert rows[0]['name'] == 'Произведение 0'
+
+    def test_small_chunks(self, titles, admin_client, settings):
+        settings.EXPORT_CHUNK_SIZE = 2
+        rows = ndjson(admin_client.get('/api/v1/export/titles/'))
+        assert [len(row['genre']) for row in rows] == [1, 2, 3], (
+            'Проверьте, что жанры подгружаются для каждой порции'
+        )
+
+    def test_comments_csv(self, comments, admin_client):
+        response = admin_client.get(
+            '/api/v1/export/comments/', {'output': 'csv'}
+        )
+        assert response['Content-Type'].startswith('text/csv')
+        rows = list(csv.DictReader(io.StringIO(content(response))))
+        assert len(rows) == 3
+        assert rows[1]['text'] == 'Комментарий, "1"'
+        assert rows[1]['author'] == 'author3'
+        assert int(rows[1]['title_id']) == comments[1].review.title_id
+
+    def test_titles_csv_genres(self, titles, admin_client):
+        response = admin_client.get(
+            '/api/v1/export/titles/', {'output': 'csv'}
+        )
+        rows = list(csv.DictReader(io.StringIO(content(response))))
+        assert rows[2]['genre'] == 'comedy,drama,sci-fi'
+
+    def test_reviews_since(self, comments, titles, admin_client):
+        from reviews.models import Review
+
+        age(Review.objects.exclude(pk=comments[2].review_id))
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        rows = ndjson(admin_client.get(
+            '/api/v1/export/reviews/', {'since': since}
+        ))
+        assert [row['id'] for row in rows] == [comments[2].review_id]
+
+    def test_edited_review_since(self, comments, admin_client):
+        from reviews.models import Review
+
+        age(Review.objects.all())
+        review = Review.objects.get(pk=comments[0].review_id)
+        review.text = 'Исправленный отзыв'
+        review.save()
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        rows = ndjson(admin_client.get(
+            '/api/v1/export/reviews/', {'since': since}
+        ))
+        assert [row['text'] for row in rows] == ['Исправленный отзыв'], (
+            'Проверьте, что измененный отзыв попадает в выгрузку изменений'
+        )
+
+    def test_deleted_category_since(self, titles, admin_client):
+        from reviews.models import Category, Title
+
+        age(Title.objects.all())
+        Category.objects.get(slug='book').delete()
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        rows = ndjson(admin_client.get(
+            '/api/v1/export/titles/', {'since': since}
+        ))
+        assert [(row['id'], row['category']) for row in rows] == [
+            (titles[1].pk, None)
+        ], 'Проверьте, что потеря категории попадает в выгрузку изменений'
+
+    def test_titles_since(self, titles, authors, admin_client):
+        from reviews.models import Review, Title
+
+        age(Title.objects.all())
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        url = '/api/v1/export/titles/'
+        assert ndjson(admin_client.get(url, {'since': since})) == []
+        Review.objects.create(
+            title=titles[1], author=authors[0], text='Отзыв', score=8
+        )
+        rows = ndjson(admin_client.get(url, {'since': since}))
+        assert [(row['id'], row['rating']) for row in rows] == [
+            (titles[1].pk, 8)
+        ], 'Проверьте, что новая оценка попадает в выгрузку изменений'
+
+    def test_bad_params(self, admin_client):
+        assert admin_client.get('/api/v1/export/users/').status_code == 404
+        for params in ({'output': 'xml'}, {'since': 'вчера'}):
+            response = admin_client.get('/api/v1/export/reviews/', params)
+            assert response.status_code == 400
+
+    def test_admin_only(self, user_client, moderator_client, anon_client):
+        url = '/api/v1/export/reviews/'
+        assert anon_client.get(url).status_code == 401
+        assert user_client.get(url).status_code == 403
+        assert moderator_client.get(url).status_code == 403
+
+
+@pytest.mark.django_db
+class TestExportCommand:
+
+    def test_stdout(self, comments):
+        out = io.StringIO()
+        call_command('export_data', 'reviews', stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [row['score'] for row in rows] == [4, 5, 6]
+
+    def test_file(self, titles, tmp_path):
+        path = tmp_path / 'titles.csv'
+        call_command(
+            'export_data', 'titles', '--format', 'csv', '--chunk-size', '1',
+            '--output', str(path),
+        )
+        with open(path, encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        assert [row['genre'] for row in rows] == [
+            'drama', 'comedy,drama', 'comedy,drama,sci-fi'
+        ]
+
+    def test_since(self, comments):
+        from reviews.models import Review
+
+        age(Review.objects.all(), days=3)
+        out = io.StringIO()
+        call_command(
+            'export_data', 'comments', '--since', '2000-01-01', stdout=out
+        )
+        assert len(out.getvalue().splitlines()) == 3
+        out = io.StringIO()
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        call_command('export_data', 'reviews', '--since', since, stdout=out)
+        assert out.getvalue() == ''
+        with pytest.raises(CommandError):
+            call_command('export_data', 'reviews', '--since', '2000-13-01')
@@ -0,0 +1,110 @@
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+
+
+@pytest.fixture
+def catalog(titles, authors, genres):
+    from reviews.models import Comment, Review, Title
+
+    Title.objects.create(name='Без категории', year=1990)
+    Title.objects.create(
+        name='Без описания', year=1991, description=None,
+        category=titles[0].category,
+    ).genre.set([genres[2], genres[0]])
+    for idx, author in enumerate(authors):
+        for title in titles[:2]:
+            review = Review.objects.create(
+                title=title, author=author, text=f'Отзыв {idx}',
+                score=idx + 5,
+            )
+            Comment.objects.create(
+                review=review, author=authors[0], text=f'Комментарий {idx}'
+            )
+    return titles
+
+
+def fetch(client, settings, fast, url, params=None):
+    settings.API_FAST_READS = fast
+    cache.clear()
+    response = client.get(url, params)
+    assert response.status_code == 200
+    return response.content
+
+
+def assert_same(client, settings, url, params=None):
+    slow = fetch(client, settings, False, url, params)
+    fast = fetch(client, settings, True, url, params)
+    assert fast == slow, (
+        'Проверьте, что быстрый ответ совпадает с ответом сериализатора'
+    )
+
+
+TITLE_PARAMS = (
+    {},
+    {'limit': 500},
+    {'genre': 'drama'},
+    {'category': 'book'},
+    {'ordering': '-rating'},
+    {'ordering': 'year', 'offset': 1, 'limit': 2},
+    {'search': 'Описание'},
+    {'fields': 'id,genre'},
+    {'omit': 'description,category'},
+)
+
+
+@pytest.mark.django_db
+class TestFastSerializers:
+
+    @pytest.mark.parametrize('params', TITLE_PARAMS)
+    def test_titles(self, catalog, anon_client, settings, params):
+        assert_same(anon_client, settings, '/api/v1/titles/', params)
+
+    def test_trending(self, catalog, anon_client, settings):
+        assert_same(anon_client, settings, '/api/v1/titles/trending/')
+        assert_same(
+            anon_client, settings, '/api/v1/titles/trending/',
+            {'fields': 'name,category'},
+        )
+
+    @pytest.mark.parametrize('params', (
+        {},
+        {'limit': 2, 'offset': 1},
+        {'cursor': '', 'limit': 3},
+        {'fields': 'author,score'},
+    ))
+    def test_reviews(self, catalog, anon_client, settings, params):
+        url = f'/api/v1/titles/{catalog[0].pk}/reviews/'
+        assert_same(anon_client, settings, url, params)
+
+    def test_review_cursor_pages(self, catalog, anon_client, settings):
+        url = f'/api/v1/titles/{catalog[0].pk}/reviews/'
+        params = {'cursor': '', 'limit': 2, 'fields': 'id'}
+        first = fetch(anon_client, settings, True, url, params)
+        assert first == fetch(anon_client, settings, False, url, params)
+        next_url = anon_client.get(url, params).json()['next']
+        assert_same(anon_client, settings, next_url)
+
+    @pytest.mark.parametrize('params', ({}, {'omit': 'pub_date'}))
+    def test_comments(self, catalog, anon_client, settings, params):
+        from reviews.models import Review
+
+        review = Review.objects.filter(title=catalog[0]).first()
+        url = (
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/comments/'
+        )
+        assert_same(anon_client, settings, url, params)
+
+    def test_serializer_bypassed(self, catalog, anon_client, settings):
+        from api.serializers import TitleDisplaySerializer
+
+        settings.API_FAST_READS = True
+        with mock.patch.object(
+            TitleDisplaySerializer, 'to_representation',
+            side_effect=AssertionError,
+        ):
+            response = anon_client.get('/api/v1/titles/')
+        assert response.status_code == 200, (
+            'Проверьте, что список собирается без полей DRF'
+        )
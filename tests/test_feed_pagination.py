@@ -0,0 +1,113 @@
+import pytest
+from django.utils import timezone
+
+
+@pytest.fixture
+def title_reviews(titles, django_user_model):
+    from reviews.models import Review
+
+    django_user_model.objects.bulk_create(
+        django_user_model(username=f'reader{idx}', email=f'r{idx}@yamdb.fake')
+        for idx in range(25)
+    )
+    authors = django_user_model.objects.filter(username__startswith='reader')
+    Review.objects.bulk_create(
+        Review(title=titles[0], author=author, text='Текст', score=5)
+        for author in authors
+    )
+    # Половина отзывов с одинаковой датой: порядок должен держаться на id.
+    now = timezone.now()
+    reviews = list(Review.objects.filter(title=titles[0]).order_by('id'))
+    for idx, review in enumerate(reviews):
+        Review.objects.filter(pk=review.pk).update(
+            pub_date=now - timezone.timedelta(minutes=idx // 2)
+        )
+    return list(
+        Review.objects.filter(title=titles[0]).order_by('-pub_date', '-id')
+    )
+
+
+@pytest.mark.django_db
+class TestFeedPagination:
+
+    def url(self, title_reviews):
+        return f'/api/v1/titles/{title_reviews[0].title_id}/reviews/'
+
+    def walk(self, client, url, params):
+        ids = []
+        response = client.get(url, params)
+        while True:
+            assert response.status_code == 200
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что курсорная пагинация не считает COUNT(*)'
+            )
+            ids.extend(item['id'] for item in data['results'])
+            if data['next'] is None:
+                return ids
+            response = client.get(data['next'])
+
+    def test_offset_mode_is_default(self, title_reviews, anon_client):
+        response = anon_client.get(self.url(title_reviews), {'offset': 20})
+        data = response.json()
+        assert data['count'] == len(title_reviews)
+        assert [item['id'] for item in data['results']] == [
+            review.id for review in title_reviews[20:]
+        ]
+
+    def test_cursor_walks_whole_feed(self, title_reviews, anon_client):
+        ids = self.walk(
+            anon_client, self.url(title_reviews), {'cursor': '', 'limit': 4}
+        )
+        assert ids == [review.id for review in title_reviews], (
+            'Проверьте, что курсор проходит ленту по (pub_date, id) '
+            'без пропусков и повторов'
+        )
+
+    def test_cursor_is_stable_under_inserts(
+        self, title_reviews, anon_client, user
+    ):
+        from reviews.models import Review
+
+        url = self.url(title_reviews)
+        first = anon_client.get(url, {'cursor': '', 'limit': 5}).json()
+        Review.objects.create(
+            title_id=title_reviews[0].title_id, author=user, text='Новый',
+            score=1,
+        )
+        second = anon_client.get(first['next']).json()
+        assert [item['id'] for item in second['results']] == [
+            review.id for review in title_reviews[5:10]
+        ]
+
+    def test_cursor_query_count(
+        self, title_reviews, anon_client, django_assert_num_queries
+    ):
+        url = self.url(title_reviews)
+        first = anon_client.get(url, {'cursor': '', 'limit': 5}).json()
+        # Произведение и страница отзывов вместе с авторами.
+        with django_assert_num_queries(2):
+            anon_client.get(first['next'])
+
+    def test_invalid_cursor(self, title_reviews, anon_client):
+        response = anon_client.get(
+            self.url(title_reviews), {'cursor': 'bm9wZQ=='}
+        )
+        assert response.status_code == 404
+
+    def test_comments_cursor(self, title_reviews, anon_client, user):
+        from reviews.models import Comment
+
+        review = title_reviews[0]
+        Comment.objects.bulk_create(
+            Comment(review=review, author=user, text=f'Комментарий {idx}')
+            for idx in range(7)
+        )
+        url = (
+            f'/api/v1/titles/{review.title_id}/reviews/{review.id}/comments/'
+        )
+        ids = self.walk(anon_client, url, {'cursor': '', 'limit': 3})
+        expected = Comment.objects.filter(review=review).order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True)
+        assert ids == list(expected)
@@ -0,0 +1,97 @@
+import io
+from collections import Counter
+
+import pytest
+from django.core.management import CommandError, call_command
+
+
+def generate(**options):
+    params = {
+        'users': 30, 'categories': 3, 'genres': 5, 'titles': 40,
+        'reviews': 300, 'comments': 200, 'seed': 1, 'end': '2026-01-01',
+        'batch_size': 50,
+    }
+    params.update(options)
+    call_command('generate_data', stdout=io.StringIO(), **params)
+
+
+def review_rows():
+    from reviews.models import Review
+
+    return list(Review.objects.order_by('pk').values_list(
+        'title_id', 'author_id', 'score', 'text', 'pub_date'
+    ))
+
+
+@pytest.mark.django_db
+class TestGenerateData:
+
+    def test_volumes(self, admin):
+        from reviews.models import (Category, Comment, Genre, GenreTitle,
+                                    Review, Title)
+        from users.models import User
+
+        generate()
+        assert User.objects.count() == 30, (
+            'Проверьте, что прежние данные заменяются сгенерированными'
+        )
+        assert Category.objects.count() == 3
+        assert Genre.objects.count() == 5
+        assert Title.objects.count() == 40
+        assert Review.objects.count() == 300
+        assert Comment.objects.count() == 200
+        assert GenreTitle.objects.count() >= 40
+        assert User.objects.get(pk=1).role == 'admin'
+
+    def test_deterministic(self):
+        generate()
+        first = review_rows()
+        generate(comments=50)
+        assert review_rows() == first, (
+            'Проверьте, что отзывы зависят только от --seed и --end'
+        )
+        generate(seed=2)
+        assert review_rows() != first
+
+    def test_distribution(self):
+        from reviews.models import Review
+
+        generate()
+        pairs = list(Review.objects.values_list('title_id', 'author_id'))
+        assert len(set(pairs)) == len(pairs), (
+            'Проверьте, что у автора один отзыв на произведение'
+        )
+        counts = sorted(
+            Counter(title_id for title_id, _ in pairs).values(), reverse=True
+        )
+        assert counts[0] == 30, (
+            'Проверьте, что отзывов на произведение не больше, чем авторов'
+        )
+        assert counts[0] > 3 * counts[len(counts) // 2]
+
+    def test_ratings_and_sequences(self):
+        from django.db.models import Count, Sum
+        from reviews.models import Comment, Title
+
+        generate()
+        title = Title.objects.annotate(
+            total=Sum('reviews__score'), count=Count('reviews')
+        ).order_by('-count').first()
+        assert (title.rating_sum, title.rating_count) == (
+            title.total, title.count
+        ), 'Проверьте, что рейтинги пересчитываются после загрузки'
+        assert title.rating is not None
+        comment = Comment.objects.create(
+            review_id=1, author_id=1, text='Новый'
+        )
+        assert comment.pk == 201, (
+            'Проверьте, что счетчики ключей сдвинуты после вставки'
+        )
+
+    def test_bad_options(self):
+        with pytest.raises(CommandError):
+            generate(titles=2, users=3, reviews=7)
+        with pytest.raises(CommandError):
+            generate(reviews=0, comments=5)
+        with pytest.raises(CommandError):
+            generate(end='2026-13-01')
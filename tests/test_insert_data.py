@@ -0,0 +1,212 @@
+import copy
+import csv
+from datetime import timedelta
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+DATA = {
+    'users.csv': [
+        ['id', 'username', 'email', 'role', 'bio', 'first_name', 'last_name'],
+        ['100', 'bingobongo', 'bingobongo@yamdb.fake', 'user', '', '', ''],
+        ['101', 'capt_obvious', 'capt@yamdb.fake', 'admin', '', '', ''],
+    ],
+    'category.csv': [
+        ['id', 'name', 'slug'],
+        ['1', 'Фильм', 'movie'],
+    ],
+    'genre.csv': [
+        ['id', 'name', 'slug'],
+        ['1', 'Драма', 'drama'],
+        ['2', 'Комедия', 'comedy'],
+    ],
+    'titles.csv': [
+        ['id', 'name', 'year', 'category'],
+        ['1', 'Побег из Шоушенка', '1994', '1'],
+        ['2', 'Крестный отец', '1972', ''],
+    ],
+    'genre_title.csv': [
+        ['id', 'title_id', 'genre_id'],
+        ['1', '1', '1'],
+        ['2', '1', '2'],
+        ['3', '2', '1'],
+    ],
+    'review.csv': [
+        ['id', 'title_id', 'text', 'author', 'score', 'pub_date'],
+        ['1', '1', 'Отлично', '100', '10', '2019-09-24T21:08:21.567Z'],
+        ['2', '1', 'Хорошо', '101', '7', '2019-09-24T21:08:21.567Z'],
+        ['3', '99', 'Нет такого', '100', '5', '2019-09-24T21:08:21.567Z'],
+    ],
+    'comments.csv': [
+        ['id', 'review_id', 'text', 'author', 'pub_date'],
+        ['1', '1', 'Согласен', '101', '2019-09-24T21:08:21.567Z'],
+    ],
+}
+
+
+def write_data(data_dir, data):
+    for filename, rows in data.items():
+        with open(data_dir / filename, 'w', encoding='UTF-8') as csv_file:
+            csv.writer(csv_file).writerows(rows)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    write_data(tmp_path, DATA)
+    return tmp_path
+
+
+@pytest.mark.django_db
+class TestInsertData:
+
+    @pytest.mark.parametrize('no_copy', [False, True])
+    def test_import(self, data_dir, titles, user, no_copy):
+        from django.contrib.auth import get_user_model
+        from reviews.models import Comment, GenreTitle, Review, Title
+
+        call_command(
+            'insert_data', data_dir=str(data_dir), batch_size=2,
+            no_copy=no_copy,
+        )
+
+        users = get_user_model().objects
+        assert set(users.values_list('username', flat=True)) == {
+            'bingobongo', 'capt_obvious'
+        }, 'Проверьте, что загрузка заменяет старые данные'
+        assert set(Title.objects.values_list('id', flat=True)) == {1, 2}
+        assert GenreTitle.objects.count() == 3
+        assert Review.objects.count() == 2, (
+            'Проверьте, что отзыв на несуществующее произведение пропущен'
+        )
+        assert Comment.objects.get().author.username == 'capt_obvious'
+        title = Title.objects.get(pk=1)
+        assert (title.rating_count, title.rating) == (2, 9)
+        assert title.category.slug == 'movie'
+        assert Title.objects.get(pk=2).category is None
+
+        # Счетчики ключей продвинуты за загруженные id.
+        assert users.create(username='new', email='new@yamdb.fake').pk > 101
+
+    def test_missing_file_keeps_data(self, data_dir, titles):
+        from reviews.models import Title
+
+        (data_dir / 'comments.csv').unlink()
+        with pytest.raises(CommandError):
+            call_command('insert_data', data_dir=str(data_dir))
+        assert Title.objects.count() == len(titles)
+
+    def test_sync(self, data_dir):
+        from reviews.models import Comment, Review, Title
+
+        call_command('insert_data', data_dir=str(data_dir))
+        comment = Comment.objects.get()
+        old = timezone.now() - timedelta(days=1)
+        Review.objects.update(modified=old)
+
+        data = copy.deepcopy(DATA)
+        data['titles.csv'][1][1] = 'Зеленая миля'
+        data['titles.csv'].append(['3', 'Новое', '2000', '1'])
+        data['review.csv'][2][4] = '1'
+        data['review.csv'].append(
+            ['4', '3', 'Новый', '100', '4', '2019-09-24T21:08:21.567Z']
+        )
+        data['category.csv'].append(['2', 'Книга', 'book'])
+        write_data(data_dir, data)
+        call_command('insert_data', data_dir=str(data_dir), sync=True)
+
+        assert Title.objects.get(pk=1).name == 'Зеленая миля'
+        assert Title.objects.get(pk=3).rating == 4
+        assert Title.objects.get(pk=1).rating == 6, (
+            'Проверьте, что измененная оценка пересчитывает рейтинг'
+        )
+        assert Comment.objects.get() == comment, (
+            'Проверьте, что синхронизация не пересоздает строки'
+        )
+        assert Comment.objects.get().pub_date == comment.pub_date
+        assert Review.objects.get(pk=2).modified > old, (
+            'Проверьте, что синхронизация сдвигает время изменения'
+        )
+        assert Review.objects.get(pk=1).modified == old
+
+        data['review.csv'].pop(2)
+        data['category.csv'].pop(2)
+        write_data(data_dir, data)
+        call_command(
+            'insert_data', data_dir=str(data_dir), sync=True,
+            delete_missing=True,
+        )
+        assert set(Review.objects.values_list('id', flat=True)) == {1, 4}
+        assert Title.objects.get(pk=1).rating == 10
+        assert not Title.objects.filter(category__slug='book').exists()
+
+    def test_sync_deleted_author(self, data_dir):
+        from reviews.models import LeaderboardEntry, Review, Title
+
+        call_command('insert_data', data_dir=str(data_dir))
+        data = copy.deepcopy(DATA)
+        data['users.csv'].pop(2)
+        write_data(data_dir, data)
+        call_command(
+            'insert_data', data_dir=str(data_dir), sync=True,
+            delete_missing=True, delete_missing_users=True,
+        )
+        assert list(Review.objects.values_list('score', flat=True)) == [10]
+        title = Title.objects.get(pk=1)
+        assert (title.rating, title.rating_sum, title.rating_count) == (
+            10, 10, 1
+        ), 'Проверьте, что отзывы удаленного автора уходят из рейтинга'
+        assert not LeaderboardEntry.objects.filter(
+            title=title, review_count__gt=1
+        ).exists()
+
+    def test_sync_keeps_users(self, data_dir, django_user_model):
+        from reviews.models import Review
+
+        call_command('insert_data', data_dir=str(data_dir))
+        # Зарегистрировался через API, в CSV его нет.
+        signed_up = django_user_model.objects.create_user(
+            username='newcomer', email='newcomer@yamdb.fake'
+        )
+        data = copy.deepcopy(DATA)
+        data['users.csv'].pop(2)
+        write_data(data_dir, data)
+        call_command(
+            'insert_data', data_dir=str(data_dir), sync=True,
+            delete_missing=True,
+        )
+        users = django_user_model.objects
+        assert users.filter(pk__in=[signed_up.pk, 101]).count() == 2, (
+            'Проверьте, что без --delete-missing-users пользователи '
+            'не удаляются'
+        )
+        assert Review.objects.count() == 2
+        with pytest.raises(CommandError):
+            call_command(
+                'insert_data', data_dir=str(data_dir), sync=True,
+                delete_missing_users=True,
+            )
+
+    def test_sync_keeps_skipped_rows(self, data_dir):
+        from reviews.models import Review
+
+        call_command('insert_data', data_dir=str(data_dir))
+        data = copy.deepcopy(DATA)
+        data['review.csv'][2][1] = '99'
+        write_data(data_dir, data)
+        call_command(
+            'insert_data', data_dir=str(data_dir), sync=True,
+            delete_missing=True,
+        )
+        assert Review.objects.filter(pk=2, title_id=1).exists(), (
+            'Проверьте, что строка с висячим ключом не удаляется из базы'
+        )
+
+    def test_sync_without_changes_only_reads(
+        self, data_dir, django_assert_max_num_queries
+    ):
+        call_command('insert_data', data_dir=str(data_dir))
+        # По чтению на файл и по множеству ключей на внешний ключ, плюс
+        # служебные запросы транзакции и счетчиков.
+        with django_assert_max_num_queries(25):
+            call_command('insert_data', data_dir=str(data_dir), sync=True)
@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import re
+
+import pytest
+
+
+@pytest.fixture
+def metrics_dir(settings, tmp_path):
+    from api.metrics import registry
+
+    settings.METRICS_DIR = str(tmp_path)
+    registry.clear()
+    yield tmp_path
+    registry.clear()
+
+
+def server_timing(response):
+    header = response['Server-Timing']
+    return {
+        name: float(duration) for name, duration in re.findall(
+            r'(\w+);dur=([\d.]+)', header
+        )
+    }, header
+
+
+def metric(text, name, **labels):
+    selector = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(
+        rf'^{re.escape(name)}{{{re.escape(selector)}}} (\S+)$', text, re.M
+    )
+    assert match, f'Проверьте, что в /metrics есть {name}{{{selector}}}'
+    return float(match.group(1))
+
+
+@pytest.mark.django_db
+class TestServerTiming:
+
+    def test_header(self, client, titles, metrics_dir):
+        response = client.get('/api/v1/titles/')
+        timings, header = server_timing(response)
+        assert set(timings) == {'db', 'serialize', 'total'}
+        assert timings['total'] >= timings['db']
+        queries = int(re.search(r'"(\d+) queries"', header).group(1))
+        assert queries > 0, 'Проверьте, что SQL-запросы считаются'
+
+    def test_disabled(self, client, settings):
+        settings.METRICS_ENABLED = False
+        response = client.get('/api/v1/genres/')
+        assert 'Server-Timing' not in response
+
+
+@pytest.mark.django_db
+class TestMetrics:
+
+    def test_metrics_endpoint(self, client, titles, metrics_dir):
+        for _ in range(2):
+            client.get('/api/v1/titles/')
+        client.get('/api/v1/titles/999999/')
+        text = client.get('/metrics').content.decode()
+        assert metric(
+            text, 'yamdb_requests_total',
+            view='TitlesViewSet', action='list', status='200',
+        ) == 2
+        assert metric(
+            text, 'yamdb_requests_total',
+            view='TitlesViewSet', action='retrieve', status='404',
+        ) == 1
+        labels = {'view': 'TitlesViewSet', 'action': 'list'}
+        assert metric(
+            text, 'yamdb_request_duration_seconds_count', **labels
+        ) == 2
+        assert metric(
+            text, 'yamdb_request_queries_bucket', **labels, le='+Inf'
+        ) == 2
+        assert metric(text, 'yamdb_request_queries_sum', **labels) > 0
+        assert '# TYPE yamdb_request_db_seconds histogram' in text
+
+    def test_workers_merged(self, client, metrics_dir):
+        from api.metrics import HISTOGRAMS, empty_series
+
+        other = empty_series()
+        other['requests']['200'] = 5
+        counts = other['histograms']['request_queries']['counts']
+        counts[2] = 5
+        other['histograms']['request_queries']['sum'] = 10
+        (metrics_dir / 'worker-1.json').write_text(json.dumps([
+            {'view': 'GenresViewSet', 'action': 'list', **other}
+        ]))
+        client.get('/api/v1/genres/')
+        text = client.get('/metrics').content.decode()
+        labels = {'view': 'GenresViewSet', 'action': 'list'}
+        assert metric(
+            text, 'yamdb_requests_total', **labels, status='200'
+        ) == 6, 'Проверьте, что метрики воркеров складываются'
+        assert metric(
+            text, 'yamdb_request_queries_bucket', **labels, le='+Inf'
+        ) == 6
+        assert len(counts) == len(HISTOGRAMS['request_queries'][0]) + 1
+
+    def test_streaming(self, admin_client, titles, metrics_dir):
+        response = admin_client.get('/api/v1/export/titles/')
+        assert 'Server-Timing' in response
+        text = admin_client.get('/metrics').content.decode()
+        assert 'view="export_data"' not in text, (
+            'Проверьте, что потоковый ответ учитывается, когда он отдан'
+        )
+        b''.join(response.streaming_content)
+        text = admin_client.get('/metrics').content.decode()
+        labels = {'view': 'export_data', 'action': 'get'}
+        assert metric(text, 'yamdb_request_queries_sum', **labels) >= 2, (
+            'Проверьте, что считаются запросы, выполненные во время потока'
+        )
+
+
+@pytest.mark.django_db
+class TestSlowRequests:
+
+    def test_slow_log(self, client, titles, settings, caplog, metrics_dir):
+        settings.SLOW_REQUEST_MS = 0
+        settings.SLOW_REQUEST_TOP_QUERIES = 2
+        with caplog.at_level(logging.WARNING, 'api.instrumentation'):
+            client.get('/api/v1/titles/')
+        [message] = [
+            record.getMessage() for record in caplog.records
+            if record.name == 'api.instrumentation'
+        ]
+        assert 'TitlesViewSet.list' in message
+        assert message.count('SELECT') == 2, (
+            'Проверьте, что в лог попадают самые долгие запросы'
+        )
+
+    def test_fast_requests_not_logged(self, client, caplog, metrics_dir):
+        with caplog.at_level(logging.WARNING, 'api.instrumentation'):
+            client.get('/api/v1/genres/')
+        assert not caplog.records
+
+
+@pytest.mark.django_db
+class TestRetiredWorkers:
+
+    def test_retire_worker(self, client, metrics_dir):
+        from api.metrics import AGGREGATE, registry, retire_worker
+
+        client.get('/api/v1/genres/')
+        registry.flush()
+        os.rename(
+            metrics_dir / f'worker-{os.getpid()}.json',
+            metrics_dir / 'worker-1.json',
+        )
+        registry.clear()
+        client.get('/api/v1/genres/')
+        labels = {'view': 'GenresViewSet', 'action': 'list', 'status': '200'}
+        before = metric(
+            client.get('/metrics').content.decode(),
+            'yamdb_requests_total', **labels,
+        )
+        retire_worker(1)
+        assert not (metrics_dir / 'worker-1.json').exists()
+        assert (metrics_dir / AGGREGATE).exists()
+        assert metric(
+            client.get('/metrics').content.decode(),
+            'yamdb_requests_total', **labels,
+        ) == before == 2, (
+            'Проверьте, что счетчики ушедшего воркера не теряются'
+        )
+
+    def test_retired_file_not_counted_twice(self, client, metrics_dir):
+        from api.metrics import AGGREGATE
+
+        client.get('/api/v1/genres/')
+        client.get('/metrics')
+        worker = json.loads(
+            (metrics_dir / f'worker-{os.getpid()}.json').read_text()
+        )
+        (metrics_dir / 'worker-1.json').write_text(json.dumps(worker))
+        (metrics_dir / AGGREGATE).write_text(json.dumps(
+            {'retired': [1], 'snapshot': worker}
+        ))
+        text = client.get('/metrics').content.decode()
+        assert metric(
+            text, 'yamdb_requests_total',
+            view='GenresViewSet', action='list', status='200',
+        ) == 2
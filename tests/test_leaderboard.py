@@ -0,0 +1,128 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+URL = '/api/v1/titles/top/'
+
+
+@pytest.fixture
+def rated_titles(settings, titles, authors):
+    from reviews.models import Review
+
+    settings.LEADERBOARD_MIN_REVIEWS = 2
+    scores = {0: (8, 9), 1: (10, 9, 7), 2: (10,)}
+    for idx, title_scores in scores.items():
+        for author, score in zip(authors, title_scores):
+            Review.objects.create(
+                title=titles[idx], author=author, text='Текст', score=score
+            )
+    return titles
+
+
+def top(client, **params):
+    response = client.get(URL, params)
+    assert response.status_code == 200
+    return [item['name'] for item in response.json()]
+
+
+def snapshot():
+    from reviews.models import LeaderboardEntry
+
+    return sorted(LeaderboardEntry.objects.values_list(
+        'title_id', 'genre_id', 'category_id', 'average', 'review_count'
+    ), key=str)
+
+
+@pytest.mark.django_db
+class TestLeaderboard:
+
+    def test_top(self, rated_titles, anon_client):
+        assert top(anon_client) == ['Произведение 1', 'Произведение 0'], (
+            'Проверьте, что произведения упорядочены по средней оценке, а '
+            'произведения с малым числом отзывов не попадают в лидерборд'
+        )
+        assert top(anon_client, genre='comedy') == ['Произведение 1']
+        assert top(anon_client, category='movie') == ['Произведение 0']
+        assert top(anon_client, genre='drama', category='book') == [
+            'Произведение 1'
+        ]
+        assert top(anon_client, genre='sci-fi') == []
+        assert top(anon_client, limit=1) == ['Произведение 1']
+
+    def test_response_shape(self, rated_titles, anon_client):
+        item = anon_client.get(URL).json()[0]
+        assert item['rating'] == 9
+        assert item['category']['slug'] == 'book'
+        assert {genre['slug'] for genre in item['genre']} == {
+            'drama', 'comedy'
+        }
+
+    @pytest.mark.parametrize('limit', [0, 101, 'x'])
+    def test_invalid_limit(self, rated_titles, anon_client, limit):
+        assert anon_client.get(URL, {'limit': limit}).status_code == 400
+
+    def test_query_count(
+        self, rated_titles, anon_client, django_assert_num_queries
+    ):
+        # Срез лидерборда с произведениями и категориями, затем жанры.
+        with django_assert_num_queries(2):
+            anon_client.get(URL, {'genre': 'drama', 'limit': 5})
+
+    def test_review_writes(self, rated_titles, authors, anon_client):
+        from reviews.models import Review
+
+        Review.objects.create(
+            title=rated_titles[2], author=authors[1], text='Текст', score=10
+        )
+        assert top(anon_client)[0] == 'Произведение 2', (
+            'Проверьте, что отзыв, переводящий порог, добавляет произведение'
+        )
+        review = Review.objects.filter(title=rated_titles[0]).first()
+        review.score = 1
+        review.save()
+        Review.objects.filter(title=rated_titles[1]).first().delete()
+        assert top(anon_client) == ['Произведение 2', 'Произведение 1',
+                                    'Произведение 0']
+        Review.objects.filter(title=rated_titles[0]).first().delete()
+        assert 'Произведение 0' not in top(anon_client), (
+            'Проверьте, что произведение ниже порога убирается'
+        )
+        incremental = snapshot()
+        call_command('rebuild_leaderboard', stdout=StringIO())
+        assert snapshot() == incremental
+
+    def test_genre_and_category_changes(
+        self, rated_titles, admin_client, anon_client
+    ):
+        from reviews.models import Category
+
+        response = admin_client.patch(
+            f'/api/v1/titles/{rated_titles[0].pk}/',
+            {'genre': ['comedy'], 'category': 'book'},
+        )
+        assert response.status_code == 200
+        assert top(anon_client, genre='comedy') == [
+            'Произведение 1', 'Произведение 0'
+        ]
+        assert top(anon_client, genre='drama') == ['Произведение 1']
+        assert top(anon_client, category='movie') == []
+        Category.objects.get(slug='book').delete()
+        assert top(anon_client, genre='comedy') == [
+            'Произведение 1', 'Произведение 0'
+        ]
+
+    def test_rebuild(self, rated_titles, settings):
+        from reviews.models import LeaderboardEntry
+
+        incremental = snapshot()
+        LeaderboardEntry.objects.all().delete()
+        call_command(
+            'rebuild_leaderboard', batch_size=1, stdout=StringIO()
+        )
+        assert snapshot() == incremental
+        settings.LEADERBOARD_MIN_REVIEWS = 1
+        call_command('rebuild_leaderboard', stdout=StringIO())
+        assert {row[0] for row in snapshot()} == {
+            title.pk for title in rated_titles
+        }
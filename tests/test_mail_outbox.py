@@ -0,0 +1,127 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core import mail
+from django.core.management import call_command
+from django.utils import timezone
+
+
+def queue_emails(count, **kwargs):
+    from users.outbox import enqueue
+
+    return [
+        enqueue('Тема', f'Письмо {idx}', 'here@weare.ru',
+                [kwargs.get('to', f'user{idx}@yamdb.fake')])
+        for idx in range(count)
+    ]
+
+
+@pytest.mark.django_db
+class TestMailOutbox:
+
+    def test_signup_queues_email(self, client):
+        from users.models import OutgoingEmail
+
+        response = client.post(
+            '/api/v1/auth/signup/',
+            {'username': 'newbie', 'email': 'newbie@yamdb.fake'},
+        )
+        assert response.status_code == 200
+        assert mail.outbox == [], (
+            'Проверьте, что регистрация не отправляет письмо в запросе'
+        )
+        email = OutgoingEmail.objects.get()
+        assert email.to == 'newbie@yamdb.fake'
+        assert email.status == OutgoingEmail.PENDING
+
+        call_command('send_mail_queue', stdout=StringIO())
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == ['newbie@yamdb.fake']
+        assert 'newbie' in mail.outbox[0].body
+        email.refresh_from_db()
+        assert email.status == OutgoingEmail.SENT
+        assert email.sent_at is not None
+
+    def test_batch_uses_one_connection(self, smtp_server):
+        from users.models import OutgoingEmail
+        from users.outbox import send_pending
+
+        queue_emails(5)
+        batch = send_pending(batch_size=3)
+        assert len(batch) == 3
+        assert smtp_server.connections == 1, (
+            'Проверьте, что пачка писем уходит через одно соединение'
+        )
+        assert len(smtp_server.messages) == 3
+        send_pending(batch_size=3)
+        assert smtp_server.connections == 2
+        assert OutgoingEmail.objects.filter(
+            status=OutgoingEmail.SENT
+        ).count() == 5
+        assert send_pending() == []
+
+    def test_refused_recipient_is_retried(self, smtp_server, settings):
+        from users.models import OutgoingEmail
+        from users.outbox import retry_delay, send_pending
+
+        queue_emails(2)
+        smtp_server.refused.add('user0@yamdb.fake')
+        started = timezone.now()
+        send_pending()
+        refused = OutgoingEmail.objects.get(to='user0@yamdb.fake')
+        assert refused.status == OutgoingEmail.PENDING
+        assert refused.attempts == 1
+        assert refused.last_error
+        assert refused.send_after >= started + retry_delay(1)
+        assert OutgoingEmail.objects.get(
+            to='user1@yamdb.fake'
+        ).status == OutgoingEmail.SENT
+        assert send_pending() == [], (
+            'Проверьте, что повтор ждет паузу'
+        )
+
+    def test_bad_message_does_not_block_batch(self, smtp_server):
+        from users.models import OutgoingEmail
+        from users.outbox import enqueue, send_pending
+
+        queue_emails(1)
+        bad = enqueue('Тема\nBcc: all@yamdb.fake', 'Письмо', 'here@weare.ru',
+                      ['user9@yamdb.fake'])
+        queue_emails(1, to='user10@yamdb.fake')
+        send_pending()
+        bad.refresh_from_db()
+        assert bad.status == OutgoingEmail.FAILED, (
+            'Проверьте, что письмо с ошибкой не повторяется'
+        )
+        assert 'BadHeaderError' in bad.last_error
+        assert OutgoingEmail.objects.filter(
+            status=OutgoingEmail.SENT
+        ).count() == 2, (
+            'Проверьте, что ошибка одного письма не откатывает пачку'
+        )
+        assert len(smtp_server.messages) == 2
+        assert send_pending() == []
+
+    def test_server_down_backs_off(self, smtp_server, settings):
+        from users.models import OutgoingEmail
+        from users.outbox import send_pending
+
+        settings.OUTBOX_MAX_ATTEMPTS = 3
+        queue_emails(2)
+        smtp_server.shutdown()
+        smtp_server.server_close()
+        delays = []
+        for _ in range(3):
+            OutgoingEmail.objects.update(send_after=timezone.now())
+            before = timezone.now()
+            send_pending()
+            email = OutgoingEmail.objects.first()
+            delays.append(email.send_after - before)
+        assert email.attempts == 3
+        assert email.status == OutgoingEmail.FAILED, (
+            'Проверьте, что после последней попытки письмо не повторяется'
+        )
+        assert delays[1] > delays[0] + timedelta(seconds=30), (
+            'Проверьте, что пауза между попытками растет'
+        )
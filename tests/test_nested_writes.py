@@ -0,0 +1,83 @@
+import pytest
+
+from tests.fixtures.queries import count_queries
+
+
+@pytest.fixture
+def review(titles, author):
+    from reviews.models import Review
+
+    return Review.objects.create(
+        title=titles[0], author=author, text='Текст', score=6
+    )
+
+
+@pytest.fixture
+def author(authors):
+    return authors[0]
+
+
+@pytest.mark.django_db
+class TestNestedWrites:
+
+    def test_review_create_queries(self, titles, user_client):
+        response, queries = count_queries(lambda: user_client.post(
+            f'/api/v1/titles/{titles[0].pk}/reviews/',
+            {'text': 'Отзыв', 'score': 7},
+        ))
+        assert response.status_code == 201
+        # Пользователь, произведение, отзыв, рейтинг произведения и
+        # лидерборд: UPDATE и, пока отзывов меньше порога, его проверка.
+        assert queries == 6, (
+            'Проверьте, что произведение загружается один раз, а повторный '
+            'отзыв не проверяется отдельным запросом'
+        )
+
+    def test_duplicate_review(self, titles, user_client):
+        from reviews.models import Review
+
+        url = f'/api/v1/titles/{titles[0].pk}/reviews/'
+        user_client.post(url, {'text': 'Отзыв', 'score': 7})
+        response = user_client.post(url, {'text': 'Еще', 'score': 1})
+        assert response.status_code == 400
+        assert 'non_field_errors' in response.json()
+        assert Review.objects.filter(title=titles[0]).count() == 1
+        titles[0].refresh_from_db()
+        assert titles[0].rating == 7, (
+            'Проверьте, что отклоненный отзыв не меняет рейтинг'
+        )
+
+    def test_review_for_missing_title(self, titles, user_client):
+        response = user_client.post(
+            '/api/v1/titles/0/reviews/', {'text': 'Отзыв', 'score': 7}
+        )
+        assert response.status_code == 404
+
+    def test_comment_create_queries(self, review, user_client):
+        response, queries = count_queries(lambda: user_client.post(
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}'
+            '/comments/',
+            {'text': 'Комментарий'},
+        ))
+        assert response.status_code == 201
+        # Пользователь, отзыв вместе с проверкой произведения, комментарий
+        # и популярность произведения.
+        assert queries == 4
+
+    def test_comment_under_wrong_title(self, review, titles, user_client):
+        from reviews.models import Comment
+
+        comment = Comment.objects.create(
+            review=review, author=review.author, text='Комментарий'
+        )
+        other = f'/api/v1/titles/{titles[1].pk}/reviews/{review.pk}/comments/'
+        response = user_client.post(other, {'text': 'Комментарий'})
+        assert response.status_code == 404, (
+            'Проверьте, что отзыв должен принадлежать произведению из URL'
+        )
+        assert user_client.get(other).status_code == 404
+        assert user_client.get(f'{other}{comment.pk}/').status_code == 404
+
+    def test_review_under_wrong_title(self, review, titles, user_client):
+        url = f'/api/v1/titles/{titles[1].pk}/reviews/{review.pk}/'
+        assert user_client.get(url).status_code == 404
@@ -0,0 +1,124 @@
+import json
+import logging
+
+import pytest
+
+
+@pytest.fixture
+def reviews(titles, authors):
+    from reviews.models import Review
+
+    return [
+        Review.objects.create(
+            title=titles[0], author=author, text='Отзыв', score=5
+        )
+        for author in authors
+    ]
+
+
+@pytest.fixture
+def unoptimized_reviews(monkeypatch, settings):
+    """Отзывы без select_related: автор подгружается для каждой строки."""
+    from api.views import ReviewViewSet
+    from reviews.models import Review
+
+    settings.API_FAST_READS = False
+    monkeypatch.setattr(
+        ReviewViewSet, 'get_queryset',
+        lambda self: Review.objects.filter(
+            title_id=self.kwargs['title_id']
+        ).order_by('-pub_date', '-id'),
+    )
+
+
+class TestNormalize:
+
+    def test_literals_and_in_lists(self):
+        from api.nplusone import normalize
+
+        assert normalize(
+            'SELECT "a" FROM "t" WHERE "id" IN (%s, %s, %s) LIMIT 21'
+        ) == normalize(
+            'SELECT "a" FROM "t" WHERE "id" IN (%s) LIMIT 5'
+        )
+        assert normalize("SELECT 1 WHERE name = 'it''s'") == (
+            'SELECT ? WHERE name = ?'
+        )
+
+
+@pytest.mark.django_db
+class TestDetect:
+
+    def test_lazy_loads_found(self, reviews):
+        from api.nplusone import NPlusOneError, detect
+        from reviews.models import Review
+
+        with pytest.raises(NPlusOneError) as error:
+            with detect('цикл', mode='raise'):
+                for review in Review.objects.all():
+                    review.author.username
+        message = str(error.value)
+        assert '4 одинаковых запросов' in message
+        assert 'test_nplusone.py' in message, (
+            'Проверьте, что в находке есть место вызова и стек'
+        )
+        assert 'users_user' in message
+
+    def test_below_threshold(self, reviews, settings):
+        from api.nplusone import detect
+        from reviews.models import Review
+
+        settings.QUERY_DETECTOR_THRESHOLD = 5
+        with detect(mode='raise') as detector:
+            for review in Review.objects.all():
+                review.author.username
+        assert detector.findings() == []
+
+    def test_call_sites_separate(self, reviews):
+        from api.nplusone import detect
+        from reviews.models import Review
+
+        with detect(mode='raise') as detector:
+            for review in Review.objects.all()[:2]:
+                review.author.username
+            for review in Review.objects.all()[2:]:
+                review.author.username
+        assert detector.findings() == [], (
+            'Проверьте, что запросы из разных мест не складываются'
+        )
+
+
+@pytest.mark.django_db
+class TestMiddleware:
+
+    def test_strict_mode(self, client, reviews, unoptimized_reviews):
+        from api.nplusone import NPlusOneError
+
+        with pytest.raises(NPlusOneError):
+            client.get(f'/api/v1/titles/{reviews[0].title_id}/reviews/')
+
+    def test_optimized_view_passes(self, client, reviews, settings):
+        settings.API_FAST_READS = False
+        url = f'/api/v1/titles/{reviews[0].title_id}/reviews/'
+        assert client.get(url).status_code == 200
+
+    def test_warn_mode_and_report(
+        self, client, reviews, unoptimized_reviews, settings, caplog,
+        tmp_path,
+    ):
+        settings.QUERY_DETECTOR = 'warn'
+        settings.QUERY_DETECTOR_REPORT = str(tmp_path / 'nplusone.jsonl')
+        url = f'/api/v1/titles/{reviews[0].title_id}/reviews/'
+        with caplog.at_level(logging.WARNING, 'api.nplusone'):
+            assert client.get(url).status_code == 200
+        assert any('N+1' in record.getMessage() for record in caplog.records)
+        with open(settings.QUERY_DETECTOR_REPORT) as report:
+            [finding] = [json.loads(line) for line in report]
+        assert finding['label'] == f'GET {url}'
+        assert finding['count'] == 4
+        assert 'users_user' in finding['sql']
+
+    def test_off(self, client, reviews, unoptimized_reviews, settings):
+        settings.QUERY_DETECTOR = 'off'
+        url = f'/api/v1/titles/{reviews[0].title_id}/reviews/'
+        assert client.get(url).status_code == 200
@@ -0,0 +1,146 @@
+import os
+import pstats
+import time
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+
+@pytest.fixture
+def profiling(settings, tmp_path):
+    settings.PROFILING_ENABLED = True
+    settings.PROFILING_ENGINE = 'cprofile'
+    settings.PROFILING_SAMPLE_RATE = 1
+    settings.PROFILING_FLUSH_INTERVAL = 0
+    settings.PROFILING_DIR = str(tmp_path)
+    return settings
+
+
+def profile_files(directory, extension):
+    return [
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names if name.endswith(extension)
+    ]
+
+
+@pytest.mark.django_db
+class TestProfilingMiddleware:
+
+    def test_disabled_by_default(self, client, settings, tmp_path):
+        settings.PROFILING_DIR = str(tmp_path)
+        response = client.get('/api/v1/genres/')
+        assert 'X-Profiled' not in response
+        assert not os.listdir(tmp_path)
+
+    def test_cprofile(self, client, titles, profiling):
+        response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert response['X-Profiled'] == 'TitlesViewSet.list'
+        [path] = profile_files(profiling.PROFILING_DIR, '.prof')
+        assert os.path.basename(os.path.dirname(path)) == (
+            'TitlesViewSet.list'
+        ), 'Проверьте, что профили раскладываются по эндпоинтам'
+        functions = {name for _, _, name in pstats.Stats(path).stats}
+        assert 'list' in functions
+
+    def test_sampler(self, client, titles, profiling, monkeypatch):
+        from api.views import TitlesViewSet
+
+        list_titles = TitlesViewSet.list
+
+        def slow_list(self, request, *args, **kwargs):
+            # sleep отпускает GIL, так что поток сэмплера успеет сработать.
+            time.sleep(0.05)
+            return list_titles(self, request, *args, **kwargs)
+
+        monkeypatch.setattr(TitlesViewSet, 'list', slow_list)
+        profiling.PROFILING_ENGINE = 'sampler'
+        profiling.PROFILING_SAMPLER_INTERVAL = 0.001
+        for _ in range(2):
+            client.get('/api/v1/titles/')
+        paths = profile_files(profiling.PROFILING_DIR, '.collapsed')
+        assert len(paths) == 2
+        lines = [
+            line for path in paths for line in open(path).read().splitlines()
+        ]
+        stack, count = max(
+            (line.rsplit(' ', 1) for line in lines),
+            key=lambda pair: int(pair[1]),
+        )
+        assert stack.endswith('tests.test_profiling:slow_list'), (
+            'Проверьте, что сэмплер снимает стеки от корня к листу'
+        )
+        assert int(count) > 1
+
+    def test_token(self, client, profiling):
+        from api.profiling import make_token
+
+        profiling.PROFILING_SAMPLE_RATE = 0
+        assert 'X-Profiled' not in client.get('/api/v1/genres/')
+        response = client.get('/api/v1/genres/', HTTP_X_PROFILE='подделка')
+        assert 'X-Profiled' not in response
+        response = client.get('/api/v1/genres/', HTTP_X_PROFILE=make_token())
+        assert response['X-Profiled'] == 'GenresViewSet.list', (
+            'Проверьте, что запрос с токеном профилируется всегда'
+        )
+
+    def test_expired_token(self, client, profiling):
+        from api.profiling import make_token
+
+        profiling.PROFILING_SAMPLE_RATE = 0
+        profiling.PROFILING_TOKEN_MAX_AGE = -1
+        response = client.get('/api/v1/genres/', HTTP_X_PROFILE=make_token())
+        assert 'X-Profiled' not in response
+
+    def test_rotation(self, client, profiling):
+        profiling.PROFILING_MAX_FILES = 2
+        for _ in range(4):
+            client.get('/api/v1/genres/')
+        assert len(profile_files(profiling.PROFILING_DIR, '.prof')) == 2
+
+    def test_accumulated_until_flush(self, client, profiling):
+        from api.profiling import store
+
+        profiling.PROFILING_FLUSH_INTERVAL = 3600
+        store.flush()
+        for _ in range(3):
+            client.get('/api/v1/genres/')
+        assert not profile_files(profiling.PROFILING_DIR, '.prof')
+        store.flush()
+        [path] = profile_files(profiling.PROFILING_DIR, '.prof')
+        assert pstats.Stats(path).total_calls > 0
+
+
+@pytest.mark.django_db
+class TestProfileReport:
+
+    def test_report(self, client, titles, profiling, tmp_path_factory):
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/titles/')
+        client.get('/api/v1/genres/')
+        profiling.PROFILING_ENGINE = 'sampler'
+        client.get('/api/v1/titles/')
+        output = tmp_path_factory.mktemp('merged')
+        stdout = StringIO()
+        call_command(
+            'profile_report', 'TitlesViewSet', '--limit', '5',
+            '--output', str(output), stdout=stdout,
+        )
+        text = stdout.getvalue()
+        assert 'TitlesViewSet.list: 2 .prof, 1 .collapsed' in text
+        assert 'GenresViewSet' not in text, (
+            'Проверьте, что отчет фильтруется по эндпоинту'
+        )
+        assert 'cumulative' in text
+        assert sorted(os.listdir(output)) == [
+            'TitlesViewSet.list.collapsed', 'TitlesViewSet.list.prof'
+        ]
+
+    def test_token(self):
+        from api.profiling import check_token
+
+        stdout = StringIO()
+        call_command('profile_report', '--token', stdout=stdout)
+        assert check_token(stdout.getvalue().strip())
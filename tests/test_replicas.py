@@ -0,0 +1,175 @@
+import time
+
+import pytest
+from django.db import OperationalError, connections
+
+DATABASES = ['default', 'replica']
+USERS_URL = '/api/v1/users/'
+
+
+@pytest.fixture
+def replica(settings):
+    from api import replicas
+
+    settings.DATABASE_REPLICAS = ['replica']
+    settings.REPLICA_PIN_SECONDS = 10
+    replicas.down.clear()
+    yield
+    replicas.down.clear()
+
+
+def unsign(value):
+    from django.core.signing import TimestampSigner
+
+    return TimestampSigner(salt='api.replicas.pin').unsign(value)
+
+
+def usernames(response):
+    assert response.status_code == 200
+    return {row['username'] for row in response.json()['results']}
+
+
+@pytest.mark.django_db(databases=DATABASES)
+class TestRouter:
+
+    def test_reads_and_writes(self, replica):
+        from api.replicas import primary_reads, replica_reads
+        from reviews.models import Genre
+
+        with replica_reads():
+            Genre.objects.create(name='Драма', slug='drama')
+            assert not Genre.objects.exists(), (
+                'Проверьте, что в блоке replica_reads чтения идут на реплику'
+            )
+            with primary_reads():
+                assert Genre.objects.exists()
+        assert Genre.objects.exists(), (
+            'Проверьте, что вне запроса чтения идут в основную базу'
+        )
+        assert not Genre.objects.using('replica').exists(), (
+            'Проверьте, что запись всегда идет в основную базу'
+        )
+
+    def test_no_replicas(self, settings):
+        from api.replicas import replica_reads
+        from reviews.models import Genre
+
+        settings.DATABASE_REPLICAS = []
+        Genre.objects.create(name='Драма', slug='drama')
+        with replica_reads():
+            assert Genre.objects.exists()
+
+    def test_migrations_skip_replicas(self, replica):
+        from api.replicas import ReplicaRouter
+
+        router = ReplicaRouter()
+        assert router.allow_migrate('replica', 'reviews') is False
+        assert router.allow_migrate('default', 'reviews') is None
+
+
+@pytest.mark.django_db(databases=DATABASES)
+class TestMiddleware:
+
+    def test_safe_requests_read_replica(self, admin_client, user, replica):
+        assert user.username not in usernames(admin_client.get(USERS_URL))
+
+    def test_disabled_by_default(self, admin_client, user):
+        assert user.username in usernames(admin_client.get(USERS_URL))
+
+    def test_pinned_after_write(self, admin_client, replica):
+        response = admin_client.post(
+            USERS_URL, {'username': 'fresh', 'email': 'fresh@yamdb.fake'}
+        )
+        assert response.status_code == 201
+        until = float(unsign(response['X-Primary-Until']))
+        assert 0 < until - time.time() <= 10
+        assert 'fresh' in usernames(admin_client.get(USERS_URL)), (
+            'Проверьте, что после записи клиент читает свою запись'
+        )
+
+    def test_pin_header(self, admin_client, user, replica):
+        from api.replicas import sign_pin
+
+        until = sign_pin(time.time() + 5)
+        response = admin_client.get(USERS_URL, HTTP_X_PRIMARY_UNTIL=until)
+        assert user.username in usernames(response)
+
+    def test_expired_pin_ignored(self, admin_client, user, replica):
+        from api.replicas import sign_pin
+
+        until = sign_pin(time.time() - 1)
+        response = admin_client.get(USERS_URL, HTTP_X_PRIMARY_UNTIL=until)
+        assert user.username not in usernames(response), (
+            'Проверьте, что истекший срок не принимается'
+        )
+
+    def test_old_signature_ignored(
+        self, admin_client, user, replica, monkeypatch
+    ):
+        from api.replicas import sign_pin
+
+        # Подпись старше окна, даже если срок внутри нее еще не вышел.
+        signed_at = time.time() - 3600
+        with monkeypatch.context() as patch:
+            patch.setattr('time.time', lambda: signed_at)
+            until = sign_pin(signed_at + 7200)
+        response = admin_client.get(USERS_URL, HTTP_X_PRIMARY_UNTIL=until)
+        assert user.username not in usernames(response)
+
+    @pytest.mark.parametrize('offset', [5, 3600])
+    def test_unsigned_pin_ignored(self, admin_client, user, replica, offset):
+        until = str(time.time() + offset)
+        response = admin_client.get(USERS_URL, HTTP_X_PRIMARY_UNTIL=until)
+        assert user.username not in usernames(response), (
+            'Проверьте, что срок без подписи не принимается'
+        )
+
+    def test_forged_pin_ignored(self, admin_client, user, replica):
+        from api.replicas import sign_pin
+
+        signed = sign_pin(time.time() + 5).split(':', 1)[1]
+        forged = '{:.3f}:{}'.format(time.time() + 3600, signed)
+        response = admin_client.get(USERS_URL, HTTP_X_PRIMARY_UNTIL=forged)
+        assert user.username not in usernames(response)
+
+    def test_cache_reads_fresh_resources(self, client, replica):
+        from reviews.models import Genre
+
+        Genre.objects.create(name='Драма', slug='drama')
+        response = client.get('/api/v1/genres/')
+        assert response.json()['count'] == 1, (
+            'Проверьте, что только что измененный ресурс читается с '
+            'основной базы и не попадает в кеш устаревшим'
+        )
+
+    def test_streaming_reads_replica(self, admin_client, titles, replica):
+        response = admin_client.get('/api/v1/export/titles/')
+        content = b''.join(response.streaming_content).decode()
+        assert titles[0].name not in content
+
+
+@pytest.mark.django_db(databases=DATABASES)
+class TestFailover:
+
+    def test_unavailable_replica(
+        self, admin_client, user, replica, monkeypatch
+    ):
+        from api import replicas
+
+        attempts = []
+
+        def refuse():
+            attempts.append(True)
+            raise OperationalError('connection refused')
+
+        connection = connections['replica']
+        monkeypatch.setattr(connection, 'connection', None)
+        monkeypatch.setattr(connection, 'ensure_connection', refuse)
+        for _ in range(2):
+            assert user.username in usernames(admin_client.get(USERS_URL)), (
+                'Проверьте, что без реплики чтения идут в основную базу'
+            )
+        assert len(attempts) == 1, (
+            'Проверьте, что недоступная реплика на время выпадает из выбора'
+        )
+        assert 'replica' in replicas.down
@@ -0,0 +1,88 @@
+import pytest
+from django.test import override_settings
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+
+    def test_anonymous_list_is_cached(
+        self, titles, anon_client, django_assert_num_queries
+    ):
+        response = anon_client.get('/api/v1/titles/')
+        assert response['X-Cache'] == 'MISS'
+        with django_assert_num_queries(0):
+            cached = anon_client.get('/api/v1/titles/')
+        assert cached['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный запрос отдается из кеша'
+        )
+        assert cached.json() == response.json()
+
+    def test_key_includes_query_and_role(
+        self, titles, anon_client, user_client
+    ):
+        anon_client.get('/api/v1/titles/')
+        assert anon_client.get('/api/v1/titles/?year=2001')['X-Cache'] == (
+            'MISS'
+        )
+        assert user_client.get('/api/v1/titles/')['X-Cache'] == 'MISS'
+        assert user_client.get('/api/v1/titles/')['X-Cache'] == 'HIT'
+
+    def test_writes_bump_version(
+        self, titles, genres, anon_client, admin_client, user_client
+    ):
+        url = f'/api/v1/titles/{titles[0].id}/'
+        anon_client.get(url)
+        response = user_client.post(
+            f'{url}reviews/', data={'text': 'Текст', 'score': 8}
+        )
+        assert response.status_code == 201
+        response = anon_client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что отзыв сбрасывает кеш произведений'
+        )
+        assert response.json()['rating'] == 8
+
+        anon_client.get('/api/v1/genres/')
+        admin_client.delete(f'/api/v1/genres/{genres[0].slug}/')
+        assert anon_client.get('/api/v1/genres/')['X-Cache'] == 'MISS'
+        assert anon_client.get(url)['X-Cache'] == 'MISS', (
+            'Проверьте, что изменение жанра сбрасывает кеш произведений'
+        )
+
+    def test_stats(self, categories, anon_client):
+        from api.cache import get_stats
+
+        for _ in range(3):
+            anon_client.get('/api/v1/categories/')
+        assert get_stats('categories') == {'hit': 2, 'miss': 1}
+
+    def test_file_based_backend(self, titles, anon_client, tmp_path):
+        file_cache = {
+            'default': {
+                'BACKEND': (
+                    'django.core.cache.backends.filebased.FileBasedCache'
+                ),
+                'LOCATION': str(tmp_path),
+            }
+        }
+        with override_settings(CACHES=file_cache):
+            anon_client.get('/api/v1/categories/')
+            assert anon_client.get('/api/v1/categories/')['X-Cache'] == 'HIT'
+            assert any(tmp_path.iterdir())
+
+
+@pytest.mark.django_db(transaction=True)
+class TestResponseCacheTransactions:
+
+    def test_version_bumped_on_commit(self, anon_client):
+        from api.cache import get_version
+        from django.db import transaction
+        from reviews.models import Genre
+
+        version = get_version('genres')
+        with transaction.atomic():
+            Genre.objects.create(name='Драма', slug='drama')
+            assert get_version('genres') == version, (
+                'Проверьте, что поколение кеша меняется только после коммита'
+            )
+        assert get_version('genres') != version
@@ -0,0 +1,130 @@
+import http.client
+import importlib
+import os
+import time
+
+import pytest
+from django.core.signals import request_started
+from django.db import connection
+
+
+def load_config(monkeypatch, **env):
+    for name in (
+        'GUNICORN_WORKER_CLASS', 'GUNICORN_WORKERS', 'GUNICORN_THREADS'
+    ):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.setattr('multiprocessing.cpu_count', lambda: 4)
+    from api_yamdb import gunicorn_conf
+
+    return importlib.reload(gunicorn_conf)
+
+
+class TestGunicornConfig:
+
+    def test_gthread_default(self, monkeypatch):
+        config = load_config(monkeypatch)
+        assert config.worker_class == 'gthread'
+        assert (config.workers, config.threads) == (5, 4)
+        assert config.preload_app is True
+        assert 0 < config.max_requests_jitter < config.max_requests
+
+    def test_sync(self, monkeypatch):
+        config = load_config(monkeypatch, GUNICORN_WORKER_CLASS='sync')
+        assert (config.workers, config.threads) == (9, 1), (
+            'Проверьте, что у sync-воркеров по одному потоку и '
+            '2 * cpu + 1 процессов'
+        )
+
+    def test_overrides(self, monkeypatch):
+        config = load_config(
+            monkeypatch, GUNICORN_WORKERS='2', GUNICORN_THREADS='8'
+        )
+        assert (config.workers, config.threads) == (2, 8)
+
+    def test_unknown_worker_class(self, monkeypatch):
+        with pytest.raises(ValueError):
+            load_config(monkeypatch, GUNICORN_WORKER_CLASS='gevent')
+
+
+@pytest.fixture
+def closed(monkeypatch):
+    """Вызовы close() у соединения по умолчанию."""
+    calls = []
+    connection.ensure_connection()
+    monkeypatch.setitem(connection.settings_dict, 'CONN_HEALTH_CHECKS', True)
+    monkeypatch.setattr(connection, 'close', lambda: calls.append(True))
+    return calls
+
+
+@pytest.mark.django_db(transaction=True)
+class TestConnectionHealthCheck:
+
+    def test_broken_connection_closed(self, closed, monkeypatch):
+        from api.signals import check_connections
+
+        monkeypatch.setattr(connection, 'is_usable', lambda: False)
+        check_connections()
+        assert closed, (
+            'Проверьте, что оборванное соединение закрывается до запроса'
+        )
+
+    def test_usable_connection_kept(self, closed):
+        from api.signals import check_connections
+
+        check_connections()
+        assert not closed
+
+    def test_disabled(self, closed, monkeypatch):
+        from api.signals import check_connections
+
+        monkeypatch.setitem(
+            connection.settings_dict, 'CONN_HEALTH_CHECKS', False
+        )
+        monkeypatch.setattr(connection, 'is_usable', lambda: False)
+        check_connections()
+        assert not closed
+
+    def test_receiver_connected(self):
+        from api.signals import check_connections
+
+        assert check_connections in request_started._live_receivers(None)
+
+
+class TestWorkerRecycling:
+
+    def test_recycled_worker_file_removed(self, tmp_path):
+        from benchmarks.endpoints import gunicorn
+
+        metrics_dir = tmp_path / 'metrics'
+        env = {
+            'METRICS_DIR': str(metrics_dir),
+            'DB_ENGINE': 'django.db.backends.sqlite3',
+            'DB_NAME': str(tmp_path / 'db.sqlite3'),
+            'GUNICORN_WORKERS': '1',
+            'GUNICORN_MAX_REQUESTS': '3',
+        }
+        options = ('--config', 'python:api_yamdb.gunicorn_conf')
+        with gunicorn(str(tmp_path / 'cache'), options, env) as port:
+            for _ in range(7):
+                connection = http.client.HTTPConnection(
+                    '127.0.0.1', port, timeout=30
+                )
+                connection.request('GET', '/metrics')
+                assert connection.getresponse().status == 200
+                connection.close()
+            # child_exit последнего перезапуска мог еще не отработать.
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline:
+                workers = [
+                    name for name in os.listdir(metrics_dir)
+                    if name.startswith('worker-')
+                ]
+                if len(workers) <= 1:
+                    break
+                time.sleep(0.1)
+        assert len(workers) <= 1, (
+            'Проверьте, что файлы метрик перезапущенных воркеров удаляются'
+        )
+        assert (metrics_dir / 'aggregate.json').exists()
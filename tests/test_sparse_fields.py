@@ -0,0 +1,161 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@pytest.fixture
+def reviews(titles, authors):
+    from reviews.models import Comment, Review
+
+    result = [
+        Review.objects.create(
+            title=titles[0], author=author, text='Текст', score=idx + 1
+        )
+        for idx, author in enumerate(authors)
+    ]
+    Comment.objects.create(
+        review=result[0], author=authors[1], text='Комментарий'
+    )
+    return result
+
+
+def get(client, url, params=None):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(url, params)
+    assert response.status_code == 200, response.json()
+    return response.json(), [
+        query['sql'] for query in context.captured_queries
+    ]
+
+
+@pytest.mark.django_db
+class TestSparseFields:
+
+    def test_titles_fields(self, titles, anon_client):
+        data, queries = get(
+            anon_client, '/api/v1/titles/', {'fields': 'id,name,rating'}
+        )
+        assert set(data['results'][0]) == {'id', 'name', 'rating'}
+        # COUNT и страница: жанры не подгружаются.
+        assert len(queries) == 2, (
+            'Проверьте, что жанры не подгружаются, если их нет в ответе'
+        )
+        page = queries[-1]
+        assert 'description' not in page, (
+            'Проверьте, что ненужные колонки не читаются из базы'
+        )
+        assert 'JOIN' not in page.upper()
+
+    def test_titles_omit(self, titles, anon_client):
+        data, queries = get(
+            anon_client, '/api/v1/titles/', {'omit': 'description,genre'}
+        )
+        assert set(data['results'][0]) == {
+            'id', 'name', 'year', 'rating', 'category'
+        }
+        assert data['results'][0]['category']['slug'] in ('movie', 'book')
+        assert len(queries) == 2
+        assert 'description' not in queries[-1]
+        assert 'JOIN' in queries[-1].upper(), (
+            'Проверьте, что категория подтягивается тем же запросом'
+        )
+
+    def test_titles_genre(self, titles, anon_client):
+        data, queries = get(
+            anon_client, '/api/v1/titles/', {'fields': 'name,genre'}
+        )
+        by_name = {item['name']: item for item in data['results']}
+        assert len(by_name['Произведение 2']['genre']) == 3
+        assert len(queries) == 3
+
+    def test_full_response(self, titles, anon_client):
+        full, _ = get(anon_client, '/api/v1/titles/')
+        sparse, _ = get(anon_client, '/api/v1/titles/', {'fields': 'id'})
+        assert set(full['results'][0]) == {
+            'id', 'name', 'year', 'rating', 'description', 'genre',
+            'category',
+        }
+        assert set(sparse['results'][0]) == {'id'}, (
+            'Проверьте, что ответы с разными полями кешируются отдельно'
+        )
+
+    def test_title_retrieve(self, titles, anon_client):
+        data, _ = get(
+            anon_client, f'/api/v1/titles/{titles[0].pk}/',
+            {'fields': 'name,year'},
+        )
+        assert data == {'name': 'Произведение 0', 'year': 2000}
+
+    def test_trending(self, titles, reviews, anon_client):
+        data, _ = get(
+            anon_client, '/api/v1/titles/trending/', {'fields': 'id'}
+        )
+        assert data == [{'id': titles[0].pk}]
+
+    def test_unknown_field(self, titles, anon_client):
+        for params in ({'fields': 'id,secret'}, {'omit': 'secret'}):
+            response = anon_client.get('/api/v1/titles/', params)
+            assert response.status_code == 400
+        response = anon_client.get(
+            '/api/v1/titles/', {'fields': 'id', 'omit': 'id'}
+        )
+        assert response.status_code == 400
+
+    def test_reviews(self, reviews, anon_client):
+        url = f'/api/v1/titles/{reviews[0].title_id}/reviews/'
+        data, queries = get(anon_client, url, {'fields': 'id,score'})
+        assert set(data['results'][0]) == {'id', 'score'}
+        assert 'text' not in queries[-1]
+        assert 'JOIN' not in queries[-1].upper()
+        data, _ = get(anon_client, url, {'fields': 'author'})
+        assert {item['author'] for item in data['results']} == {
+            'author0', 'author1', 'author2', 'author3'
+        }
+
+    def test_reviews_cursor(self, reviews, anon_client):
+        url = f'/api/v1/titles/{reviews[0].title_id}/reviews/'
+        params = {'fields': 'id', 'cursor': '', 'limit': 2}
+        data, _ = get(anon_client, url, params)
+        second, queries = get(anon_client, data['next'])
+        assert len(data['results'] + second['results']) == 4
+        assert len(queries) == 2, (
+            'Проверьте, что отложенные колонки не догружаются по одной'
+        )
+
+    def test_comments(self, reviews, anon_client):
+        review = reviews[0]
+        data, _ = get(
+            anon_client,
+            f'/api/v1/titles/{review.title_id}/reviews/{review.pk}/comments/',
+            {'omit': 'author,pub_date'},
+        )
+        assert set(data['results'][0]) == {'id', 'text'}
+
+    def test_users(self, admin, admin_client):
+        data, queries = get(
+            admin_client, '/api/v1/users/', {'fields': 'username,role'}
+        )
+        assert {'username': 'TestAdmin', 'role': 'admin'} in data['results']
+        assert 'bio' not in queries[-1]
+
+    def test_users_me(self, user_client):
+        url = '/api/v1/users/me/'
+        data, _ = get(user_client, url, {'fields': 'username,role'})
+        assert data == {'username': 'TestUser', 'role': 'user'}
+        data, _ = get(user_client, url, {'omit': 'bio'})
+        assert 'bio' not in data and 'email' in data
+        response = user_client.patch(
+            url + '?fields=role', {'bio': 'О себе'}, format='json'
+        )
+        assert response.status_code == 200
+        assert response.json()['bio'] == 'О себе'
+
+    def test_writes_ignore_fields(self, genres, categories, admin_client):
+        response = admin_client.post(
+            '/api/v1/titles/?fields=id',
+            {'name': 'Новое', 'year': 2000, 'genre': ['drama'],
+             'category': 'movie'},
+            format='json',
+        )
+        assert response.status_code == 201
+        assert 'name' in response.json()
@@ -0,0 +1,63 @@
+import pytest
+
+PAGE_SIZES = (1, 10, 100, 500)
+TITLES_COUNT = 600
+
+
+@pytest.fixture
+def many_titles(categories, genres):
+    from reviews.models import GenreTitle, Title
+
+    titles = Title.objects.bulk_create(
+        Title(
+            name=f'Произведение {idx}',
+            year=1900 + idx % 100,
+            description='Описание',
+            category=categories[idx % len(categories)],
+        )
+        for idx in range(TITLES_COUNT)
+    )
+    if titles[0].pk is None:
+        titles = list(Title.objects.all())
+    GenreTitle.objects.bulk_create(
+        GenreTitle(title=title, genre=genre)
+        for title in titles
+        for genre in genres[:title.pk % len(genres) + 1]
+    )
+    return titles
+
+
+@pytest.mark.django_db
+class TestTitleQueries:
+    # COUNT(*) для пагинации, произведения с категорией, жанры.
+    list_queries = 3
+
+    @pytest.mark.parametrize('limit', PAGE_SIZES)
+    @pytest.mark.parametrize('params', [
+        {},
+        {'genre': 'drama'},
+        {'category': 'movie'},
+        {'year': 1950},
+        {'name': 'Произведение 1'},
+    ])
+    def test_list_query_count(
+        self, many_titles, anon_client, django_assert_num_queries, limit,
+        params,
+    ):
+        with django_assert_num_queries(self.list_queries):
+            response = anon_client.get(
+                '/api/v1/titles/', {'limit': limit, **params}
+            )
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert results, 'Проверьте, что фильтр возвращает произведения'
+        assert all(item['genre'] for item in results)
+
+    def test_retrieve_query_count(
+        self, many_titles, anon_client, django_assert_num_queries
+    ):
+        title = many_titles[-1]
+        with django_assert_num_queries(2):
+            response = anon_client.get(f'/api/v1/titles/{title.pk}/')
+        assert response.status_code == 200
+        assert response.json()['category']['slug'] == title.category.slug
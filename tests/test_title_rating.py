@@ -0,0 +1,147 @@
+import pytest
+from django.core.management import call_command
+from django.db import transaction
+
+
+@pytest.mark.django_db
+class TestTitleRating:
+
+    def get_title(self, title):
+        from reviews.models import Title
+
+        return Title.objects.get(pk=title.pk)
+
+    def test_review_writes_update_rating(self, titles, user_client):
+        title = titles[0]
+        url = f'/api/v1/titles/{title.id}/reviews/'
+        response = user_client.post(url, data={'text': 'Текст', 'score': 7})
+        assert response.status_code == 201, (
+            'Проверьте, что отзыв создается'
+        )
+        title = self.get_title(title)
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            7, 1, 7
+        ), 'Проверьте, что создание отзыва обновляет рейтинг'
+
+        review_id = response.json()['id']
+        response = user_client.patch(f'{url}{review_id}/', data={'score': 4})
+        assert response.status_code == 200
+        title = self.get_title(title)
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            4, 1, 4
+        ), 'Проверьте, что изменение оценки обновляет рейтинг'
+
+        response = user_client.delete(f'{url}{review_id}/')
+        assert response.status_code == 204
+        title = self.get_title(title)
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            0, 0, None
+        ), 'Проверьте, что удаление отзыва обновляет рейтинг'
+
+    def test_rating_is_rounded_average(self, titles, authors):
+        from reviews.models import Review
+
+        title = titles[0]
+        for author, score in zip(authors, (10, 9, 9, 9)):
+            Review.objects.create(
+                title=title, author=author, text='Текст', score=score
+            )
+        assert self.get_title(title).rating == 9
+        Review.objects.filter(author=authors[3]).delete()
+        assert self.get_title(title).rating == 9
+        Review.objects.filter(author=authors[2]).delete()
+        assert self.get_title(title).rating == 10, (
+            'Проверьте, что средняя 9.5 округляется вверх'
+        )
+
+    def test_author_cascade_updates_rating(self, titles, authors):
+        from reviews.models import Review
+
+        Review.objects.create(
+            title=titles[0], author=authors[0], text='Текст', score=2
+        )
+        Review.objects.create(
+            title=titles[0], author=authors[1], text='Текст', score=8
+        )
+        authors[0].delete()
+        title = self.get_title(titles[0])
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            8, 1, 8
+        )
+
+    def test_title_cascade_delete(self, titles, authors):
+        from reviews.models import Review, Title
+
+        for author in authors:
+            Review.objects.create(
+                title=titles[0], author=author, text='Текст', score=5
+            )
+        titles[0].delete()
+        assert not Review.objects.filter(title_id=titles[0].pk).exists()
+        assert Title.objects.count() == len(titles) - 1
+
+    @pytest.mark.parametrize('bulk', [False, True])
+    def test_failed_title_delete(self, titles, authors, bulk):
+        from django.db.models.signals import pre_delete
+        from reviews.models import Review, Title
+
+        for author, score in zip(authors, (2, 8)):
+            Review.objects.create(
+                title=titles[0], author=author, text='Текст', score=score
+            )
+
+        def fail(**kwargs):
+            raise RuntimeError('Удаление не удалось')
+
+        pre_delete.connect(fail, sender=Title)
+        try:
+            with pytest.raises(RuntimeError), transaction.atomic():
+                if bulk:
+                    Title.objects.filter(pk=titles[0].pk).delete()
+                else:
+                    titles[0].delete()
+        finally:
+            pre_delete.disconnect(fail, sender=Title)
+        Review.objects.filter(author=authors[0]).delete()
+        title = self.get_title(titles[0])
+        assert (title.rating_sum, title.rating_count, title.rating) == (
+            8, 1, 8
+        ), 'Проверьте, что неудачное удаление не отключает пересчет рейтинга'
+
+    def test_recalc_ratings_command(self, titles, authors):
+        from reviews.models import Review, Title
+
+        for idx, author in enumerate(authors):
+            Review.objects.create(
+                title=titles[idx % 2], author=author, text='Текст',
+                score=idx + 1,
+            )
+        Title.objects.update(rating_sum=0, rating_count=0, rating=None)
+        call_command('recalc_ratings', batch_size=1)
+        ratings = {
+            title.pk: (title.rating_sum, title.rating_count, title.rating)
+            for title in Title.objects.all()
+        }
+        assert ratings == {
+            titles[0].pk: (4, 2, 2),
+            titles[1].pk: (6, 2, 3),
+            titles[2].pk: (0, 0, None),
+        }
+
+    def test_titles_order_and_filter_by_rating(
+        self, titles, authors, anon_client
+    ):
+        from reviews.models import Review
+
+        for idx, title in enumerate(titles):
+            Review.objects.create(
+                title=title, author=authors[0], text='Текст', score=idx + 3
+            )
+        response = anon_client.get(
+            '/api/v1/titles/', {'ordering': '-rating', 'rating__gte': 4}
+        )
+        assert response.status_code == 200
+        results = response.json()['results']
+        assert [item['rating'] for item in results] == [5, 4], (
+            'Проверьте сортировку и фильтрацию произведений по рейтингу'
+        )
@@ -0,0 +1,82 @@
+import pytest
+from django.db import connection
+
+
+@pytest.fixture
+def catalog(categories):
+    from reviews.models import Title
+
+    data = [
+        ('Побег из Шоушенка', 'Тюремная драма. Надежда не умирает'),
+        ('Надежда', 'Фильм о побеге'),
+        ('Зеленая миля', 'Тюремная драма'),
+        ('50% скидка', None),
+    ]
+    return [
+        Title.objects.create(
+            name=name, description=description, year=1994,
+            category=categories[0],
+        )
+        for name, description in data
+    ]
+
+
+@pytest.mark.django_db
+class TestTitleSearch:
+
+    def search(self, client, **params):
+        response = client.get('/api/v1/titles/', params)
+        assert response.status_code == 200
+        return [item['name'] for item in response.json()['results']]
+
+    def test_name_ranks_above_description(self, catalog, anon_client):
+        names = self.search(anon_client, search='надежда')
+        assert names == ['Надежда', 'Побег из Шоушенка'], (
+            'Проверьте, что совпадение в названии выше, чем в описании'
+        )
+
+    def test_prefix_and_description(self, catalog, anon_client):
+        assert self.search(anon_client, search='тюремн') == [
+            'Зеленая миля', 'Побег из Шоушенка'
+        ]
+
+    def test_combines_with_filters(self, catalog, categories, anon_client):
+        from reviews.models import Title
+
+        Title.objects.create(
+            name='Надежда', year=2001, category=categories[1]
+        )
+        names = self.search(anon_client, search='надежда', category='book')
+        assert names == ['Надежда']
+
+    def test_updates_are_indexed(self, catalog, anon_client):
+        catalog[2].name = 'Милая надежда'
+        catalog[2].save()
+        catalog[0].delete()
+        assert set(self.search(anon_client, search='надежда')) == {
+            'Надежда', 'Милая надежда'
+        }
+
+    @pytest.mark.skipif(
+        connection.vendor != 'postgresql', reason='Поиск PostgreSQL'
+    )
+    @pytest.mark.parametrize('text, names', [
+        ('шоу', ['Побег из Шоушенка']),
+        ('наде', ['Надежда', 'Побег из Шоушенка']),
+        ('тюр драм', ['Зеленая миля', 'Побег из Шоушенка']),
+        ("наде'жда", []),
+    ])
+    def test_postgresql_prefixes(self, catalog, anon_client, text, names):
+        assert self.search(anon_client, search=text) == names, (
+            'Проверьте, что на PostgreSQL слова ищутся как префиксы, '
+            'как и на SQLite'
+        )
+
+    @pytest.mark.parametrize(
+        'text', ['"', '50%', 'AND (', '*', 'скидка" OR "x', "it's", '\\:*']
+    )
+    def test_special_characters(self, catalog, anon_client, text):
+        self.search(anon_client, search=text)
+
+    def test_empty_search_keeps_list(self, catalog, anon_client):
+        assert len(self.search(anon_client, search='  ')) == len(catalog)
@@ -0,0 +1,156 @@
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+# COUNT(*), произведения с категорией, жанры; см. test_title_queries.
+LIST_QUERIES = 3
+
+
+def legacy_client(user):
+    from rest_framework_simplejwt.tokens import RefreshToken
+
+    client = APIClient()
+    token = RefreshToken.for_user(user).access_token
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+    return client
+
+
+@pytest.mark.django_db
+class TestTokenAuth:
+
+    def test_token_has_role(self, client, user):
+        from rest_framework_simplejwt.tokens import AccessToken
+        from users.authentication import RoleRefreshToken
+
+        token = AccessToken(str(RoleRefreshToken.for_user(user).access_token))
+        assert token['role'] == 'user'
+        assert token['username'] == user.username
+        assert token['is_superuser'] is False
+
+    def test_no_user_query(
+        self, titles, user, user_client, django_assert_num_queries
+    ):
+        from users.authentication import get_auth_state
+
+        # Права лежат в общем кеше; в базу идет только первый запрос.
+        get_auth_state(user.pk)
+        with django_assert_num_queries(LIST_QUERIES):
+            response = user_client.get('/api/v1/titles/')
+        assert response.status_code == 200, (
+            'Проверьте, что пользователь берется из токена без запроса'
+        )
+
+    def test_role_from_token(self, titles, admin_client, user_client):
+        data = {'name': 'Новое', 'slug': 'new'}
+        assert user_client.post(
+            '/api/v1/categories/', data
+        ).status_code == 403
+        assert admin_client.post(
+            '/api/v1/categories/', data
+        ).status_code == 201
+
+    def test_legacy_token_uses_cache(
+        self, titles, user, django_assert_num_queries
+    ):
+        client = legacy_client(user)
+        with django_assert_num_queries(LIST_QUERIES + 1):
+            client.get('/api/v1/titles/')
+        # Ответ закеширован, а нужен повторный проход до базы.
+        cache.clear()
+        with django_assert_num_queries(LIST_QUERIES):
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+
+    def test_role_change_invalidates_row(self, admin_client, user_client,
+                                         user):
+        assert user_client.get(
+            '/api/v1/users/me/'
+        ).json()['role'] == 'user'
+        response = admin_client.patch(
+            f'/api/v1/users/{user.username}/', {'role': 'moderator'}
+        )
+        assert response.status_code == 200
+        assert user_client.get(
+            '/api/v1/users/me/'
+        ).json()['role'] == 'moderator', (
+            'Проверьте, что изменение пользователя сбрасывает кеш'
+        )
+
+    def test_cache_is_bounded(self, settings, authors):
+        from users.authentication import user_cache
+
+        settings.AUTH_USER_CACHE_SIZE = 2
+        for author in authors:
+            user_cache.get(author.pk)
+        assert len(user_cache) == 2
+
+    def test_cache_entries_expire(
+        self, settings, user, monkeypatch, django_assert_num_queries
+    ):
+        from users import authentication
+
+        user_cache = authentication.user_cache
+        user_cache.get(user.pk)
+        now = authentication.time.monotonic()
+        monkeypatch.setattr(
+            authentication.time, 'monotonic',
+            lambda: now + settings.AUTH_USER_CACHE_TTL + 1,
+        )
+        with django_assert_num_queries(1):
+            user_cache.get(user.pk)
+
+    def test_deleted_user_with_legacy_token(self, titles, user):
+        client = legacy_client(user)
+        user.delete()
+        assert client.get('/api/v1/titles/').status_code == 401
+
+    def test_role_change_changes_permissions(self, admin_client, user_client,
+                                             user):
+        data = {'name': 'Новое', 'slug': 'new'}
+        assert user_client.get('/api/v1/users/').status_code == 403
+        url = f'/api/v1/users/{user.username}/'
+        admin_client.patch(url, {'role': 'admin'})
+        assert user_client.get('/api/v1/users/').status_code == 200
+        admin_client.patch(url, {'role': 'user'})
+        assert user_client.get('/api/v1/users/').status_code == 403, (
+            'Проверьте, что права берутся не из токена, а из текущей роли'
+        )
+        assert user_client.post(
+            '/api/v1/categories/', data
+        ).status_code == 403
+
+    def test_deleted_user_cannot_write(self, titles, user, user_client):
+        user_client.get('/api/v1/users/me/')
+        user.delete()
+        response = user_client.post(
+            f'/api/v1/titles/{titles[0].pk}/reviews/',
+            {'text': 'Отзыв', 'score': 7},
+        )
+        assert response.status_code == 401
+
+    def test_row_of_deleted_user(self, user):
+        from rest_framework.exceptions import AuthenticationFailed
+        from rest_framework_simplejwt.tokens import AccessToken
+        from users.authentication import (RoleRefreshToken, RoleTokenUser,
+                                          get_user_row)
+
+        token = AccessToken(str(RoleRefreshToken.for_user(user).access_token))
+        token_user = RoleTokenUser(token, {
+            'role': 'user', 'is_superuser': False, 'is_active': True
+        })
+        user.delete()
+        with pytest.raises(AuthenticationFailed):
+            get_user_row(token_user)
+
+    def test_inactive_user(self, titles, user, user_client):
+        user_client.get('/api/v1/users/me/')
+        user.is_active = False
+        user.save()
+        assert user_client.get('/api/v1/users/me/').status_code == 401
+        response = user_client.post(
+            f'/api/v1/titles/{titles[0].pk}/reviews/',
+            {'text': 'Отзыв', 'score': 7},
+        )
+        assert response.status_code == 401, (
+            'Проверьте, что отключенный пользователь теряет доступ'
+        )
@@ -0,0 +1,113 @@
+import time
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+URL = '/api/v1/titles/trending/'
+
+
+def trending(title):
+    title.refresh_from_db()
+    return title.trending
+
+
+@pytest.fixture
+def active_titles(titles, authors):
+    from reviews.models import Comment, Review
+
+    for author in authors[:3]:
+        Review.objects.create(
+            title=titles[1], author=author, text='Текст', score=5
+        )
+    review = Review.objects.create(
+        title=titles[0], author=authors[0], text='Текст', score=10
+    )
+    Comment.objects.create(review=review, author=authors[1], text='Текст')
+    return titles
+
+
+@pytest.mark.django_db
+class TestTrending:
+
+    def test_activity_raises_score(self, titles, authors, settings):
+        from reviews.models import Comment, Review
+
+        review = Review.objects.create(
+            title=titles[0], author=authors[0], text='Текст', score=10
+        )
+        assert trending(titles[0]) == pytest.approx(
+            settings.TRENDING_REVIEW_WEIGHT
+            + 10 * settings.TRENDING_SCORE_WEIGHT
+        )
+        before = trending(titles[0])
+        Comment.objects.create(review=review, author=authors[1], text='Т')
+        assert trending(titles[0]) == pytest.approx(
+            before + settings.TRENDING_COMMENT_WEIGHT, rel=1e-3
+        )
+        review.text = 'Изменен'
+        review.save()
+        assert trending(titles[0]) == pytest.approx(
+            before + settings.TRENDING_COMMENT_WEIGHT, rel=1e-3
+        ), 'Проверьте, что популярность растет только от новых записей'
+
+    def test_feed(self, active_titles, anon_client):
+        response = anon_client.get(URL)
+        assert response.status_code == 200
+        assert [item['name'] for item in response.json()] == [
+            'Произведение 1', 'Произведение 0'
+        ], 'Проверьте, что в ленте только активные произведения по порядку'
+        filtered = anon_client.get(URL, {'genre': 'comedy'}).json()
+        assert [item['name'] for item in filtered] == ['Произведение 1']
+        limited = anon_client.get(URL, {'limit': 1}).json()
+        assert len(limited) == 1
+        assert anon_client.get(URL, {'limit': 0}).status_code == 400
+
+    def test_feed_query_count(
+        self, active_titles, anon_client, django_assert_num_queries
+    ):
+        with django_assert_num_queries(2):
+            anon_client.get(URL)
+
+    def test_decay(self, active_titles, settings):
+        from reviews.models import Title
+
+        before = trending(active_titles[1])
+        Title.objects.update(
+            trending_at=time.time() - settings.TRENDING_HALF_LIFE
+        )
+        call_command('decay_trending', batch_size=1, stdout=StringIO())
+        assert trending(active_titles[1]) == pytest.approx(
+            before / 2, rel=1e-3
+        ), 'Проверьте, что за период полураспада оценка падает вдвое'
+        Title.objects.update(trending_at=0)
+        call_command('decay_trending', stdout=StringIO())
+        assert not Title.objects.filter(trending__gt=0).exists(), (
+            'Проверьте, что затухшие оценки обнуляются'
+        )
+
+    def test_loop(self, active_titles, monkeypatch):
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 2:
+                raise KeyboardInterrupt
+
+        monkeypatch.setattr('time.sleep', sleep)
+        out = StringIO()
+        with pytest.raises(KeyboardInterrupt):
+            call_command('decay_trending', loop=True, interval=10, stdout=out)
+        assert sleeps == [10, 10]
+        assert len(out.getvalue().splitlines()) == 2, (
+            'Проверьте, что в режиме --loop оценки затухают каждый проход'
+        )
+
+    def test_rebuild(self, active_titles):
+        from reviews.models import Title
+
+        incremental = dict(Title.objects.values_list('pk', 'trending'))
+        Title.objects.update(trending=0)
+        call_command('decay_trending', rebuild=True, stdout=StringIO())
+        rebuilt = dict(Title.objects.values_list('pk', 'trending'))
+        assert rebuilt == pytest.approx(incremental, rel=1e-3)